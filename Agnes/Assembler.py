@@ -2,10 +2,15 @@ import numpy as np
 import scipy.sparse as sp
 from collections.abc import Iterable
 from .Triangle import Triangle
+from .TriangleBatch import TriangleBatch
+from .MatrixFreeOperator import MatrixFreeOperator
 from .LoadableMesh import LoadableMesh
 from .DiscreteSpace import DiscreteSpace
-from .OneForm import OneForm
-from .TwoForm import TwoForm
+from .OneForm import (OneForm, groupOneForms, sumLocalVecs)
+from .TwoForm import (TwoForm, groupTwoForms, sumLocalMats)
+from .EdgeBatch import EdgeBatch
+from .BoundaryForm import (isBoundaryForm, groupBoundaryForms,
+                           sumBoundaryLocals)
 
 class Assembler:
   '''
@@ -14,14 +19,280 @@ class Assembler:
 
   def __init__(self, ds : DiscreteSpace,
                twoForms : Iterable, 
-               oneForms : Iterable):
-    
+               oneForms : Iterable,
+               symmetric : bool = None):
+    '''
+    Constructor. The form lists can mix element forms with boundary forms
+    (BoundaryTwoForm, BoundaryOneForm), which are integrated over their
+    side sets. The symmetric argument tells the assembler whether the
+    sum of the two-forms is symmetric. If it's None, symmetry is detected
+    by asking each form whether it is symmetric.
+    '''
+    twoForms = tuple(twoForms)
+    oneForms = tuple(oneForms)
+
     self._ds = ds
-    self._oneForms = oneForms
-    self._twoForms = twoForms
+    self._oneForms = tuple(f for f in oneForms if not isBoundaryForm(f))
+    self._twoForms = tuple(f for f in twoForms if not isBoundaryForm(f))
+    self._bdryOneForms = tuple(f for f in oneForms if isBoundaryForm(f))
+    self._bdryTwoForms = tuple(f for f in twoForms if isBoundaryForm(f))
+    self._symmetric = symmetric
+
+    # Forms writing into the same global entries are summed on each
+    # element (or edge) and scattered together
+    self._twoFormGroups = groupTwoForms(self._twoForms)
+    self._oneFormGroups = groupOneForms(self._oneForms)
+    self._bdryTwoFormGroups = groupBoundaryForms(self._bdryTwoForms)
+    self._bdryOneFormGroups = groupBoundaryForms(self._bdryOneForms)
+
+    # Function pairs coupled by the two-forms. Only these are put in the
+    # sparsity pattern, so unused couplings aren't stored as zeros.
+    self._funcPairs = tuple(sorted(
+      set(self._twoFormGroups.keys())
+      | set((t, u) for (labels, t, u) in self._bdryTwoFormGroups.keys())))
+
+
+  def isSymmetric(self):
+    '''
+    Indicate whether the assembled matrix is symmetric
+    '''
+    if self._symmetric is not None:
+      return self._symmetric
+    return all(aForm.isSymmetric()
+               for aForm in self._twoForms + self._bdryTwoForms)
 
     
-  def assemble(self, buildMat=True, buildVec=True):
+  def assemble(self, buildMat=True, buildVec=True, method='csr',
+               upper=False, shareIndices=False):
+    '''
+    Assemble the system matrix and load vector. The available methods are:
+    (*) 'csr' accumulates element matrices directly into the data array
+        of a CSR matrix, using the sparsity pattern and scatter maps cached
+        by the DiscreteSpace. After the first call, no index arrays are
+        built and no format conversions are done.
+    (*) 'bsr' produces a block sparse (BSR) matrix with numFuncs by
+        numFuncs blocks, one per pair of connected nodes. All forms are
+        scattered into the block data array in a single pass. For
+        multi-component spaces this cuts the index storage by a factor
+        numFuncs^2.
+    (*) 'coo' forms the contributions from all elements as arrays, builds
+        (row, col, value) triplets in one go, and converts them to CSR once.
+    (*) 'dok' is the original element-by-element loop that updates a
+        dok_matrix one entry at a time. It's kept for reference and
+        debugging; it's far too slow for large meshes.
+
+    If upper is True, only the upper triangle of a symmetric matrix is
+    assembled and returned in CSR format. This roughly halves the matrix
+    storage, and the cached scatter maps are two thirds the size of the
+    full ones for a scalar problem (about half for systems). Gathering
+    the upper triangle entries from the element matrices costs at least
+    as much as the smaller scatter saves, so this saves memory rather
+    than time. Use expandUpper() to recover the full matrix,
+    or symmetricOperator() to apply it in an iterative solver. The upper
+    option requires the 'csr' method and a symmetric set of two-forms.
+
+    With the 'csr' and 'bsr' methods, the matrix gets its own copies of
+    the cached pattern's index arrays. If shareIndices is True, it uses
+    the pattern's read-only arrays instead, which saves their memory for
+    each matrix but makes structural changes (eliminate_zeros(),
+    sum_duplicates(), etc.) fail.
+    '''
+    if upper:
+      if method!='csr':
+        raise ValueError('Upper triangular assembly requires the '
+                         '\'csr\' method, got \'{}\''.format(method))
+      if buildMat and not self.isSymmetric():
+        raise ValueError('Upper triangular assembly requested, but the '
+                         'two-forms are not symmetric')
+
+    if method=='csr':
+      return self._assembleCSR(buildMat, buildVec, upper, shareIndices)
+    elif method=='bsr':
+      return self._assembleBSR(buildMat, buildVec, shareIndices)
+    elif method=='coo':
+      return self._assembleCOO(buildMat, buildVec)
+    elif method=='dok':
+      return self._assembleDOK(buildMat, buildVec)
+    else:
+      raise ValueError('Unknown assembly method \'{}\'; expected '
+                       '\'csr\', \'bsr\', \'coo\' or \'dok\''\
+                       .format(method))
+
+
+  def operator(self, chunkSize : int = 65536):
+    '''
+    Return a matrix-free scipy LinearOperator applying the sum of the
+    two-forms, for use with the iterative solvers in scipy.sparse.linalg
+    when the assembled matrix would be too large. Elements are processed
+    chunkSize at a time.
+    '''
+    return MatrixFreeOperator(self._ds, self._twoForms + self._bdryTwoForms,
+                              chunkSize)
+
+
+  def _boundaryLocalMats(self):
+    '''
+    Compute the local matrices of the boundary two-forms. Yields a tuple
+    (nodes, testID, unkID, A_loc) for each group of forms, where nodes is
+    the (nEdge, 2) array of edge vertices and A_loc the (nEdge, 2, 2)
+    local matrices.
+    '''
+    mesh = self._ds.mesh()
+    for (labels, testID, unkID), forms in self._bdryTwoFormGroups.items():
+      edges = EdgeBatch.forSides(mesh, labels)
+      yield (edges.sides, testID, unkID,
+             sumBoundaryLocals(forms, edges, edges.sides))
+
+
+  def _assembleCSR(self, buildMat, buildVec, upper=False,
+                   shareIndices=False):
+
+    N = self._ds.numDofs()
+    nf = self._ds.numFuncs()
+    A = None
+    b = None
+
+    mesh = self._ds.mesh()
+    elems = mesh.elemArray()
+    tris = TriangleBatch.forMesh(mesh)
+
+    if buildMat:
+      pattern = self._ds.sparsityPattern(upper, self._funcPairs)
+      data = np.zeros(pattern.nnz())
+      for (testID, unkID), forms in self._twoFormGroups.items():
+        A_loc = sumLocalMats(forms, tris, elems)
+        pattern.accumulate(data, testID, unkID, A_loc)
+      for (nodes, testID, unkID, A_loc) in self._boundaryLocalMats():
+        pattern.accumulateEntries(data,
+                                  (nf*nodes + testID)[:,:,np.newaxis],
+                                  (nf*nodes + unkID)[:,np.newaxis,:], A_loc)
+      A = pattern.matrix(data, shareIndices)
+
+    if buildVec:
+      b = self._assembleVec(tris, elems, N)
+
+    return (A,b)
+
+
+  def _assembleBSR(self, buildMat, buildVec, shareIndices=False):
+
+    N = self._ds.numDofs()
+    nf = self._ds.numFuncs()
+    A = None
+    b = None
+
+    mesh = self._ds.mesh()
+    elems = mesh.elemArray()
+    tris = TriangleBatch.forMesh(mesh)
+
+    if buildMat:
+      pattern = self._ds.blockSparsityPattern()
+      # Position of each element's node-pair blocks in the block array
+      blockPos = pattern.scatterMap(0, 0)
+      dataSize = nf*nf*pattern.nnz()
+
+      # Entry (testID, unkID) of block k is at k*nf*nf + nf*testID + unkID
+      # in the flattened block data array
+      pos = []
+      vals = []
+      for (testID, unkID), forms in self._twoFormGroups.items():
+        pos.append((nf*nf*blockPos + nf*testID + unkID).ravel())
+        vals.append(sumLocalMats(forms, tris, elems).ravel())
+      for (nodes, testID, unkID, A_loc) in self._boundaryLocalMats():
+        edgeBlockPos = pattern.find(nodes[:,:,np.newaxis],
+                                    nodes[:,np.newaxis,:])
+        pos.append((nf*nf*edgeBlockPos + nf*testID + unkID).ravel())
+        vals.append(A_loc.ravel())
+
+      if len(vals)==0:
+        data = np.zeros(dataSize)
+      else:
+        data = np.bincount(np.concatenate(pos), weights=np.concatenate(vals),
+                           minlength=dataSize)
+      A = pattern.blockMatrix(data.reshape((-1,nf,nf)), nf, shareIndices)
+
+    if buildVec:
+      b = self._assembleVec(tris, elems, N)
+
+    return (A,b)
+
+
+  def _assembleCOO(self, buildMat, buildVec):
+
+    N = self._ds.numDofs()
+    A = None
+    b = None
+
+    # Geometry for all elements, computed once per mesh and shared by
+    # every form
+    mesh = self._ds.mesh()
+    elems = mesh.elemArray()
+    tris = TriangleBatch.forMesh(mesh)
+
+    if buildMat:
+      rows = []
+      cols = []
+      vals = []
+      for (testID, unkID), forms in self._twoFormGroups.items():
+        A_loc = sumLocalMats(forms, tris, elems)
+
+        testDofs = self._ds.elemDofs(testID)
+        unkDofs = self._ds.elemDofs(unkID)
+
+        # Entry (e,i,j) of the local matrices goes into global row
+        # testDofs[e,i] and global column unkDofs[e,j]
+        rows.append(np.broadcast_to(testDofs[:,:,np.newaxis],
+                                    A_loc.shape).ravel())
+        cols.append(np.broadcast_to(unkDofs[:,np.newaxis,:],
+                                    A_loc.shape).ravel())
+        vals.append(A_loc.ravel())
+
+      nf = self._ds.numFuncs()
+      for (nodes, testID, unkID, A_loc) in self._boundaryLocalMats():
+        rows.append(np.broadcast_to((nf*nodes + testID)[:,:,np.newaxis],
+                                    A_loc.shape).ravel())
+        cols.append(np.broadcast_to((nf*nodes + unkID)[:,np.newaxis,:],
+                                    A_loc.shape).ravel())
+        vals.append(A_loc.ravel())
+
+      if len(vals)==0:
+        A = sp.csr_matrix((N,N))
+      else:
+        # Duplicate (row, col) pairs are summed in the conversion to CSR
+        A = sp.coo_matrix((np.concatenate(vals),
+                           (np.concatenate(rows), np.concatenate(cols))),
+                          shape=(N,N)).tocsr()
+
+    if buildVec:
+      b = self._assembleVec(tris, elems, N)
+
+    return (A,b)
+
+
+  def _assembleVec(self, tris, elems, N):
+    '''
+    Assemble the load vector, summing the local vectors from all elements
+    and boundary edges with a bincount
+    '''
+    b = np.zeros(N)
+    for testID, forms in self._oneFormGroups.items():
+      b_loc = sumLocalVecs(forms, tris, elems)
+      testDofs = self._ds.elemDofs(testID)
+      b += np.bincount(testDofs.ravel(), weights=b_loc.ravel(),
+                       minlength=N)
+
+    mesh = self._ds.mesh()
+    nf = self._ds.numFuncs()
+    for (labels, testID), forms in self._bdryOneFormGroups.items():
+      edges = EdgeBatch.forSides(mesh, labels)
+      b_loc = sumBoundaryLocals(forms, edges, edges.sides)
+      testDofs = nf*edges.sides + testID
+      b += np.bincount(testDofs.ravel(), weights=b_loc.ravel(),
+                       minlength=N)
+    return b
+
+
+  def _assembleDOK(self, buildMat, buildVec):
 
     N = self._ds.numDofs()
     print('N=', N)
@@ -75,7 +346,27 @@ class Assembler:
             r = testDofs[i]
             b[r] += b_loc[i]
 
-    A = A.tocsr()
+    # Loop over boundary edges
+    nf = self._ds.numFuncs()
+    if buildMat:
+      for (nodes, testID, unkID, A_loc) in self._boundaryLocalMats():
+        for ie, sVerts in enumerate(nodes):
+          for i in range(0,2):
+            r = nf*sVerts[i] + testID
+            for j in range(0,2):
+              c = nf*sVerts[j] + unkID
+              A[r,c] += A_loc[ie,i,j]
+
+    if buildVec:
+      for (labels, testID), forms in self._bdryOneFormGroups.items():
+        edges = EdgeBatch.forSides(mesh, labels)
+        b_loc = sumBoundaryLocals(forms, edges, edges.sides)
+        for ie, sVerts in enumerate(edges.sides):
+          for i in range(0,2):
+            b[nf*sVerts[i] + testID] += b_loc[ie,i]
+
+    if buildMat:
+      A = A.tocsr()
 
     return (A,b)
             
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 
 
-class BaseMesh:
+class BaseMesh(ABC):
   # Constructor has nothing to do
   def __init__(self):
     pass
@@ -13,7 +13,7 @@ class BaseMesh:
 
   # Iterable view of sides having a given label
   @abstractmethod
-  def elements(self):
+  def sidesWithLabel(self, label):
     pass
 
   # Look up the coordinates of a vertex
@@ -0,0 +1,55 @@
+# --------------------------------------------------------------------------
+# Process-wide cache of basis functions tabulated at quadrature points.
+# Forms and integration routines that use the same rule and basis share
+# one set of read-only arrays instead of each building its own copy.
+# --------------------------------------------------------------------------
+
+import numpy as np
+from .QuadratureRule import QuadratureRule
+from .P1Basis import P1Basis
+
+
+class BasisTabulation:
+  '''
+  Values and reference gradients of a basis at the points of a quadrature
+  rule. The attributes are read-only arrays:
+  (*) X          -- (nQuad, 2) quadrature points on the reference triangle
+  (*) W          -- (nQuad,) quadrature weights
+  (*) phi        -- (nQuad, nBasis) basis values at the quadrature points
+  (*) gradPhiRef -- (nQuad, 2, nBasis) reference gradients at the points
+  (*) phiPhi     -- (nQuad, nBasis*nBasis) products phi_i*phi_j at the
+                    points, as needed for mass matrices
+  '''
+
+  def __init__(self, quad : QuadratureRule, basis = P1Basis):
+    X = np.array(quad.X(), dtype=np.double)
+    W = np.array(quad.W(), dtype=np.double)
+    x = X[:,0]
+    y = X[:,1]
+
+    self.X = X
+    self.W = W
+    self.phi = np.ascontiguousarray(basis.phi(x, y).T)
+    self.gradPhiRef = np.ascontiguousarray(
+      np.moveaxis(basis.grad_phi(x, y), -1, 0))
+    self.phiPhi = np.einsum('qi,qj->qij', self.phi, self.phi)\
+                    .reshape((len(W), -1))
+
+    for a in (self.X, self.W, self.phi, self.gradPhiRef, self.phiPhi):
+      a.setflags(write=False)
+
+  def n(self):
+    return len(self.W)
+
+
+_tabulations = {}
+
+def tabulate(quad : QuadratureRule, basis = P1Basis):
+  '''
+  Return the tabulation of a basis at the points of a quadrature rule,
+  computing it only on the first request for that (rule, basis) pair.
+  '''
+  key = (quad.key(), basis)
+  if key not in _tabulations:
+    _tabulations[key] = BasisTabulation(quad, basis)
+  return _tabulations[key]
@@ -0,0 +1,199 @@
+# --------------------------------------------------------------------------
+# One-forms and two-forms integrated over side sets, for Neumann and Robin
+# boundary conditions. Local vectors and matrices are computed for all
+# edges of a side set at once, using the geometry in EdgeBatch, and the
+# Assembler scatters them along with the element contributions.
+#
+# On an edge parametrized as A + s t, the two P1 basis functions that
+# don't vanish are 1-s and s, belonging to the edge's first and second
+# vertices.
+# --------------------------------------------------------------------------
+
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from .EdgeBatch import (EdgeBatch, gaussLine)
+import numpy as np
+
+
+def _labelTuple(labels):
+  if isinstance(labels, Iterable) and not isinstance(labels, str):
+    return tuple(labels)
+  return (labels,)
+
+
+def _edgePhi(s):
+  '''
+  Values of the two edge basis functions at points s, as an (nQ, 2) array
+  '''
+  return np.stack((1.0 - s, s), axis=1)
+
+
+def _coeffOnEdges(coeff, edges : EdgeBatch, order : int):
+  '''
+  Values of a coefficient at the quadrature points on all edges, as an
+  (nEdge, nQ) array. A callable coefficient is called once as
+  coeff(x, y, nx, ny), with the coordinates and the outward normal at all
+  points.
+  '''
+  s, w = gaussLine(order)
+  shape = (len(edges), len(s))
+  if not callable(coeff):
+    return np.broadcast_to(np.double(coeff), shape)
+
+  X = edges.quadPts(order)
+  N = np.broadcast_to(edges.normal[:,np.newaxis,:], X.shape)
+  vals = coeff(X[:,:,0], X[:,:,1], N[:,:,0], N[:,:,1])
+  return np.broadcast_to(vals, shape)
+
+
+class BoundaryOneForm(ABC):
+  '''
+  Abstract interface for one-forms integrated over the sides with the
+  given labels.
+  '''
+
+  def __init__(self, labels, testID : int = 0):
+    if testID < 0:
+      raise ValueError('Test function index should be non-negative')
+    self._labels = _labelTuple(labels)
+    self._testID = testID
+
+  @abstractmethod
+  def localVecs(self, edges : EdgeBatch, nodes):
+    '''
+    Compute the local vectors on a batch of edges, returned as an
+    (nEdge, 2) array. The nodes argument is the (nEdge, 2) array of the
+    edges' vertex indices.
+    '''
+    pass
+
+  def labels(self):
+    return self._labels
+
+  def testID(self):
+    return self._testID
+
+
+class BoundaryTwoForm(ABC):
+  '''
+  Abstract interface for two-forms integrated over the sides with the
+  given labels.
+  '''
+
+  def __init__(self, labels, testID : int = 0, unkID : int = 0):
+    if testID < 0:
+      raise ValueError('Test function index should be non-negative')
+    if unkID < 0:
+      raise ValueError('Unknown function index should be non-negative')
+    self._labels = _labelTuple(labels)
+    self._testID = testID
+    self._unkID = unkID
+
+  @abstractmethod
+  def localMats(self, edges : EdgeBatch, nodes):
+    '''
+    Compute the local matrices on a batch of edges, returned as an
+    (nEdge, 2, 2) array. The nodes argument is the (nEdge, 2) array of the
+    edges' vertex indices.
+    '''
+    pass
+
+  def isSymmetric(self):
+    return False
+
+  def labels(self):
+    return self._labels
+
+  def testID(self):
+    return self._testID
+
+  def unkID(self):
+    return self._unkID
+
+
+def isBoundaryForm(form):
+  return isinstance(form, (BoundaryOneForm, BoundaryTwoForm))
+
+
+def groupBoundaryForms(forms):
+  '''
+  Group boundary forms by their labels and function IDs. Returns a dict
+  mapping (labels, testID) for one-forms, or (labels, testID, unkID) for
+  two-forms, to a list of forms.
+  '''
+  groups = {}
+  for f in forms:
+    if isinstance(f, BoundaryTwoForm):
+      key = (f.labels(), f.testID(), f.unkID())
+    else:
+      key = (f.labels(), f.testID())
+    groups.setdefault(key, []).append(f)
+  return groups
+
+
+def sumBoundaryLocals(forms, edges : EdgeBatch, nodes):
+  '''
+  Sum the local vectors or matrices of several boundary forms of the same
+  kind over a batch of edges.
+  '''
+  if isinstance(forms[0], BoundaryTwoForm):
+    vals = [f.localMats(edges, nodes) for f in forms]
+  else:
+    vals = [f.localVecs(edges, nodes) for f in forms]
+  return sum(vals[1:], vals[0])
+
+
+class NeumannOneForm(BoundaryOneForm):
+  '''
+  The boundary integral \\int_\\Gamma g v ds, for imposing a flux g on the
+  sides with the given labels. The flux is a constant or a function
+  flux(x, y, nx, ny) of position and outward normal, evaluated with a
+  Gauss rule of the specified order.
+  '''
+
+  def __init__(self, labels, flux = 1.0, order : int = 2,
+               testID : int = 0):
+    super().__init__(labels, testID)
+    self._flux = flux
+    self._order = order
+
+  def localVecs(self, edges : EdgeBatch, nodes):
+    s, w = gaussLine(self._order)
+    vals = _coeffOnEdges(self._flux, edges, self._order)
+    rtn = (vals*w) @ _edgePhi(s)
+    rtn *= edges.length[:,np.newaxis]
+    return rtn
+
+
+class RobinTwoForm(BoundaryTwoForm):
+  '''
+  The boundary integral \\int_\\Gamma alpha u v ds, the matrix part of the
+  Robin condition du/dn + alpha u = g. Use a NeumannOneForm for the g term.
+  The coefficient alpha is a constant, which is integrated exactly, or a
+  function alpha(x, y, nx, ny) evaluated with a Gauss rule of the
+  specified order.
+  '''
+
+  # Edge mass matrix, up to scaling by the edge length
+  M = np.array([[2, 1], [1, 2]]) / 6.0
+
+  def __init__(self, labels, alpha = 1.0, order : int = 3,
+               testID : int = 0, unkID : int = 0):
+    super().__init__(labels, testID, unkID)
+    self._alpha = alpha
+    self._order = order
+
+  def localMats(self, edges : EdgeBatch, nodes):
+    if not callable(self._alpha):
+      return (self._alpha*edges.length)[:,np.newaxis,np.newaxis] \
+        * RobinTwoForm.M
+
+    s, w = gaussLine(self._order)
+    phi = _edgePhi(s)
+    vals = _coeffOnEdges(self._alpha, edges, self._order)
+    rtn = np.einsum('eq,qi,qj->eij', vals*w, phi, phi)
+    rtn *= edges.length[:,np.newaxis,np.newaxis]
+    return rtn
+
+  def isSymmetric(self):
+    return self.testID()==self.unkID()
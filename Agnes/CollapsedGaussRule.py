@@ -0,0 +1,119 @@
+# --------------------------------------------------------------------------
+# Quadrature rules of arbitrary order on the reference triangle, built by
+# collapsing the unit square onto the triangle (the Duffy transformation)
+# and using tensor products of 1D Gauss rules.
+#
+# The map (u,v) -> (x,y) = (u, (1-u) v) takes the unit square onto the
+# reference triangle with Jacobian (1-u), so
+#   \int_T f(x,y) dx dy = \int_0^1 \int_0^1 f(u, (1-u)v) (1-u) du dv.
+# The factor (1-u) is absorbed into a Gauss-Jacobi rule in u, and a plain
+# Gauss-Legendre rule is used in v. For a polynomial of degree p, both
+# directions need ceil((p+1)/2) points.
+# --------------------------------------------------------------------------
+
+import os
+import numpy as np
+from .QuadratureRule import QuadratureRule
+
+
+def gaussJacobi(n : int, alpha : float, beta : float):
+  '''
+  Nodes and weights of the n-point Gauss-Jacobi rule for the weight
+  (1-t)^alpha (1+t)^beta on [-1,1], computed with the Golub-Welsch
+  algorithm. Requires alpha + beta > 0 so the recurrence is well defined.
+  '''
+  from math import gamma
+
+  k = np.arange(n, dtype=np.double)
+  ab = alpha + beta
+  s = 2.0*k + ab
+
+  # Diagonal and off-diagonal of the Jacobi matrix
+  diag = (beta**2 - alpha**2) / (s*(s + 2.0))
+  k1 = k[1:]
+  s1 = s[1:]
+  offDiag = np.sqrt(4.0*k1*(k1 + alpha)*(k1 + beta)*(k1 + ab)
+                    / (s1**2 * (s1 + 1.0) * (s1 - 1.0)))
+
+  J = np.diag(diag) + np.diag(offDiag, 1) + np.diag(offDiag, -1)
+  t, V = np.linalg.eigh(J)
+
+  mu0 = 2.0**(ab + 1.0) * gamma(alpha + 1.0) * gamma(beta + 1.0) \
+    / gamma(ab + 2.0)
+  w = mu0 * V[0,:]**2
+
+  return (t, w)
+
+
+class CollapsedGaussRule(QuadratureRule):
+  '''
+  Collapsed-coordinate Gauss rule on the reference triangle, exact for
+  polynomials of degree order. Any order can be requested. As with
+  GaussRule, the weights sum to one.
+
+  Generated rules are memoized for the life of the process. If cacheDir
+  is given, rules are also saved to (and read back from) .npz files in
+  that directory, so the generation cost is paid only once.
+  '''
+
+  def __init__(self, order : int, cacheDir : str = None):
+    if order < 0:
+      raise ValueError('Quadrature order should be non-negative')
+
+    if order not in CollapsedGaussRule._memo:
+      rule = None
+      if cacheDir is not None:
+        rule = CollapsedGaussRule._read(order, cacheDir)
+      if rule is None:
+        rule = CollapsedGaussRule._generate(order)
+        if cacheDir is not None:
+          CollapsedGaussRule._write(order, cacheDir, rule)
+      for a in rule:
+        a.setflags(write=False)
+      CollapsedGaussRule._memo[order] = rule
+
+    (wq, xq) = CollapsedGaussRule._memo[order]
+
+    super().__init__('CollapsedGauss({})'.format(order), order, wq, xq)
+
+  _memo = {}
+
+  @staticmethod
+  def _generate(order : int):
+    n = (order + 2) // 2
+
+    # Gauss-Jacobi in u with weight (1-u), mapped from [-1,1] to [0,1]
+    t, wt = gaussJacobi(n, 1.0, 0.0)
+    u = 0.5*(1.0 + t)
+    wu = 0.25*wt
+
+    # Gauss-Legendre in v, mapped from [-1,1] to [0,1]
+    s, ws = np.polynomial.legendre.leggauss(n)
+    v = 0.5*(1.0 + s)
+    wv = 0.5*ws
+
+    U, V = np.meshgrid(u, v, indexing='ij')
+    xq = np.column_stack((U.ravel(), ((1.0 - U)*V).ravel()))
+    # Weights sum to the area 1/2 of the reference triangle; scale so
+    # they sum to one
+    wq = 2.0*np.outer(wu, wv).ravel()
+
+    return (wq, xq)
+
+  @staticmethod
+  def _fileName(order : int, cacheDir : str):
+    return os.path.join(cacheDir, 'CollapsedGauss{}.npz'.format(order))
+
+  @staticmethod
+  def _read(order : int, cacheDir : str):
+    fileName = CollapsedGaussRule._fileName(order, cacheDir)
+    if not os.path.isfile(fileName):
+      return None
+    with np.load(fileName) as data:
+      return (data['w'], data['x'])
+
+  @staticmethod
+  def _write(order : int, cacheDir : str, rule):
+    os.makedirs(cacheDir, exist_ok=True)
+    (wq, xq) = rule
+    np.savez(CollapsedGaussRule._fileName(order, cacheDir), w=wq, x=xq)
@@ -0,0 +1,214 @@
+# --------------------------------------------------------------------------
+# A triangular mesh stored in flat numpy arrays. This is the compressed
+# mesh format promised in LoadableMesh: build a mesh with LoadableMesh (or
+# directly from arrays), then convert it to a CompactMesh for use. Instead
+# of tuples, dicts and per-entity sets, a CompactMesh stores
+# (*) verts      -- (nVerts, 2) float64 vertex coordinates
+# (*) elems      -- (nElems, 3) int32 element vertex indices, ordered
+#                   counterclockwise (clockwise input elements are
+#                   reordered on construction)
+# (*) sides      -- (nSides, 2) int32 side vertex indices, sorted
+# (*) sideLabels -- (nSides,) int labels
+# (*) elemToEdges -- (nElems, 3) int32 side indices for each element
+# and vertex-to-element and side-to-element adjacency in CSR form. The
+# mesh is immutable, so derived data can be cached for its whole life.
+# --------------------------------------------------------------------------
+
+import numpy as np
+from .BaseMesh import BaseMesh
+from .LoadableMesh import LoadableMesh
+from .MeshTopology import matchElemEdges
+
+
+def _readOnly(a, dtype):
+  rtn = np.array(a, dtype=dtype)
+  rtn.setflags(write=False)
+  return rtn
+
+
+def _invertMap(entityToItems, numItems : int):
+  '''
+  Given an (nEntity, k) array listing the items on each entity, build the
+  CSR inverse map (ptr, entities) listing the entities on each item.
+  '''
+  flat = entityToItems.ravel()
+  order = np.argsort(flat, kind='stable')
+  ptr = np.zeros(numItems+1, dtype=np.int64)
+  np.cumsum(np.bincount(flat, minlength=numItems), out=ptr[1:])
+  entities = (order // entityToItems.shape[1]).astype(np.int32)
+  return (_readOnly(ptr, np.int64), _readOnly(entities, np.int32))
+
+
+class CompactMesh(BaseMesh):
+  '''
+  Array-backed triangular mesh implementing the BaseMesh interface. It
+  provides the same array views (vertArray(), elemArray(), sideArray(),
+  sideSetArray()) and derived-data cache (cached()) as LoadableMesh, so
+  it can be used anywhere a LoadableMesh is used for computation.
+  '''
+
+  def __init__(self, verts, elems, sides, sideLabels = None,
+               elemToEdges = None):
+    '''
+    Construct from arrays of vertex coordinates, element vertices, and side
+    vertices, plus optional side labels (all zero if not given) and the
+    element-to-side map (found by matching vertex pairs if not given).
+    Clockwise elements have their last two vertices swapped, and their
+    sides reordered to match, so that all elements are counterclockwise.
+    '''
+    super().__init__()
+
+    self.verts = _readOnly(np.reshape(verts, (-1,2)), np.double)
+    elems = np.array(np.reshape(elems, (-1,3)), dtype=np.int32)
+
+    # Orientation from the sign of the Jacobian determinant
+    X = self.verts[elems]
+    d1 = X[:,1] - X[:,0]
+    d2 = X[:,2] - X[:,0]
+    flip = d1[:,0]*d2[:,1] - d1[:,1]*d2[:,0] < 0.0
+    elems[flip] = elems[flip][:,[0,2,1]]
+    self.elems = _readOnly(elems, np.int32)
+    self.sides = _readOnly(np.sort(np.reshape(sides, (-1,2)), axis=1),
+                           np.int32)
+
+    nV = len(self.verts)
+    nS = len(self.sides)
+
+    if sideLabels is None:
+      sideLabels = np.zeros(nS, dtype=np.int64)
+    if len(sideLabels) != nS:
+      raise ValueError('Expected {} side labels, got {}'\
+                       .format(nS, len(sideLabels)))
+    self.sideLabels = _readOnly(sideLabels, np.int64)
+
+    if elemToEdges is None:
+      elemToEdges = matchElemEdges(self.elems, self.sides, nV)
+    else:
+      # Side i runs from vertex i to vertex i+1, so swapping vertices 1
+      # and 2 reverses the order of the sides
+      elemToEdges = np.array(np.reshape(elemToEdges, (-1,3)))
+      elemToEdges[flip] = elemToEdges[flip][:,::-1]
+    self.elemToEdges = _readOnly(np.reshape(elemToEdges, (-1,3)), np.int32)
+
+    # Side sets, as sorted arrays of side indices for each label
+    labels, inverse = np.unique(self.sideLabels, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(labels)+1))
+    self.sideSets = {}
+    for i, label in enumerate(labels):
+      self.sideSets[label.item()] = _readOnly(order[bounds[i]:bounds[i+1]],
+                                              np.int64)
+
+    # CSR adjacency: elements connected to each vertex and to each side
+    (self.vertToElemPtr, self.vertToElem) = _invertMap(self.elems, nV)
+    (self.sideToElemPtr, self.sideToElem) = _invertMap(self.elemToEdges, nS)
+
+    self._cache = {}
+
+  @staticmethod
+  def fromLoadableMesh(mesh : LoadableMesh):
+    '''
+    Convert a LoadableMesh to a CompactMesh.
+    '''
+    return CompactMesh(mesh.vertArray(), mesh.elemArray(), mesh.sideArray(),
+                       mesh.sideLabelArray(), mesh.elemToEdgesArray())
+
+  def toLoadableMesh(self):
+    '''
+    Convert this mesh to a LoadableMesh.
+    '''
+    mesh = LoadableMesh()
+    mesh.addVertices(self.verts)
+    mesh.addSides(self.sides, self.sideLabels)
+    mesh.addElems(self.elems)
+    return mesh
+
+  # ---- Array views and cache, as in LoadableMesh
+
+  def cached(self, key, builder):
+    '''
+    Look up a piece of derived data by key, calling builder() to create it
+    if it isn't in the cache.
+    '''
+    if key not in self._cache:
+      self._cache[key] = builder()
+    return self._cache[key]
+
+  def vertArray(self):
+    return self.verts
+
+  def elemArray(self):
+    '''
+    Element vertex indices, as the stored int32 array. Code that needs
+    int64 arithmetic on the indices (e.g., computing row*N + col keys)
+    casts them itself.
+    '''
+    return self.elems
+
+  def sideArray(self):
+    return self.sides
+
+  def elemToEdgesArray(self):
+    return self.elemToEdges
+
+  def sideLabelArray(self):
+    return self.sideLabels
+
+  def sideSetArray(self, label):
+    if label not in self.sideSets:
+      raise KeyError('No side set with label {}'.format(label))
+    return self.sideSets[label]
+
+  def getSideLabel(self, side):
+    '''
+    Look up the label of a side given by its pair of vertices
+    '''
+    a, b = min(side), max(side)
+    edges = self.elemToEdges[self.vertToElem[
+      self.vertToElemPtr[a]:self.vertToElemPtr[a+1]]].ravel()
+    for s in edges:
+      if tuple(self.sides[s]) == (a,b):
+        return self.sideLabels[s].item()
+    raise KeyError('Side ({},{}) is not in the mesh'.format(a, b))
+
+  def nbytes(self):
+    '''
+    Total size of the mesh arrays in bytes, not counting cached data
+    '''
+    arrays = [self.verts, self.elems, self.sides, self.sideLabels,
+              self.elemToEdges, self.vertToElemPtr, self.vertToElem,
+              self.sideToElemPtr, self.sideToElem]
+    arrays += list(self.sideSets.values())
+    return sum(a.nbytes for a in arrays)
+
+  # ---- BaseMesh interface
+
+  def elements(self):
+    return self.elems
+
+  def sidesWithLabel(self, label):
+    return self.sides[self.sideSetArray(label)]
+
+  def getVertexCoords(self, vertIndex):
+    return self.verts[vertIndex]
+
+  def getFacets(self, cellDim, cellIndex, facetDim):
+    if cellDim==2 and facetDim==0:
+      return self.elems[cellIndex]
+    elif cellDim==2 and facetDim==1:
+      return self.elemToEdges[cellIndex]
+    elif cellDim==1 and facetDim==0:
+      return self.sides[cellIndex]
+    raise ValueError('No facets of dimension {} for cells of dimension {}'\
+                     .format(facetDim, cellDim))
+
+  def getConnectedElems(self, cellDim, cellIndex):
+    if cellDim==0:
+      (ptr, elems) = (self.vertToElemPtr, self.vertToElem)
+    elif cellDim==1:
+      (ptr, elems) = (self.sideToElemPtr, self.sideToElem)
+    elif cellDim==2:
+      return np.array([cellIndex], dtype=np.int32)
+    else:
+      raise ValueError('Invalid cell dimension {}'.format(cellDim))
+    return elems[ptr[cellIndex]:ptr[cellIndex+1]]
@@ -0,0 +1,154 @@
+# --------------------------------------------------------------------------
+# Essential (Dirichlet) boundary conditions on side sets, imposed directly
+# on assembled CSR matrices. All operations are vectorized over the
+# constrained DOFs and work on the CSR arrays in place, so the matrix never
+# needs to be converted to a format that supports efficient row editing.
+# --------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse as sp
+from collections.abc import Iterable
+from .DiscreteSpace import DiscreteSpace
+
+
+class DirichletBC:
+  '''
+  The condition u = value for function funcID on all sides whose labels
+  are given in labels (a single label or an iterable of labels). The value
+  can be a constant, or a function value(x, y) that's called once with
+  arrays of the coordinates of all boundary nodes.
+  '''
+
+  def __init__(self, ds : DiscreteSpace, labels, value = 0.0,
+               funcID : int = 0):
+    if funcID < 0 or funcID >= ds.numFuncs():
+      raise ValueError('Function ID {} out of range for space with {} '
+                       'functions'.format(funcID, ds.numFuncs()))
+
+    if isinstance(labels, Iterable) and not isinstance(labels, str):
+      labels = tuple(labels)
+    else:
+      labels = (labels,)
+
+    self._ds = ds
+    self._labels = labels
+    self._value = value
+    self._funcID = funcID
+
+  def labels(self):
+    return self._labels
+
+  def funcID(self):
+    return self._funcID
+
+  def setValue(self, value):
+    '''
+    Replace the boundary value, e.g. for a time-dependent condition. The
+    boundary nodes don't need to be recomputed.
+    '''
+    self._value = value
+
+  def nodes(self):
+    '''
+    Return a sorted array of the indices of all vertices on the labeled
+    sides. The result is cached on the mesh.
+    '''
+    mesh = self._ds.mesh()
+
+    def build():
+      sides = mesh.sideArray()
+      sideIDs = np.concatenate([mesh.sideSetArray(label)
+                                for label in self._labels])
+      rtn = np.unique(sides[sideIDs])
+      rtn.setflags(write=False)
+      return rtn
+
+    return mesh.cached(('DirichletNodes', self._labels), build)
+
+  def dofs(self):
+    '''
+    Return the DOFs constrained by this condition, in the same order as
+    nodes().
+    '''
+    return self._ds.numFuncs()*self.nodes() + self._funcID
+
+  def values(self):
+    '''
+    Return the boundary values at the constrained DOFs.
+    '''
+    nodes = self.nodes()
+    if callable(self._value):
+      xy = self._ds.mesh().vertArray()[nodes]
+      vals = self._value(xy[:,0], xy[:,1])
+    else:
+      vals = self._value
+    return np.array(np.broadcast_to(vals, nodes.shape), dtype=np.double)
+
+  def apply(self, A, b = None, symmetric : bool = False):
+    '''
+    Impose this condition on A and b. See applyDirichletBCs().
+    '''
+    return applyDirichletBCs(A, b, (self,), symmetric)
+
+
+def applyDirichletBCs(A, b, bcs : Iterable, symmetric : bool = False):
+  '''
+  Impose a set of Dirichlet conditions on a CSR matrix A and (if it's not
+  None) a vector b, modifying both in place.
+
+  With symmetric=False, the rows of the constrained DOFs are replaced by
+  rows of the identity, and the corresponding entries of b are set to the
+  boundary values. With symmetric=True, the known values are first moved
+  to the right-hand side (b -= A g, where g holds the boundary values and
+  is zero elsewhere) and the columns of the constrained DOFs are zeroed as
+  well, so a symmetric A stays symmetric. In that case A must be stored in
+  full, not as an upper triangle.
+
+  Constrained entries are set to zero rather than removed, so A keeps its
+  sparsity structure.
+  If a DOF is constrained by more than one condition, the last one wins.
+
+  Returns (A, b).
+  '''
+  if not sp.issparse(A) or A.format != 'csr':
+    raise ValueError('Dirichlet conditions can only be applied to CSR '
+                     'matrices, got format {}'.format(getattr(A, 'format',
+                                                              type(A))))
+  N = A.shape[0]
+  A.sum_duplicates()
+
+  # Merge the conditions into a vector of boundary values
+  g = np.zeros(N)
+  isConstrained = np.zeros(N, dtype=bool)
+  for bc in bcs:
+    dofs = bc.dofs()
+    g[dofs] = bc.values()
+    isConstrained[dofs] = True
+  dofs = np.flatnonzero(isConstrained)
+
+  indptr = A.indptr
+  indices = A.indices
+  data = A.data
+
+  # Positions in data of all entries in the constrained rows
+  starts = indptr[dofs]
+  counts = indptr[dofs+1] - starts
+  offsets = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+  rowEntries = offsets + np.arange(counts.sum())
+  rows = np.repeat(dofs, counts)
+  diag = rowEntries[indices[rowEntries]==rows]
+  if len(diag) != len(dofs):
+    raise ValueError('Matrix has no diagonal entry for some constrained DOFs')
+
+  if symmetric:
+    if b is not None:
+      b -= A @ g
+    data[isConstrained[indices]] = 0.0
+
+  data[rowEntries] = 0.0
+  data[diag] = 1.0
+
+  if b is not None:
+    b[dofs] = g[dofs]
+
+  return (A, b)
@@ -1,4 +1,6 @@
 from .LoadableMesh import LoadableMesh
+from .SparsityPattern import SparsityPattern
+from .PointLocator import PointLocator
 from PyUtils import NamedObject 
 from copy import deepcopy
 import numpy as np
@@ -10,7 +12,7 @@ class DiscreteSpace:
   def __init__(self, mesh, numFuncs):
     self._mesh = mesh
     self._nf = numFuncs
-    self._nDofs = numFuncs * len(mesh.verts)
+    self._nDofs = numFuncs * len(mesh.vertArray())
 
   def numFuncs(self):
     return self._nf
@@ -45,7 +47,45 @@ class DiscreteSpace:
   
   def getDof(self, nodeID, funcID):
     return self._nf * nodeID + funcID
-  
+
+  def elemDofs(self, funcID : int):
+    '''
+    Return an (nElems, 3) integer array with the DOFs of function funcID
+    at the vertices of every element. This is the vectorized counterpart
+    of getDofs().
+    '''
+    return self._nf * self._mesh.elemArray() + funcID
+
+  def sparsityPattern(self, upper : bool = False, funcPairs = None):
+    '''
+    Return the CSR sparsity pattern and element scatter maps for matrices
+    on this space. The pattern is computed on first use and cached on the
+    mesh, so it's shared by all assemblies on this mesh that couple the
+    same functions. With upper=True, the pattern holds only the upper
+    triangle, for symmetric matrices. funcPairs lists the (testID, unkID)
+    pairs the matrix couples; if it's None, all pairs are included.
+    '''
+    mesh = self._mesh
+    if funcPairs is None:
+      funcPairs = SparsityPattern.allPairs(self._nf)
+    funcPairs = tuple(sorted(set(funcPairs)))
+    return mesh.cached(('SparsityPattern', self._nf, upper, funcPairs),
+                       lambda : SparsityPattern(mesh.elemArray(),
+                                                len(mesh.vertArray()),
+                                                self._nf, upper,
+                                                funcPairs))
+
+  def blockSparsityPattern(self):
+    '''
+    Return the node-level sparsity pattern, in which each entry is an
+    nf by nf block coupling all functions at a pair of nodes. This is
+    the block structure of BSR matrices on this space.
+    '''
+    mesh = self._mesh
+    return mesh.cached(('SparsityPattern', 1, False, ((0,0),)),
+                       lambda : SparsityPattern(mesh.elemArray(),
+                                                len(mesh.vertArray()), 1))
+
   #def evalAtNodes(self, f:callable):
 
 
@@ -59,6 +99,9 @@ class _DiscFuncElem(NamedObject):
     self._master = master
     self._funcIndex = funcIndex
 
+  def discreteSpace(self):
+    return self._master._ds
+
   def setValue(self, node, val):
     dof = self._master._ds.getDof(node, self._funcIndex)
     self._master._vec[dof] = val
@@ -68,8 +111,37 @@ class _DiscFuncElem(NamedObject):
     dofs = self._master._ds._dofsForFunc(nodes, self._funcIndex)
     nodalVals = self._master.getValues(dofs)
 
-    return phiAtQuadPts @ nodalVals
+    return phiAtQuadPts @ nodalVals.ravel()
+
+  def interpolateOnElems(self, elems, phiAtQuadPts):
+    '''
+    Vectorized version of interpolate(). Given an (nElems, 3) array of
+    element nodes, return the function's values at the quadrature points
+    of every element as an (nElems, nQuad) array.
+    '''
+    ds = self._master._ds
+    dofs = ds.numFuncs()*np.asarray(elems) + self._funcIndex
+    return self._master.getVector()[dofs] @ phiAtQuadPts.T
   
+  def nodalValues(self):
+    '''
+    Return this function's values at all mesh nodes, as a strided view
+    into the master vector.
+    '''
+    nFuncs = self._master._ds.numFuncs()
+    return self._master.getVector()[self._funcIndex::nFuncs]
+
+  def evaluateAt(self, pts, outside : float = np.nan):
+    '''
+    Evaluate this function at an (nPts, 2) array of arbitrary points,
+    returning an (nPts,) array. Points not in the mesh get the value
+    outside. The elements containing the points are found with the
+    PointLocator cached on the mesh.
+    '''
+    mesh = self._master._ds.mesh()
+    return PointLocator.forMesh(mesh).evaluate(self.nodalValues(), pts,
+                                               outside)
+
   def copyVecSlice(self):
     nDofs = self._master._ds.numDofs()
     nFuncs = self._master._ds.numFuncs()
@@ -0,0 +1,121 @@
+# --------------------------------------------------------------------------
+# Geometry for a batch of mesh edges, stored as stacked arrays, for
+# vectorized integration over boundary side sets. This is the edge
+# counterpart of TriangleBatch.
+# --------------------------------------------------------------------------
+
+import numpy as np
+from collections.abc import Iterable
+
+
+def gaussLine(order : int):
+  '''
+  Gauss-Legendre rule on [0,1] that's exact for polynomials of degree
+  order. Returns read-only arrays (s, w) of points and weights; as with
+  the triangle rules, the weights sum to one.
+  '''
+  if order < 0:
+    raise ValueError('Quadrature order should be non-negative')
+
+  if order not in gaussLine._memo:
+    t, wt = np.polynomial.legendre.leggauss(order//2 + 1)
+    s = 0.5*(1.0 + t)
+    w = 0.5*wt
+    s.setflags(write=False)
+    w.setflags(write=False)
+    gaussLine._memo[order] = (s, w)
+
+  return gaussLine._memo[order]
+
+gaussLine._memo = {}
+
+
+class EdgeBatch:
+  '''
+  Geometric data for a batch of edges. For nEdge edges, the attributes are
+  (*) sides  -- (nEdge, 2) vertex indices of each edge
+  (*) elems  -- (nEdge,) index of an element containing each edge
+  (*) A      -- (nEdge, 2) coordinates of each edge's first vertex
+  (*) t      -- (nEdge, 2) edge vectors, from the first vertex to the second
+  (*) length -- (nEdge,) edge lengths
+  (*) normal -- (nEdge, 2) unit normals, pointing out of elems. For
+                boundary edges these are the outward normals.
+  Points on an edge are parametrized as A + s t, for s in [0,1].
+  '''
+
+  def __init__(self, verts, sides, elems):
+    '''
+    Construct from an (nVerts, 2) array of vertex coordinates, an
+    (nEdge, 2) array of edge vertex indices, and the (nElem, 3) array of
+    the mesh's element vertex indices, which is used to find the element
+    on each edge.
+    '''
+    self.verts = np.asarray(verts, dtype=np.double).reshape((-1,2))
+    self.sides = np.asarray(sides, dtype=np.int64).reshape((-1,2))
+    elems = np.asarray(elems, dtype=np.int64).reshape((-1,3))
+
+    # Find an element for each edge by matching sorted vertex pairs
+    # against the element edges (v0,v1), (v1,v2), (v2,v0)
+    nV = len(self.verts)
+    elemEdges = np.stack((elems, np.roll(elems, -1, axis=1)), axis=2)
+    elemKeys = (np.min(elemEdges, axis=2)*nV
+                + np.max(elemEdges, axis=2)).ravel()
+    sideKeys = np.min(self.sides, axis=1)*nV + np.max(self.sides, axis=1)
+
+    order = np.argsort(elemKeys, kind='stable')
+    pos = np.searchsorted(elemKeys, sideKeys, sorter=order)
+    pos = np.minimum(pos, len(order)-1)
+    if len(order)==0 or np.any(elemKeys[order[pos]] != sideKeys):
+      raise ValueError('Some sides are not edges of any element')
+    match = order[pos]
+    self.elems = match // 3
+
+    # The element vertex not on the edge lies on the inner side
+    opposite = elems[self.elems, (match % 3 + 2) % 3]
+
+    self.A = self.verts[self.sides[:,0]]
+    self.t = self.verts[self.sides[:,1]] - self.A
+    self.length = np.sqrt(np.sum(self.t**2, axis=1))
+
+    self.normal = np.stack((self.t[:,1], -self.t[:,0]), axis=1)
+    self.normal /= self.length[:,np.newaxis]
+    inward = np.sum(self.normal*(self.verts[opposite] - self.A), axis=1) > 0
+    self.normal[inward] *= -1.0
+
+    # Physical quadrature points, keyed by order
+    self._quadPts = {}
+
+  @staticmethod
+  def forSides(mesh, labels):
+    '''
+    Return the geometry of the sides with the given labels (a single label
+    or an iterable of labels). The batch is cached on the mesh.
+    '''
+    if isinstance(labels, Iterable) and not isinstance(labels, str):
+      labels = tuple(labels)
+    else:
+      labels = (labels,)
+
+    def build():
+      sideIDs = np.concatenate([mesh.sideSetArray(label)
+                                for label in labels])
+      return EdgeBatch(mesh.vertArray(), mesh.sideArray()[sideIDs],
+                       mesh.elemArray())
+
+    return mesh.cached(('EdgeBatch', labels), build)
+
+  def __len__(self):
+    return len(self.sides)
+
+  def quadPts(self, order : int):
+    '''
+    Return the physical coordinates of the points of gaussLine(order) on
+    every edge in the batch, as a read-only (nEdge, nQ, 2) array.
+    '''
+    if order not in self._quadPts:
+      s, w = gaussLine(order)
+      pts = self.A[:,np.newaxis,:] + np.multiply.outer(s, self.t)\
+                                       .transpose((1,0,2))
+      pts.setflags(write=False)
+      self._quadPts[order] = pts
+    return self._quadPts[order]
@@ -0,0 +1,90 @@
+# --------------------------------------------------------------------------
+# Integrals over the mesh and error norms of discrete functions, computed
+# for all elements at once with the batched geometry in TriangleBatch and
+# the cached basis tabulations. These replace Euclidean norms of nodal
+# differences, which depend on the mesh and aren't approximations to any
+# norm of the error.
+# --------------------------------------------------------------------------
+
+import numpy as np
+from .QuadratureRule import QuadratureRule
+from .QuadratureRegistry import cheapestRule
+from .TriangleBatch import TriangleBatch
+from .BasisTabulation import tabulate
+
+
+def _rule(quad):
+  if isinstance(quad, QuadratureRule):
+    return quad
+  return cheapestRule(quad)
+
+
+def _sumOverMesh(tris : TriangleBatch, quad : QuadratureRule, vals):
+  '''
+  Sum quadrature-weighted (nElems, nQuad) values over all elements
+  '''
+  vals = np.broadcast_to(vals, (len(tris), quad.n()))
+  return np.dot(vals @ quad.W(), tris.area)
+
+
+def integrate(mesh, func, quad = 4, dfs = None):
+  '''
+  Compute the integral of func over the mesh. The function is called
+  once as func(x, y, dfVals), with arrays of the quadrature points on all
+  elements, where dfVals holds the values of the optional discrete
+  function dfs at those points (or is None). The quad argument is a
+  quadrature rule or an integer degree, as in QuadratureTwoForm.
+  '''
+  quad = _rule(quad)
+  tris = TriangleBatch.forMesh(mesh)
+  X = tris.quadPts(quad)
+
+  if dfs is None:
+    dfVals = None
+  else:
+    dfVals = dfs.interpolateOnElems(tris.elems, tabulate(quad).phi)
+
+  return _sumOverMesh(tris, quad, func(X[:,:,0], X[:,:,1], dfVals))
+
+
+def l2Error(uh, uExact = None, quad = 4):
+  '''
+  Compute the L2 norm of uh - uExact, where uh is a component of a
+  discrete function (e.g., u[0]) and uExact(x, y) is a vectorized
+  function. If uExact is None, the L2 norm of uh is returned.
+  '''
+  quad = _rule(quad)
+  tris = TriangleBatch.forMesh(uh.discreteSpace().mesh())
+
+  err = uh.interpolateOnElems(tris.elems, tabulate(quad).phi)
+  if uExact is not None:
+    X = tris.quadPts(quad)
+    err = err - uExact(X[:,:,0], X[:,:,1])
+
+  return np.sqrt(_sumOverMesh(tris, quad, err**2))
+
+
+def h1SemiError(uh, gradExact = None, quad = 4):
+  '''
+  Compute the H1 seminorm of uh - uExact, i.e., the L2 norm of the
+  difference of the gradients. The exact gradient is given by a
+  vectorized function gradExact(x, y) returning the pair (du/dx, du/dy).
+  If gradExact is None, the H1 seminorm of uh is returned.
+  '''
+  quad = _rule(quad)
+  ds = uh.discreteSpace()
+  tris = TriangleBatch.forMesh(ds.mesh())
+  tab = tabulate(quad)
+
+  # Gradients of uh at the quadrature points: J^{-T} grad_ref(phi) u_loc
+  uLoc = uh.nodalValues()[tris.elems]
+  gradRef = np.tensordot(uLoc, tab.gradPhiRef, axes=([1],[2]))
+  grad = np.matmul(gradRef, np.swapaxes(tris.JtInv, 1, 2))
+
+  if gradExact is not None:
+    X = tris.quadPts(quad)
+    (ux, uy) = gradExact(X[:,:,0], X[:,:,1])
+    grad[:,:,0] -= ux
+    grad[:,:,1] -= uy
+
+  return np.sqrt(_sumOverMesh(tris, quad, np.sum(grad**2, axis=2)))
@@ -3,13 +3,84 @@
 # A simple class for conforming triangular meshes. The class is
 # designed for simplicity of constructing the mesh.
 #
-# TODO: I plan to write another mesh class with compressed storage. The user
-# would then use LoadableMesh to build the mesh but then write it into a
-# compressed mesh format for use.
+# For large meshes, use LoadableMesh to build the mesh and then convert it
+# with CompactMesh.fromLoadableMesh() to the array-based CompactMesh format
+# for use.
 #
 # Katharine Long, Sep 2020
 # For Math 5344
 # --------------------------------------------------------------------------
+import numpy as np
+from .MeshTopology import (matchElemEdges, deriveSides, markerSideLabels)
+
+
+# Add each id to the sets sets[t] for the targets t in the corresponding
+# row of targets, an (n, k) array. The grouping by target is done with a
+# sort, so each touched set is updated only once.
+def _addToSets(sets, targets, ids):
+    flat = targets.ravel()
+    order = np.argsort(flat, kind='stable')
+    flatIDs = np.repeat(ids, targets.shape[1])[order].tolist()
+    uniqueTargets, starts = np.unique(flat[order], return_index=True)
+    bounds = starts.tolist() + [len(flatIDs)]
+    for t, a, b in zip(uniqueTargets.tolist(), bounds[:-1], bounds[1:]):
+        sets[t].update(flatIDs[a:b])
+
+
+# Storage for one of the mesh's lists (vertices, elements, etc). The data
+# are kept either as a Python list, with tuples for rows, or as a read-only
+# numpy array, and converted from one form to the other only when the other
+# is asked for. Bulk additions extend the array, so building a mesh in bulk
+# and then using only its arrays never creates per-entity Python objects.
+class _ListOrArray:
+
+    def __init__(self, width, dtype):
+        # Number of columns, or None for a one-dimensional list
+        self.width = width
+        self.dtype = dtype
+        self._list = []
+        self._array = None
+
+    def __len__(self):
+        if self._list is not None:
+            return len(self._list)
+        return len(self._array)
+
+    # The data as a list, built from the array the first time it's used
+    def asList(self):
+        if self._list is None:
+            if self.width is None:
+                self._list = self._array.tolist()
+            else:
+                self._list = list(map(tuple, self._array.tolist()))
+        return self._list
+
+    # The data as a read-only array, built from the list if it's out of date
+    def asArray(self):
+        if self._array is None:
+            shape = (-1,) if self.width is None else (-1, self.width)
+            self._array = np.array(self._list,
+                                   dtype=self.dtype).reshape(shape)
+            self._array.setflags(write=False)
+        return self._array
+
+    # Add one item, through the list
+    def append(self, item):
+        self.asList().append(item)
+        self._array = None
+
+    # Add an array of items; the list is dropped and rebuilt if needed
+    def extend(self, items):
+        if len(self) == 0:
+            self._array = np.array(items, dtype=self.dtype)
+        else:
+            self._array = np.concatenate((self.asArray(),
+                                          np.asarray(items,
+                                                     dtype=self.dtype)))
+        self._array.setflags(write=False)
+        self._list = None
+
+
 class LoadableMesh:
 
     # Initialize an empty mesh.
@@ -19,7 +90,11 @@ class LoadableMesh:
         # be used as hashable keys.
         # Example: [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)] for the
         # corners of the unit square
-        self.verts = []
+        #
+        # This list and the four below are properties. After a bulk
+        # addition they're stored as arrays (see vertArray(), etc) and the
+        # lists are only built if they're used.
+        self._verts = _ListOrArray(2, np.double)
 
         # Store elements as list of (a,b,c) vertex index triplets, ordered
         # counterclockwise in the triangle. The triplets are
@@ -27,48 +102,139 @@ class LoadableMesh:
         # be used as hashable keys.
         # Example: [(0,1,2), (2,3,0)] for the triangulation of the unit
         # square with the diagonal running from (0.0,0.0) to (1.0,1.0)
-        self.elems = []
+        self._elems = _ListOrArray(3, np.int64)
 
         # Store sides as list of (p,q) vertex index pairs, in sorted order.
         # The pairs are stored as tuples (x,y) rather than lists [x,y] so
         # that they can be used as hashable keys.
         # Example: [(0,1), (1,2), (2,3), (0,3), (0,2)] for the edges in the
         # triangulation of the unit square.
-        self.sides = []
+        self._sides = _ListOrArray(2, np.int64)
 
         # Map to look to triplets of edges for each element
-        self.elemToEdgesMap = []
+        self._elemToEdgesMap = _ListOrArray(3, np.int64)
+
+        # The lookup structures below are available as attributes (see the
+        # properties further down). The bulk construction functions
+        # addVertices(), addSides() and addElems() don't update them;
+        # instead they're marked out of date by setting them to None, and
+        # are rebuilt from the lists above the next time they're used.
 
         # Side sets are stored in a dictionary with the label as key
         # and the set of side indices having that label as the value.
         # Syntax: {key1 : val1, key2 : val2, etc}
         # Example: {0: set([4]), 1 : set([0,2]), 2 : set([1,3])}
-        self.sideSets = {}
+        self._sideSets = {}
 
         # Dictionary that maps vertex's position (x,y) to vertex index.
         # Example: {(0,0) : 0, (1,0) : 1, (1,1) : 2, (0,1) : 3}
-        self.vertToIndexMap = {}
+        self._vertToIndexMap = {}
+
+        # Sorted x+iy keys of the vertices, used by addVertices() to check
+        # for duplicates without going through the dictionary
+        self._sortedVertKeys = None
 
         # Dictionary that maps side's vertex pair (p,q) to side index
         # Example: {(0,1) : 0, (1,2) : 1, (2,3) : 2, (0,3) : 3, (0,2) : 4}
-        self.sideToIndexMap = {}
+        self._sideToIndexMap = {}
 
         # For each vertex, list the elements that are attached (cofacets).
         # Example: [set([0,1]), set([0]), set([0,1]), set([1])]
-        self.connectedElemsForVert = []
+        self._connectedElemsForVert = []
 
         # For each side, list the elements that are attached.
         # Example: [set([0]), set([0]), set([1]), set([1]), set([0,1])]
-        self.connectedElemsForSide = []
+        self._connectedElemsForSide = []
 
         # Each side has a label
-        self.sideLabels = []
+        self._sideLabels = _ListOrArray(None, None)
+
+        # Cache for array views of the mesh and other derived data such as
+        # element geometry. It's emptied whenever the mesh is modified.
+        self._cache = {}
+
+
+    # Lists of vertices, elements, sides, etc, built on demand after bulk
+    # additions
+
+    @property
+    def verts(self):
+        return self._verts.asList()
+
+    @property
+    def elems(self):
+        return self._elems.asList()
+
+    @property
+    def sides(self):
+        return self._sides.asList()
+
+    @property
+    def elemToEdgesMap(self):
+        return self._elemToEdgesMap.asList()
+
+    @property
+    def sideLabels(self):
+        return self._sideLabels.asList()
+
+
+    # Lookup structures, rebuilt on demand after bulk additions
+
+    @property
+    def sideSets(self):
+        if self._sideSets is None:
+            labels = self.sideLabelArray()
+            order = np.argsort(labels, kind='stable')
+            uniqueLabels, starts = np.unique(labels[order],
+                                             return_index=True)
+            bounds = starts.tolist() + [len(labels)]
+            order = order.tolist()
+            self._sideSets = {}
+            for label, a, b in zip(uniqueLabels.tolist(), bounds[:-1],
+                                   bounds[1:]):
+                self._sideSets[label] = set(order[a:b])
+        return self._sideSets
+
+    @property
+    def vertToIndexMap(self):
+        if self._vertToIndexMap is None:
+            self._vertToIndexMap = dict(zip(self.verts,
+                                            range(len(self.verts))))
+        return self._vertToIndexMap
+
+    @property
+    def sideToIndexMap(self):
+        if self._sideToIndexMap is None:
+            self._sideToIndexMap = dict(zip(self.sides,
+                                            range(len(self.sides))))
+        return self._sideToIndexMap
+
+    @property
+    def connectedElemsForVert(self):
+        if self._connectedElemsForVert is None:
+            self._connectedElemsForVert = [set() for v in
+                                           range(len(self._verts))]
+            elems = self.elemArray()
+            _addToSets(self._connectedElemsForVert, elems,
+                       np.arange(len(elems)))
+        return self._connectedElemsForVert
+
+    @property
+    def connectedElemsForSide(self):
+        if self._connectedElemsForSide is None:
+            self._connectedElemsForSide = [set() for s in
+                                           range(len(self._sides))]
+            edges = self.elemToEdgesArray()
+            _addToSets(self._connectedElemsForSide, edges,
+                       np.arange(len(edges)))
+        return self._connectedElemsForSide
 
 
     # Add a new vertex to the mesh. Vertex is input as (x,y) or [x,y]
     def addVertex(self, vert):
         # Copy the pair into a tuple (just in case it's not already a tuple)
         v = tuple(vert)
+        self._cache.clear()
         # Ensure that the vertex isn't a duplicate
         if v in self.vertToIndexMap:
             raise RuntimeError('Added vertex (%g,%g) twice' % v)
@@ -77,9 +243,10 @@ class LoadableMesh:
             vertIndex = len(self.verts)
             # Store the mapping (x,y) <==> index
             self.vertToIndexMap[v] = vertIndex
-            self.verts.append(v)
             # Allocate an empty set for the set of connected elements
             self.connectedElemsForVert.append(set())
+            self._verts.append(v)
+            self._sortedVertKeys = None
 
         # Return the index assigned to this vertex
         return vertIndex
@@ -91,14 +258,15 @@ class LoadableMesh:
         side = [a,b] # store as temp list so we can sort the verts
         side.sort()
         s = tuple(side) # Copy into tuple so it's hashable
+        self._cache.clear()
         # Get an index for the new side
         index = len(self.sides)
         # Set up the mappings (p,q) <==> index
-        self.sides.append(s)
         self.sideToIndexMap[s] = index
 
         # Allocate an empty set for the set of connected elements
         self.connectedElemsForSide.append(set())
+        self._sides.append(s)
 
         # Put this side in the set of sides associated with its label.
         # If that set doesn't exist yet, create it
@@ -108,7 +276,7 @@ class LoadableMesh:
             self.sideSets[label].add(index)
 
         # Record the label for this side
-        self.sideLabels.append(label)
+        self._sideLabels.append(label)
 
         # Return the index assigned to this side
         return index
@@ -122,9 +290,10 @@ class LoadableMesh:
 
         # Put the indices into a tuple
         abc = (a,b,c)
+        self._cache.clear()
 
         # Store the new element
-        self.elems.append(abc)
+        self._elems.append(abc)
 
         # For each of the vertices, add this element to the vertex's
         # set of connected elements
@@ -147,13 +316,174 @@ class LoadableMesh:
             self.connectedElemsForSide[sideIndex].add(elemIndex)
             # Record the three edges for this element
             edgeList.append(sideIndex)
-        self.elemToEdgesMap.append(tuple(edgeList))
+        self._elemToEdgesMap.append(tuple(edgeList))
 
 
         # Return the index assigned to this element
         return elemIndex
 
 
+    # Add many vertices at once, given as an (n,2) array of (x,y) pairs.
+    # Duplicates among the new vertices are detected by sorting them, and
+    # duplicates of existing vertices by a binary search in the sorted
+    # existing vertices, rather than one dict probe at a time. Vertices
+    # are sorted as complex numbers x+iy, which sort by x and then y.
+    # Return the array of indices assigned to the new vertices.
+    def addVertices(self, verts):
+        V = np.asarray(verts, dtype=np.double).reshape((-1,2))
+        n = len(V)
+        start = len(self._verts)
+
+        newKeys = np.sort(V[:,0] + 1j*V[:,1])
+        dup = np.flatnonzero(newKeys[1:] == newKeys[:-1])
+
+        if len(dup) == 0 and start > 0:
+            if self._sortedVertKeys is None:
+                old = self.vertArray()
+                self._sortedVertKeys = np.sort(old[:,0] + 1j*old[:,1])
+            oldKeys = self._sortedVertKeys
+            pos = np.searchsorted(oldKeys, newKeys)
+            found = pos < len(oldKeys)
+            found[found] = oldKeys[pos[found]] == newKeys[found]
+            dup = np.flatnonzero(found)
+            if len(dup) == 0:
+                self._sortedVertKeys = np.insert(oldKeys, pos, newKeys)
+        elif len(dup) == 0:
+            self._sortedVertKeys = newKeys
+
+        if len(dup) > 0:
+            v = newKeys[dup[0]]
+            raise RuntimeError('Added vertex (%g,%g) twice' % (v.real, v.imag))
+
+        self._cache.clear()
+        self._verts.extend(V)
+        self._vertToIndexMap = None
+        self._connectedElemsForVert = None
+
+        return np.arange(start, start+n)
+
+
+    # Add many sides at once, given as an (n,2) array of vertex index
+    # pairs. The labels can be a single label for all the new sides or a
+    # sequence with one label per side. Return the array of indices
+    # assigned to the new sides.
+    def addSides(self, sides, labels):
+        S = np.sort(np.asarray(sides, dtype=np.int64).reshape((-1,2)), axis=1)
+        n = len(S)
+        start = len(self._sides)
+        self._cache.clear()
+
+        self._sides.extend(S)
+        self._sideLabels.extend(np.broadcast_to(np.asarray(labels), (n,)))
+        self._sideToIndexMap = None
+        self._connectedElemsForSide = None
+        self._sideSets = None
+
+        return np.arange(start, start+n)
+
+
+    # Add many elements at once, given as an (n,3) array of vertex index
+    # triplets. As with addElem, each element edge must already have been
+    # added as a side. Edges are matched to sides with a sort, unless the
+    # side indices of the element edges are given in elemToEdges. Return
+    # the array of indices assigned to the new elements.
+    def addElems(self, elems, elemToEdges=None):
+        E = np.asarray(elems, dtype=np.int64).reshape((-1,3))
+        n = len(E)
+        start = len(self._elems)
+        numVerts = len(self._verts)
+
+        if n > 0 and (E.min() < 0 or E.max() >= numVerts):
+            raise RuntimeError('Element vertex index out of range')
+        if elemToEdges is not None:
+            edges = np.asarray(elemToEdges, dtype=np.int64).reshape((-1,3))
+        else:
+            try:
+                edges = matchElemEdges(E, self.sideArray(), numVerts)
+            except ValueError:
+                raise RuntimeError('Some element sides are not in mesh')
+        self._cache.clear()
+
+        self._elems.extend(E)
+        self._elemToEdgesMap.extend(edges)
+        self._connectedElemsForVert = None
+        self._connectedElemsForSide = None
+
+        return np.arange(start, start+n)
+
+
+    # Add elements given as an (n,3) array of vertex index triplets,
+    # deriving the sides from the elements rather than requiring them to be
+    # added first. Each side shared by two elements is added once. Interior
+    # sides get label 0, and boundary sides are labeled with the vertex
+    # boundary markers (one per vertex, as in a Triangle .node file) as
+    # described in MeshTopology.markerSideLabels; with no markers, boundary
+    # sides get label 1. The mesh must not have any sides yet. Return the
+    # array of indices assigned to the new elements.
+    def addElemsAndSides(self, elems, vertMarkers=None):
+        if len(self._sides) > 0:
+            raise RuntimeError('Mesh already has sides')
+        E = np.asarray(elems, dtype=np.int64).reshape((-1,3))
+        numVerts = len(self._verts)
+        if len(E) > 0 and (E.min() < 0 or E.max() >= numVerts):
+            raise RuntimeError('Element vertex index out of range')
+        try:
+            (sides, elemToEdges, sideToElems, isBoundary) \
+                = deriveSides(E, numVerts)
+        except ValueError as e:
+            raise RuntimeError(str(e))
+        self.addSides(sides, markerSideLabels(sides, isBoundary, vertMarkers))
+        return self.addElems(E, elemToEdges)
+
+
+    # Look up a piece of derived data (array views, geometry, etc) by key.
+    # If it isn't in the cache, call builder() to create it. Cached
+    # data are discarded whenever the mesh is modified.
+    def cached(self, key, builder):
+        if key not in self._cache:
+            self._cache[key] = builder()
+        return self._cache[key]
+
+
+    # Vertex coordinates as a read-only (nVerts, 2) array
+    def vertArray(self):
+        return self._verts.asArray()
+
+
+    # Element vertex indices as a read-only (nElems, 3) array
+    def elemArray(self):
+        return self._elems.asArray()
+
+
+    # Side vertex indices as a read-only (nSides, 2) array
+    def sideArray(self):
+        return self._sides.asArray()
+
+
+    # Side indices of the edges of each element, as a read-only (nElems, 3)
+    # array
+    def elemToEdgesArray(self):
+        return self._elemToEdgesMap.asArray()
+
+
+    # Side labels as a read-only (nSides,) array
+    def sideLabelArray(self):
+        return self._sideLabels.asArray()
+
+
+    # Indices of the sides having a given label, as a read-only sorted
+    # array. Raises a KeyError if there's no side set with that label.
+    def sideSetArray(self, label):
+        def build():
+            rtn = np.flatnonzero(self.sideLabelArray()==label)
+            rtn.setflags(write=False)
+            return rtn
+        rtn = self.cached(('sideSetArray', label), build)
+        if len(rtn)==0:
+            raise KeyError('No side set with label %s' % str(label))
+        return rtn
+
+
     # Look up the label for a side
     def getSideLabel(self, side):
         sideIndex = self.sideToIndexMap[side]
@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------
+# Matrix-free application of a set of two-forms, for problems whose
+# assembled matrix (plus solver workspace) doesn't fit in memory.
+# --------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse.linalg as spla
+from collections.abc import Iterable
+from .DiscreteSpace import DiscreteSpace
+from .TriangleBatch import TriangleBatch
+from .TwoForm import (groupTwoForms, sumLocalMats)
+from .EdgeBatch import EdgeBatch
+from .BoundaryForm import (isBoundaryForm, groupBoundaryForms,
+                           sumBoundaryLocals)
+
+
+class MatrixFreeOperator(spla.LinearOperator):
+  '''
+  A scipy LinearOperator that applies the sum of a set of two-forms
+  element by element, without ever forming the global matrix. Each
+  product gathers the input vector by element DOFs, applies the local
+  matrices, and scatter-adds the result.
+
+  Elements are processed in chunks of chunkSize. The geometry and local
+  matrices for a chunk are computed from the vertex coordinates when
+  needed and discarded afterwards, so the memory used beyond the mesh
+  itself is proportional to the chunk size rather than to the number of
+  matrix nonzeros. Boundary two-forms are applied over their whole side
+  sets at once.
+  '''
+
+  def __init__(self, ds : DiscreteSpace, twoForms : Iterable,
+               chunkSize : int = 65536):
+    N = ds.numDofs()
+    super().__init__(dtype=np.double, shape=(N,N))
+
+    if chunkSize <= 0:
+      raise ValueError('Chunk size should be positive')
+
+    twoForms = tuple(twoForms)
+    self._ds = ds
+    self._twoFormGroups = groupTwoForms(f for f in twoForms
+                                        if not isBoundaryForm(f))
+    self._bdryTwoFormGroups = groupBoundaryForms(f for f in twoForms
+                                                 if isBoundaryForm(f))
+    self._chunkSize = chunkSize
+
+  def _apply(self, x, transpose : bool):
+
+    nf = self._ds.numFuncs()
+    mesh = self._ds.mesh()
+    verts = mesh.vertArray()
+    elems = mesh.elemArray()
+
+    x = np.ravel(x)
+    y = np.zeros(self.shape[0])
+
+    for start in range(0, len(elems), self._chunkSize):
+      chunk = elems[start:start+self._chunkSize]
+      tris = TriangleBatch(verts, chunk)
+
+      for (testID, unkID), forms in self._twoFormGroups.items():
+        A_loc = sumLocalMats(forms, tris, chunk)
+        self._applyLocal(A_loc, nf*chunk + testID, nf*chunk + unkID,
+                         x, y, transpose)
+
+    for (labels, testID, unkID), forms in self._bdryTwoFormGroups.items():
+      edges = EdgeBatch.forSides(mesh, labels)
+      A_loc = sumBoundaryLocals(forms, edges, edges.sides)
+      self._applyLocal(A_loc, nf*edges.sides + testID,
+                       nf*edges.sides + unkID, x, y, transpose)
+
+    return y
+
+  @staticmethod
+  def _applyLocal(A_loc, testDofs, unkDofs, x, y, transpose : bool):
+    '''
+    Apply a stack of local matrices to x, adding the result into y
+    '''
+    if transpose:
+      yLoc = np.einsum('eji,ej->ei', A_loc, x[testDofs])
+      np.add.at(y, unkDofs.ravel(), yLoc.ravel())
+    else:
+      yLoc = np.einsum('eij,ej->ei', A_loc, x[unkDofs])
+      np.add.at(y, testDofs.ravel(), yLoc.ravel())
+
+  def _matvec(self, x):
+    return self._apply(x, transpose=False)
+
+  def _rmatvec(self, x):
+    return self._apply(x, transpose=True)
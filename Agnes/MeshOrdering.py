@@ -0,0 +1,152 @@
+# --------------------------------------------------------------------------
+# Renumbering of mesh vertices and elements. Meshes straight from Triangle
+# or from uniform refinement have vertex numbers scattered over the domain,
+# so assembly gathers and scatters through memory at random and the
+# matrices have a large bandwidth, which increases fill in sparse LU. The
+# orderings here put nearby vertices at nearby indices:
+# (*) 'rcm'     -- reverse Cuthill-McKee on the vertex graph, which
+#                  minimizes bandwidth
+# (*) 'hilbert' -- position along a Hilbert curve through the vertices
+# (*) 'morton'  -- position along a Morton (Z-order) curve
+# Elements and sides are then sorted by their renumbered vertices.
+# --------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from .LoadableMesh import LoadableMesh
+from .CompactMesh import CompactMesh
+
+
+def _gridCoords(verts, bits : int):
+  '''
+  Scale vertex coordinates to integers in [0, 2^bits)
+  '''
+  lo = np.min(verts, axis=0)
+  span = np.max(np.max(verts, axis=0) - lo)
+  if span == 0.0:
+    span = 1.0
+  n = (1 << bits) - 1
+  g = np.floor((verts - lo)/span*n).astype(np.int64)
+  return (g[:,0], g[:,1])
+
+
+def mortonKeys(verts, bits : int = 16):
+  '''
+  Position of each vertex along a Morton (Z-order) curve, found by
+  interleaving the bits of its scaled coordinates.
+  '''
+  (x, y) = _gridCoords(np.asarray(verts), bits)
+  key = np.zeros(len(x), dtype=np.int64)
+  for b in range(bits):
+    key |= ((x >> b) & 1) << (2*b)
+    key |= ((y >> b) & 1) << (2*b+1)
+  return key
+
+
+def hilbertKeys(verts, bits : int = 16):
+  '''
+  Position of each vertex along a Hilbert curve through the square
+  containing the mesh. This is the usual bit-by-bit conversion from
+  coordinates to curve position, applied to all vertices at once.
+  '''
+  (x, y) = _gridCoords(np.asarray(verts), bits)
+  key = np.zeros(len(x), dtype=np.int64)
+  n = 1 << bits
+  s = n >> 1
+  while s > 0:
+    rx = (x & s) > 0
+    ry = (y & s) > 0
+    key += s*s*((3*rx) ^ ry)
+    # Rotate the quadrant so the curve is continuous
+    flip = ~ry & rx
+    x = np.where(flip, n-1-x, x)
+    y = np.where(flip, n-1-y, y)
+    swap = ~ry
+    (x, y) = (np.where(swap, y, x), np.where(swap, x, y))
+    s >>= 1
+  return key
+
+
+def vertexOrdering(mesh, method : str = 'rcm'):
+  '''
+  Compute a new ordering of the mesh vertices. Returns an array listing
+  the old index of each vertex in the new order. The method is 'rcm',
+  'hilbert' or 'morton'.
+  '''
+  verts = mesh.vertArray()
+  if method == 'rcm':
+    sides = mesh.sideArray()
+    nV = len(verts)
+    graph = sp.csr_matrix((np.ones(len(sides)), (sides[:,0], sides[:,1])),
+                          shape=(nV, nV))
+    graph = (graph + graph.T).tocsr()
+    return reverse_cuthill_mckee(graph, symmetric_mode=True)\
+      .astype(np.int64)
+  elif method == 'hilbert':
+    return np.argsort(hilbertKeys(verts), kind='stable')
+  elif method == 'morton':
+    return np.argsort(mortonKeys(verts), kind='stable')
+  raise ValueError('Unknown ordering \'{}\'; expected one of {}'\
+                   .format(method, ['rcm', 'hilbert', 'morton']))
+
+
+def renumberMesh(mesh, ordering = 'rcm'):
+  '''
+  Renumber the vertices of a mesh, given either the name of an ordering
+  method (see vertexOrdering()) or an array listing the old index of each
+  vertex in the new order. Elements are then sorted by their smallest new
+  vertex index (then the others), and sides by their new vertices, so
+  that elements and sides touching nearby vertices are also nearby.
+  Element vertices keep their cyclic order, so elements stay
+  counterclockwise, and side labels go with their sides.
+
+  Returns (newMesh, vertOrder). The new mesh is built from scratch, so all
+  its maps and side sets are consistent with the new numbering; it is a
+  CompactMesh if the input is, and otherwise a LoadableMesh. A vector of
+  nodal values u on the old mesh is u[vertOrder] on the new one.
+  '''
+  if isinstance(ordering, str):
+    vertOrder = vertexOrdering(mesh, ordering)
+  else:
+    vertOrder = np.asarray(ordering, dtype=np.int64)
+
+  verts = mesh.vertArray()
+  nV = len(verts)
+  if len(vertOrder) != nV or not np.array_equal(np.sort(vertOrder),
+                                                np.arange(nV)):
+    raise ValueError('Vertex ordering is not a permutation of the vertices')
+
+  newIndex = np.empty(nV, dtype=np.int64)
+  newIndex[vertOrder] = np.arange(nV)
+
+  # Renumber and sort the sides
+  sides = np.sort(newIndex[mesh.sideArray()], axis=1)
+  sideOrder = np.lexsort((sides[:,1], sides[:,0]))
+  newSideIndex = np.empty(len(sides), dtype=np.int64)
+  newSideIndex[sideOrder] = np.arange(len(sides))
+  labels = mesh.sideLabelArray()[sideOrder]
+
+  # Renumber and sort the elements. Rotate each element so its smallest
+  # vertex comes first; this keeps the orientation, and the element edges
+  # rotate along with the vertices.
+  elems = newIndex[mesh.elemArray()]
+  edges = newSideIndex[mesh.elemToEdgesArray()]
+  shift = np.argmin(elems, axis=1)[:,np.newaxis]
+  rot = (shift + np.arange(3)) % 3
+  elems = np.take_along_axis(elems, rot, axis=1)
+  edges = np.take_along_axis(edges, rot, axis=1)
+  elemOrder = np.lexsort((elems[:,2], elems[:,1], elems[:,0]))
+  elems = elems[elemOrder]
+  edges = edges[elemOrder]
+
+  if isinstance(mesh, CompactMesh):
+    newMesh = CompactMesh(verts[vertOrder], elems, sides[sideOrder],
+                          labels, edges)
+  else:
+    newMesh = LoadableMesh()
+    newMesh.addVertices(verts[vertOrder])
+    newMesh.addSides(sides[sideOrder], labels)
+    newMesh.addElems(elems, edges)
+
+  return (newMesh, vertOrder)
@@ -0,0 +1,106 @@
+# --------------------------------------------------------------------------
+# Vectorized routines for mesh connectivity, working on arrays of vertex
+# indices. These are shared by the mesh classes and mesh builders, which
+# would otherwise do the same work with per-entity dict lookups.
+# --------------------------------------------------------------------------
+
+import warnings
+import numpy as np
+
+
+def matchElemEdges(elems, sides, numVerts : int):
+  '''
+  Find the index of each element edge in an array of sides. Edge i of an
+  element runs from vertex i to vertex (i+1)%3. If a side appears more
+  than once, the last copy is used, as with LoadableMesh's side map.
+  Returns an (nElems, 3) array, and raises a ValueError if some element
+  edge isn't a side.
+  '''
+  elems = np.asarray(elems, dtype=np.int64).reshape((-1,3))
+  sides = np.asarray(sides, dtype=np.int64).reshape((-1,2))
+
+  a = elems
+  b = np.roll(elems, -1, axis=1)
+  elemKeys = np.minimum(a, b)*numVerts + np.maximum(a, b)
+  sideKeys = np.min(sides, axis=1)*numVerts + np.max(sides, axis=1)
+
+  order = np.argsort(sideKeys, kind='stable')
+  pos = np.searchsorted(sideKeys, elemKeys, side='right', sorter=order) - 1
+  pos = np.maximum(pos, 0)
+  if len(order)==0 or np.any(sideKeys[order[pos]] != elemKeys):
+    raise ValueError('Some element edges are not sides of the mesh')
+  return order[pos]
+
+
+def deriveSides(elems, numVerts : int = None):
+  '''
+  Find the sides of a mesh from its elements alone. Returns
+  (*) sides       -- (nSides, 2) array of unique sides, each with sorted
+                     vertices, in order of increasing (min, max) vertex
+  (*) elemToEdges -- (nElems, 3) array of the side index of each element
+                     edge, where edge i runs from vertex i to (i+1)%3
+  (*) sideToElems -- (nSides, 2) array of the elements on each side, with
+                     -1 in the second column for boundary sides
+  (*) isBoundary  -- (nSides,) boolean array, true for sides on only one
+                     element
+  Raises a ValueError if some side is shared by more than two elements.
+  '''
+  elems = np.asarray(elems, dtype=np.int64).reshape((-1,3))
+  if numVerts is None:
+    numVerts = elems.max()+1 if len(elems)>0 else 0
+
+  a = elems
+  b = np.roll(elems, -1, axis=1)
+  edgeKeys = (np.minimum(a, b)*numVerts + np.maximum(a, b)).ravel()
+
+  (keys, inverse, counts) = np.unique(edgeKeys, return_inverse=True,
+                                      return_counts=True)
+  if np.any(counts > 2):
+    raise ValueError('Some sides are shared by more than two elements')
+
+  sides = np.column_stack((keys // numVerts, keys % numVerts))
+  elemToEdges = inverse.reshape((-1,3))
+  isBoundary = (counts == 1)
+
+  # The edges sorted by side put each side's elements next to each other.
+  # The first is in column 0, and the second (if any) in column 1.
+  order = np.argsort(inverse, kind='stable')
+  first = np.zeros(len(keys), dtype=np.int64)
+  np.cumsum(counts[:-1], out=first[1:])
+  sideToElems = np.full((len(keys), 2), -1, dtype=np.int64)
+  sideToElems[:,0] = order[first] // 3
+  interior = np.flatnonzero(~isBoundary)
+  sideToElems[interior,1] = order[first[interior]+1] // 3
+
+  return (sides, elemToEdges, sideToElems, isBoundary)
+
+
+def markerSideLabels(sides, isBoundary, vertMarkers = None):
+  '''
+  Label sides found by deriveSides. Interior sides get label 0. Boundary
+  sides get the boundary marker of their vertices, as in a Triangle .node
+  file. With no markers, all boundary sides get label 1, as Triangle does.
+
+  Vertex markers don't determine side labels exactly. A vertex at a
+  corner between differently marked boundary segments carries only one of
+  their markers, so a side from a corner to a vertex of the other segment
+  has endpoints with different markers; the larger is used, which may be
+  wrong, and a warning is issued. A side running between two corners can
+  be mislabeled without any sign of it. Exact labels need the segment
+  markers in a .edge file.
+  '''
+  labels = np.zeros(len(sides), dtype=np.int64)
+  if vertMarkers is None:
+    labels[isBoundary] = 1
+  else:
+    vertMarkers = np.asarray(vertMarkers, dtype=np.int64)
+    bdry = sides[isBoundary]
+    (m0, m1) = (vertMarkers[bdry[:,0]], vertMarkers[bdry[:,1]])
+    labels[isBoundary] = np.maximum(m0, m1)
+    numAmbiguous = np.count_nonzero(m0 != m1)
+    if numAmbiguous > 0:
+      warnings.warn('{} boundary sides have endpoints with different '
+                    'markers and were given the larger one, which may not '
+                    'be the marker of their boundary segment; use a .edge '
+                    'file for exact side labels'.format(numAmbiguous))
+  return labels
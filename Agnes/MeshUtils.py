@@ -17,6 +17,8 @@ from .TriangleMeshReader import *
 # (*) hLocal(mesh) -- produces a vector containing the average length
 #                     of the edges connected to each vertex
 #
+# (*) sideLengths(mesh) -- produces a vector of the lengths of all sides
+#
 #
 # Katharine Long, Sep 2020
 # For Math 5344
@@ -38,22 +40,13 @@ def evalOnMesh(mesh, func):
 # --- hMesh -- find the average edge length in the mesh
 #
 # Input:
-# (*) Argument "mesh" should have an iterable, indexable attribute verts,
-#     each item in which should be an (x,y) pair, and an iterable
-#     attribute sides, each item is which a pair of vertex indices.
+# (*) Argument "mesh" should provide the array views vertArray() and
+#     sideArray(), as LoadableMesh and CompactMesh do.
 # Output:
 # (*) The average edge length
 #
 def hMesh(mesh):
-    hAvg = 0.0
-    for s in mesh.sides:
-        A = np.array(mesh.verts[s[0]])
-        B = np.array(mesh.verts[s[1]])
-        r = A-B
-        hEdge = np.sqrt(np.dot(r,r))
-        hAvg += hEdge
-    hAvg /= len(mesh.sides)
-    return hAvg
+    return np.mean(sideLengths(mesh))
 
 # --- showField -- do a density plot of a function discretized on a mesh
 #
@@ -77,7 +70,6 @@ def showField(mesh, vec, meshLines=True, colorBar=True, contours=128,
     Y = XY[:,1]
 
     tri = mtri.Triangulation(X, Y, mesh.elems)
-    interp = mtri.LinearTriInterpolator(tri, vec)
 
     fig, ax = plt.subplots()
     cnt = ax.tricontourf(tri, vec,levels=contours)
@@ -93,29 +85,32 @@ def showField(mesh, vec, meshLines=True, colorBar=True, contours=128,
 # --- hLocal -- find the average edge length connected to each vertex
 #
 # Input:
-# (*) Argument "mesh" should have an iterable, indexable attribute verts,
-#     each item in which should be an (x,y) pair, and an iterable
-#     attribute sides, each item is which a pair of vertex indices.
+# (*) Argument "mesh" should provide the array views vertArray() and
+#     sideArray(), as LoadableMesh and CompactMesh do.
 def hLocal(mesh):
 
-    hAvg = np.zeros(len(mesh.verts))
-    vertEdgeCount = np.zeros(len(mesh.verts))
-
-    for s in mesh.sides:
-        a = s[0]
-        b = s[1]
-        A = np.array(mesh.verts[a])
-        B = np.array(mesh.verts[b])
-        r = A-B
-        hEdge = np.sqrt(np.dot(r,r))
-        hAvg[a] += hEdge
-        hAvg[b] += hEdge
-        vertEdgeCount[a] += 1
-        vertEdgeCount[b] += 1
+    nVerts = len(mesh.verts)
+    sides = mesh.sideArray()
+    hEdge = sideLengths(mesh)
+
+    hAvg = np.bincount(sides.ravel(), weights=np.repeat(hEdge, 2),
+                       minlength=nVerts)
+    vertEdgeCount = np.bincount(sides.ravel(), minlength=nVerts)
 
     hAvg /= vertEdgeCount
     return hAvg
 
+# --- sideLengths -- find the length of every side in the mesh
+#
+# Input:
+# (*) Argument "mesh" should provide the array views vertArray() and
+#     sideArray(), as LoadableMesh and CompactMesh do.
+def sideLengths(mesh):
+    verts = mesh.vertArray()
+    sides = mesh.sideArray()
+    r = verts[sides[:,0]] - verts[sides[:,1]]
+    return np.sqrt(np.sum(r*r, axis=1))
+
 ## ---- Test
 
 if __name__=='__main__':
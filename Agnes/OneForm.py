@@ -1,6 +1,11 @@
 from abc import ABC, abstractmethod
+import numbers
 from .QuadratureRule import QuadratureRule
+from .QuadratureRegistry import cheapestRule
+from .TwoForm import MassTwoForm
 from .Triangle import Triangle
+from .TriangleBatch import TriangleBatch
+from .BasisTabulation import tabulate
 import numpy as np
 
 
@@ -33,6 +38,45 @@ class OneForm(ABC):
     '''
     pass
 
+  def localVecs(self, tris : TriangleBatch, nodes):
+    '''
+    Compute the local vectors on a batch of triangles, returned as an
+    (nBatch, 3) array. The nodes argument is the (nBatch, 3) array of the
+    triangles' vertex indices. The default implementation simply calls
+    localVec() on each triangle; derived classes should override it with
+    a vectorized version when they can.
+    '''
+    rtn = np.zeros((len(tris), 3))
+    for i in range(len(tris)):
+      rtn[i] = self.localVec(tris.triangle(i), nodes[i])
+    return rtn
+
+
+def groupOneForms(oneForms):
+  '''
+  Group one-forms by their testID, so that the local vectors of forms
+  sharing a test function can be summed and scattered once. Returns a dict
+  mapping each testID to a list of forms, in order of first appearance.
+  '''
+  groups = {}
+  for bForm in oneForms:
+    groups.setdefault(bForm.testID(), []).append(bForm)
+  return groups
+
+
+def sumLocalVecs(oneForms, tris : TriangleBatch, nodes):
+  '''
+  Sum the local vectors of several one-forms over a batch of triangles,
+  accumulating into a single (nBatch, 3) array.
+  '''
+  if len(oneForms)==1:
+    return oneForms[0].localVecs(tris, nodes)
+
+  rtn = np.zeros((len(tris), 3))
+  for bForm in oneForms:
+    rtn += bForm.localVecs(tris, nodes)
+  return rtn
+
 
 class QuadratureOneForm(OneForm):
   '''
@@ -40,13 +84,21 @@ class QuadratureOneForm(OneForm):
   '''
 
   def __init__(self, quad : QuadratureRule, testID:int=0):
+    '''
+    Constructor. The quad argument is either a quadrature rule or an
+    integer degree, in which case the cheapest registered rule exact to
+    that degree is used.
+    '''
     super().__init__(testID = testID)
+    if isinstance(quad, numbers.Integral):
+      quad = cheapestRule(quad)
     self._quad = quad
     self._x = quad.X()[:,0].reshape((quad.n(),1))
     self._y = quad.X()[:,1].reshape((quad.n(),1))
 
-    self._phiAtQuadPts = np.hstack((1 - self._x - self._y,
-                                   self._x, self._y))
+    # Basis values at the quadrature points, shared with all other forms
+    # using this rule
+    self._phiAtQuadPts = tabulate(quad).phi
   
   def x(self):
     return self._x
@@ -74,6 +126,9 @@ class ConstCoeffOneForm(OneForm):
   
   def localVec(self, tri : Triangle, nodes : tuple):
     return self._coeff * tri.detJ * self._vec
+
+  def localVecs(self, tris : TriangleBatch, nodes):
+    return self._coeff * np.multiply.outer(tris.detJ, self._vec)
   
 
 class VarCoeffOneForm(QuadratureOneForm):
@@ -82,7 +137,6 @@ class VarCoeffOneForm(QuadratureOneForm):
     super().__init__(quad, testID = testID)
     self._coeffFunc = coeffFunc
     self._dfs = dfs
-    self._phiWork = np.zeros_like(self.phiAtQuadPts())
     self._valsWork = np.zeros_like(self.w())
 
   
@@ -101,19 +155,109 @@ class VarCoeffOneForm(QuadratureOneForm):
     np.multiply(vals, self.w(), self._valsWork)
 
     # Sum over quad points
-    # TODO: figure out how to do this with numpy multiply
-    for i,(v,f) in enumerate(zip(self._valsWork, self._phiAtQuadPts)):
-      self._phiWork[i,:] = v*f
-
-    sum = np.sum(self._phiWork, 0)
+    sum = self._valsWork @ self._phiAtQuadPts
 
     return tri.area * sum
-  
 
 
-  
+  def localVecs(self, tris : TriangleBatch, nodes):
+    '''
+    Compute the local vectors on a batch of triangles. The physical
+    coordinates of all quadrature points on all triangles are gathered
+    into flat arrays, so the coefficient function is called only once.
+    The coefficient function must therefore accept numpy arrays.
+    '''
+    nElems = len(tris)
+    nQuad = self._quad.n()
 
+    if self._dfs is None:
+      dfVals = None
+    else:
+      dfVals = self._dfs.interpolateOnElems(nodes,
+                                            self._phiAtQuadPts).ravel()
 
-  
+    XY = tris.quadPts(self._quad).reshape((nElems*nQuad, 2))
+
+    vals = self._coeffFunc(XY[:,0], XY[:,1], dfVals)
+    vals = np.broadcast_to(vals, (nElems*nQuad,)).reshape((nElems, nQuad))
+
+    # b[e,i] = area[e] * sum_q w[q] f[e,q] phi[q,i]
+    rtn = (vals * self.w()) @ self._phiAtQuadPts
+    rtn *= tris.area[:,np.newaxis]
+    return rtn
+
+
+
+class InterpolatedOneForm(OneForm):
+  '''
+  Load vector computed from the nodal interpolant of the coefficient,
+  b = M I_h f, where M is the mass matrix. The coefficient is evaluated
+  once per mesh vertex instead of at every quadrature point of every
+  element, which is much cheaper and, for smooth f, just as accurate
+  for P1 elements. It takes the same arguments as VarCoeffOneForm, minus
+  the quadrature rule, so either one can be used in a driver. The
+  coefficient is called as coeffFunc(x, y, dfVals), where dfVals holds
+  the nodal values of the optional discrete function dfs.
+  '''
 
+  def __init__(self, coeffFunc, dfs = None, testID:int=0):
+    super().__init__(testID = testID)
+    self._coeffFunc = coeffFunc
+    self._dfs = dfs
+
+
+  def localVec(self, tri : Triangle, nodes : tuple):
+
+    if self._dfs is None:
+      dfVals = None
+    else:
+      dfVals = self._dfs.nodalValues()[np.asarray(nodes)]
+
+    XY = np.array((tri.A, tri.B, tri.C))
+    fVals = self._coeffFunc(XY[:,0], XY[:,1], dfVals)
+    fVals = np.broadcast_to(fVals, (3,))
+
+    return tri.area * (MassTwoForm.M @ fVals)
+
+
+  def localVecs(self, tris : TriangleBatch, nodes):
+    '''
+    Compute the local vectors on a batch of triangles. The coefficient is
+    evaluated at all vertices with one call, then gathered by element.
+    '''
+    if self._dfs is None:
+      dfVals = None
+    else:
+      dfVals = self._dfs.nodalValues()
+
+    verts = tris.verts
+    fVals = self._coeffFunc(verts[:,0], verts[:,1], dfVals)
+    fVals = np.broadcast_to(fVals, (len(verts),))
+
+    # M is symmetric, so applying it to each row of fVals[nodes] is a
+    # right multiplication
+    rtn = fVals[nodes] @ MassTwoForm.M
+    rtn *= tris.area[:,np.newaxis]
+    return rtn
+
+
+
+class LumpedMassOneForm(OneForm):
+  '''
+  Row-sum lumped version of MassTwoForm. Its local vectors are the row sums
+  of the local mass matrices, so the assembled vector is the diagonal of
+  the lumped mass matrix. Usually created with MassTwoForm.lumped().
+  '''
+
+  def __init__(self, coeff=1.0, testID:int=0):
+    super().__init__(testID = testID)
+    self._coeff = coeff
+
+  # Row sums of the reference mass matrix
+  rowSums = np.sum(MassTwoForm.M, axis=1)
+
+  def localVec(self, tri : Triangle, nodes : tuple):
+    return self._coeff * tri.area * LumpedMassOneForm.rowSums
 
+  def localVecs(self, tris : TriangleBatch, nodes):
+    return np.multiply.outer(self._coeff*tris.area, LumpedMassOneForm.rowSums)
@@ -1,15 +1,27 @@
 import numpy as np
 
 class P1Basis:
+  '''
+  Degree-one Lagrange basis on the reference triangle. The functions
+  accept scalars or arrays of points; with arrays, the basis index comes
+  first in the result.
+  '''
 
   @staticmethod
   def phi(x, y):
+    '''
+    Basis values, with shape (3,) + shape(x)
+    '''
     return np.array([1.0-x-y, x, y])
   
   @staticmethod
   def grad_phi(x, y):
-    return np.array([[-1.0, 1.0, 0.0],
-                     [-1.0, 0.0, 1.0]])
-  
-
-  
\ No newline at end of file
+    '''
+    Basis gradients, with shape (2, 3) + shape(x). Entry [d,i] is the
+    derivative of phi_i in direction d.
+    '''
+    g = np.array([[-1.0, 1.0, 0.0],
+                  [-1.0, 0.0, 1.0]])
+    shape = np.broadcast(x, y).shape
+    return np.broadcast_to(g.reshape((2,3) + (1,)*len(shape)),
+                           (2,3) + shape).copy()
@@ -0,0 +1,140 @@
+# --------------------------------------------------------------------------
+# Spatial index for finding the elements containing arbitrary points, so
+# that discrete functions can be evaluated off the mesh nodes. The index
+# is a uniform grid of buckets over the mesh's bounding box, each listing
+# the elements whose bounding boxes overlap it. Points are located in
+# batches: each point is tested against the elements in its bucket, all at
+# once, using the batched element geometry in TriangleBatch.
+# --------------------------------------------------------------------------
+
+import numpy as np
+from .TriangleBatch import TriangleBatch
+
+
+class PointLocator:
+  '''
+  Uniform bucket grid over the elements of a mesh. The grid has about
+  cellsPerElem buckets per element, so each bucket holds a few elements
+  for a mesh with reasonably uniform element sizes. The buckets are
+  stored in CSR form: the elements in bucket c are
+  bucketElems[bucketPtr[c]:bucketPtr[c+1]].
+  '''
+
+  def __init__(self, mesh, cellsPerElem : float = 4.0):
+    self.tris = TriangleBatch.forMesh(mesh)
+    verts = mesh.vertArray()
+    elems = mesh.elemArray()
+    nE = len(elems)
+
+    self.lo = np.min(verts, axis=0)
+    self.hi = np.max(verts, axis=0)
+    size = np.maximum(self.hi - self.lo, np.finfo(float).tiny)
+
+    # Square buckets, about cellsPerElem of them per element
+    h = np.sqrt(size[0]*size[1]/max(cellsPerElem*nE, 1.0))
+    if h == 0.0:
+      h = np.max(size)
+    self.numCells = np.maximum(np.ceil(size/h).astype(np.int64), 1)
+    self.cellSize = size/self.numCells
+
+    # Range of buckets overlapped by each element's bounding box
+    X = verts[elems]
+    c0 = self._cellIndex(np.min(X, axis=1))
+    c1 = self._cellIndex(np.max(X, axis=1))
+    nx = c1[:,0] - c0[:,0] + 1
+    ny = c1[:,1] - c0[:,1] + 1
+    counts = nx*ny
+
+    # Enumerate the (element, bucket) pairs. Within element e, pair k is
+    # bucket (c0x + k % nx, c0y + k // nx).
+    pairElem = np.repeat(np.arange(nE), counts)
+    start = np.zeros(nE, dtype=np.int64)
+    np.cumsum(counts[:-1], out=start[1:])
+    k = np.arange(len(pairElem)) - start[pairElem]
+    ix = c0[pairElem,0] + k % nx[pairElem]
+    iy = c0[pairElem,1] + k // nx[pairElem]
+    cell = iy*self.numCells[0] + ix
+
+    order = np.argsort(cell, kind='stable')
+    nCells = self.numCells[0]*self.numCells[1]
+    self.bucketPtr = np.zeros(nCells+1, dtype=np.int64)
+    np.cumsum(np.bincount(cell, minlength=nCells), out=self.bucketPtr[1:])
+    self.bucketElems = pairElem[order]
+
+  @staticmethod
+  def forMesh(mesh):
+    '''
+    Return the point locator for a mesh. It's cached on the mesh, so it's
+    built only once.
+    '''
+    return mesh.cached('PointLocator', lambda : PointLocator(mesh))
+
+  def _cellIndex(self, pts):
+    '''
+    Bucket (ix, iy) containing each point, clipped to the grid
+    '''
+    c = np.floor((pts - self.lo)/self.cellSize).astype(np.int64)
+    return np.clip(c, 0, self.numCells-1)
+
+  def locate(self, pts, tol : float = 1.0e-10):
+    '''
+    Find the elements containing an (nPts, 2) array of points. Returns
+    (elems, bary): the element containing each point, or -1 if the point
+    isn't in the mesh, and the (nPts, 3) barycentric coordinates of each
+    point in its element (zero for points not in the mesh). A point within
+    tol (relative to the element size) of an element is taken to be in
+    it; a point on a shared side or vertex is assigned to one of the
+    elements containing it.
+    '''
+    pts = np.asarray(pts, dtype=np.double).reshape((-1,2))
+    nPts = len(pts)
+    elems = np.full(nPts, -1, dtype=np.int64)
+    bary = np.zeros((nPts, 3))
+
+    # Points in the bounding box, and their buckets
+    slack = tol*np.max(self.hi - self.lo)
+    inBox = np.all((pts >= self.lo - slack) & (pts <= self.hi + slack),
+                   axis=1)
+    ids = np.flatnonzero(inBox)
+    c = self._cellIndex(pts[ids])
+    cell = c[:,1]*self.numCells[0] + c[:,0]
+
+    # Pair each point with every element in its bucket
+    first = self.bucketPtr[cell]
+    counts = self.bucketPtr[cell+1] - first
+    pairPt = np.repeat(np.arange(len(ids)), counts)
+    pairStart = np.zeros(len(ids), dtype=np.int64)
+    np.cumsum(counts[:-1], out=pairStart[1:])
+    pairElem = self.bucketElems[first[pairPt]
+                                + np.arange(len(pairPt)) - pairStart[pairPt]]
+
+    # Reference coordinates xi = (p - A) Jt^{-1}, then barycentrics
+    tris = self.tris
+    xi = np.matmul((pts[ids[pairPt]] - tris.A[pairElem])[:,np.newaxis,:],
+                   tris.JtInv[pairElem])[:,0,:]
+    lam = np.column_stack((1.0 - xi[:,0] - xi[:,1], xi[:,0], xi[:,1]))
+
+    # For each point keep the candidate it's most inside of, i.e., the one
+    # with the largest minimum barycentric coordinate
+    score = np.min(lam, axis=1)
+    best = np.lexsort((-score, pairPt))
+    (pointHasPair, firstPair) = np.unique(pairPt[best], return_index=True)
+    best = best[firstPair]
+    found = score[best] >= -tol
+
+    hit = ids[pointHasPair[found]]
+    elems[hit] = pairElem[best[found]]
+    bary[hit] = lam[best[found]]
+    return (elems, bary)
+
+  def evaluate(self, nodalVals, pts, outside : float = np.nan):
+    '''
+    Evaluate the P1 function with the given nodal values at an (nPts, 2)
+    array of points. Points not in the mesh get the value outside.
+    '''
+    (elems, bary) = self.locate(pts)
+    found = elems >= 0
+    rtn = np.full(len(elems), outside, dtype=np.double)
+    rtn[found] = np.sum(bary[found]*nodalVals[self.tris.elems[elems[found]]],
+                        axis=1)
+    return rtn
@@ -0,0 +1,145 @@
+# --------------------------------------------------------------------------
+# Registry of quadrature rules on the reference triangle. Besides the
+# Gauss rules hard-coded in GaussRule, the registry knows about the Strang
+# rules tabulated in QuadratureTables/strang*_{w,x}.txt, which are
+# installed with the package. The tables are read on first use. The
+# registry can then pick the rule with the fewest points that integrates
+# polynomials of a given degree exactly.
+# --------------------------------------------------------------------------
+
+import os
+import warnings
+import numpy as np
+from math import factorial
+from .QuadratureRule import (QuadratureRule, GaussRule)
+from .CollapsedGaussRule import CollapsedGaussRule
+
+
+def exactDegree(quad : QuadratureRule, maxDegree : int = 30,
+                tol : float = 1.0e-10):
+  '''
+  Find the highest degree d such that the rule integrates all monomials
+  x^a y^b with a+b <= d exactly (to within relative error tol) on the
+  reference triangle.
+  The weights are assumed to sum to one, as in GaussRule.
+  '''
+  return _exactDegree(np.asarray(quad.X()), np.asarray(quad.W()),
+                      maxDegree, tol)
+
+
+def _exactDegree(X, W, maxDegree, tol):
+  for d in range(maxDegree+1):
+    for a in range(d+1):
+      b = d - a
+      # Exact integral over the reference triangle, scaled by 1/area
+      exact = 2.0*factorial(a)*factorial(b)/factorial(d+2)
+      approx = np.dot(W, X[:,0]**a * X[:,1]**b)
+      if abs(approx - exact) > tol*exact:
+        return d-1
+  return maxDegree
+
+
+class QuadratureRegistry:
+  '''
+  A set of quadrature rules, each stored along with the polynomial degree
+  it integrates exactly. When no registered rule is accurate enough, a
+  CollapsedGaussRule is generated; if cacheDir is given, generated rules
+  are saved there for use by later runs.
+  '''
+
+  # Default location of the Strang tables, relative to this file
+  defaultTableDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 'QuadratureTables')
+
+  # Names of the Strang tables
+  strangTables = ('strang4', 'strang5', 'strang6',
+                  'strang7', 'strang8', 'strang9')
+
+  def __init__(self, tableDir : str = None, cacheDir : str = None):
+    if tableDir is None:
+      tableDir = QuadratureRegistry.defaultTableDir
+    self._tableDir = tableDir
+    self._cacheDir = cacheDir
+    self._entries = None
+
+  def rules(self):
+    '''
+    Return a list of (degree, rule) pairs for all registered rules,
+    loading the tables on the first call.
+    '''
+    if self._entries is None:
+      self._entries = []
+      for order in GaussRule.gauss.keys():
+        self.register(GaussRule(order))
+      for name in QuadratureRegistry.strangTables:
+        rule = self._readTable(name)
+        if rule is not None:
+          self.register(rule, rule.order())
+    return list(self._entries)
+
+  def register(self, quad : QuadratureRule, degree : int = None):
+    '''
+    Add a rule to the registry. If the degree isn't given, it's found
+    with exactDegree().
+    '''
+    if self._entries is None:
+      self.rules()
+    if degree is None:
+      degree = exactDegree(quad)
+    self._entries.append((degree, quad))
+
+  def cheapestRule(self, degree : int):
+    '''
+    Return the rule with the fewest points that's exact for polynomials
+    of the specified degree. Among rules with the same number of points,
+    the one with the highest degree wins. Degrees beyond the registered
+    rules get a generated CollapsedGaussRule.
+    '''
+    best = None
+    for (d, quad) in self.rules():
+      if d < degree:
+        continue
+      if best is None or (quad.n(), -d) < (best[1].n(), -best[0]):
+        best = (d, quad)
+
+    if best is None:
+      return CollapsedGaussRule(degree, cacheDir=self._cacheDir)
+    return best[1]
+
+  def _readTable(self, name : str):
+    '''
+    Read a rule from the files name_w.txt and name_x.txt. If the files
+    aren't available, warn and return None; cheapestRule() will then
+    return more expensive rules than it would otherwise.
+    '''
+    wFile = os.path.join(self._tableDir, '{}_w.txt'.format(name))
+    xFile = os.path.join(self._tableDir, '{}_x.txt'.format(name))
+    if not (os.path.isfile(wFile) and os.path.isfile(xFile)):
+      warnings.warn('Quadrature table {} not found in {}; the rule won\'t '
+                    'be available'.format(name, self._tableDir))
+      return None
+
+    w = np.loadtxt(wFile, ndmin=1)
+    x = np.loadtxt(xFile, ndmin=2)
+    w.setflags(write=False)
+    x.setflags(write=False)
+
+    ruleName = '{}({})'.format(name[:-1].capitalize(), name[-1])
+    degree = _exactDegree(x, w, 30, 1.0e-10)
+    return QuadratureRule(ruleName, degree, w, x)
+
+
+_defaultRegistry = QuadratureRegistry()
+
+def defaultRegistry():
+  '''
+  Return the process-wide registry used by cheapestRule()
+  '''
+  return _defaultRegistry
+
+def cheapestRule(degree : int):
+  '''
+  Return the rule with the fewest points that integrates polynomials of
+  the specified degree exactly.
+  '''
+  return _defaultRegistry.cheapestRule(degree)
@@ -21,10 +21,37 @@ class QuadratureRule:
   
   def order(self):
     return self._order
+
+  def name(self):
+    return self._name
+
+  def key(self):
+    '''
+    Hashable key identifying this rule by its name and points, used for
+    caching data tabulated at the quadrature points.
+    '''
+    return (self._name, np.asarray(self._xQuad).tobytes(),
+            np.asarray(self._wQuad).tobytes())
   
   def evalFunc(self, f, fDim = 1):
+    '''
+    Evaluate f at the quadrature points, returning an (n, fDim) array.
+    f is first called once with arrays of all x and y coordinates; if that
+    fails or returns something of the wrong shape, it's called point by
+    point.
+    '''
     if not callable(f):
       raise TypeError('evalFunc arg f={} not callable'.format(f))
+
+    X = np.asarray(self.X())
+    try:
+      vals = np.asarray(f(X[:,0], X[:,1]), dtype=np.double)
+      if vals.shape == (fDim, self.n()):
+        return vals.T.copy()
+      if vals.shape == (self.n(),) and fDim == 1:
+        return vals.reshape((self.n(), 1))
+    except (TypeError, ValueError):
+      pass
     
     rtn = np.zeros((self.n(), fDim))
     for i,xy in enumerate(self.X()):
@@ -45,13 +72,27 @@ class QuadratureRule:
 class GaussRule(QuadratureRule):
   
   def __init__(self, order):
-    
-    rule = self.gauss[order]
-    xq = np.array(rule['x'])
-    wq = np.array(rule['w'])
+
+    # The tables are converted to arrays only on first use of each order.
+    # The arrays are read-only, so all rules of that order can share them.
+    if order not in GaussRule._arrays:
+      if order not in self.gauss:
+        raise KeyError('GaussRule is tabulated only for orders {}; use '
+                       'CollapsedGaussRule for order {}'\
+                       .format(tuple(self.gauss.keys()), order))
+      rule = self.gauss[order]
+      xq = np.array(rule['x'])
+      wq = np.array(rule['w'])
+      xq.setflags(write=False)
+      wq.setflags(write=False)
+      GaussRule._arrays[order] = (wq, xq)
+
+    (wq, xq) = GaussRule._arrays[order]
 
     super().__init__('Gauss({})'.format(order), order, wq, xq)
 
+  _arrays = {}
+
   gauss = {
     1: {
       'x' : ((1/3, 1/3),),
@@ -1,6 +1,5 @@
 from .LoadableMesh import LoadableMesh
 import numpy as np
-import itertools as it
 
 def meshRectangle(nx:int=4, ny:int=4, 
                   ax:float=0.0, bx:float=1.0, 
@@ -12,47 +11,35 @@ def meshRectangle(nx:int=4, ny:int=4,
   '''
 
   X = np.linspace(ax, bx, nx+1)
-  Y = np.linspace(ay, by, ny+1)  
+  Y = np.linspace(ay, by, ny+1)
 
   mesh = LoadableMesh()
-  indexPairToVertMap = {}
 
-  # Put the vertices into the mesh
-  v = 0
-  for ix,x in enumerate(X):
-    for iy,y in enumerate(Y):
-      mesh.addVertex((x,y))
-      indexPairToVertMap[(ix,iy)] = v
-      v += 1
+  # Put the vertices into the mesh. Vertex (ix,iy) gets index
+  # ix*(ny+1) + iy.
+  XX, YY = np.meshgrid(X, Y, indexing='ij')
+  mesh.addVertices(np.column_stack((XX.ravel(), YY.ravel())))
+
+  # Corners of each cell, counterclockwise from the lower left
+  ix, iy = np.meshgrid(np.arange(nx), np.arange(ny), indexing='ij')
+  ix = ix.ravel()
+  iy = iy.ravel()
+  corners = np.stack((ix*(ny+1) + iy,
+                      (ix+1)*(ny+1) + iy,
+                      (ix+1)*(ny+1) + iy + 1,
+                      ix*(ny+1) + iy + 1), axis=1)
+
+  # Alternate the direction of the diagonal in a checkerboard pattern
+  isEven = (((ix+iy) % 2)==0)[:,np.newaxis]
+  T1 = np.where(isEven, [0,1,2], [0,1,3])
+  T2 = np.where(isEven, [0,2,3], [1,2,3])
+  tris1 = np.take_along_axis(corners, T1, axis=1)
+  tris2 = np.take_along_axis(corners, T2, axis=1)
+
+  # Add the elements, deriving the sides from them. All sides get label 0.
+  mesh.addElemsAndSides(np.stack((tris1, tris2), axis=1),
+                        np.zeros(len(mesh.vertArray()), dtype=np.int64))
 
-  
-  for ix in range(nx):
-    for iy in range(ny):
-      isEven = (((ix+iy) % 2)==0)
-      corners = (indexPairToVertMap[(ix,iy)],
-                 indexPairToVertMap[(ix+1,iy)],
-                 indexPairToVertMap[(ix+1,iy+1)],
-                 indexPairToVertMap[(ix,iy+1)])
-
-      if isEven:
-        T1 = (0,1,2)
-        T2 = (0,2,3)
-      else:
-        T1 = (0,1,3)
-        T2 = (1,2,3)
-
-
-      edges = list(it.combinations(T1, 2)) + list(it.combinations(T2,2))
-      #print('({},{}), even={}, edges are {}'.format(ix, iy, isEven,edges))
-      
-      for e in edges:
-        mesh.addSide(corners[e[0]], corners[e[1]], 0)
-      
-
-      mesh.addElem(corners[T1[0]], corners[T1[1]], corners[T1[2]])
-      mesh.addElem(corners[T2[0]], corners[T2[1]], corners[T2[2]])
-      
-      
   return mesh
 
 
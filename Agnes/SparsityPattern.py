@@ -0,0 +1,263 @@
+# --------------------------------------------------------------------------
+# Symbolic part of sparse matrix assembly: the CSR structure of the system
+# matrix and the maps that scatter element matrices into its data array.
+# Both depend only on the mesh connectivity and the DOF numbering, so they
+# can be computed once and reused for every numerical assembly.
+# --------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class SparsityPattern:
+  '''
+  CSR sparsity pattern for P1 matrices on a mesh with numFuncs functions
+  per node, with DOFs numbered as in DiscreteSpace (numFuncs*node + funcID).
+
+  The pattern contains the entries for every pair of nodes sharing an
+  element, for each (test, unknown) function pair in funcPairs. By default
+  that's all nf^2 pairs, so the pattern can hold the matrix of any set of
+  two-forms; an assembler passes only the pairs its forms use, so that
+  couplings no form uses aren't stored as explicit zeros.
+
+  If upper is True, only entries on or above the diagonal are kept. This
+  is for symmetric matrices. Only the element matrix entries that land in
+  the upper triangle are stored in the scatter maps and accumulated: for
+  a pair of functions t <= u, these are the three diagonal entries plus,
+  for each off-diagonal pair (i,j), whichever of (i,j) and (j,i) goes from
+  the lower to the higher numbered node; for t > u it's just the three
+  off-diagonal entries going strictly upward. The scatter maps are thus
+  two thirds the size of the full ones for a scalar problem, tending to
+  one half for systems, plus a 3 byte per element orientation mask.
+  '''
+
+  # Off-diagonal local node pairs (i,j), i < j
+  _offDiag = ((0,1), (0,2), (1,2))
+
+  def __init__(self, elems, numNodes : int, numFuncs : int = 1,
+               upper : bool = False, funcPairs = None):
+    '''
+    Build the pattern from an (nElems, 3) array of element node indices.
+    funcPairs lists the (testID, unkID) pairs to include; if it's None,
+    all pairs are included.
+    '''
+    elems = np.asarray(elems, dtype=np.int64).reshape((-1,3))
+    nf = numFuncs
+    N = nf * numNodes
+
+    self._numFuncs = nf
+    self._N = N
+    self._upper = upper
+    self._funcPairs = SparsityPattern.allPairs(nf) if funcPairs is None \
+      else tuple(sorted(set(funcPairs)))
+
+    if upper:
+      (keys, shapes) = self._upperKeys(elems, nf, N)
+    else:
+      # Key each (row, col) pair as row*N + col, for all element node
+      # pairs, giving an (nElems, 3, 3) block of keys per function pair
+      keys = []
+      shapes = {}
+      for (t, u) in self._funcPairs:
+        keys.append(((nf*elems + t)[:,:,np.newaxis]*N
+                     + (nf*elems + u)[:,np.newaxis,:]).ravel())
+        shapes[(t,u)] = (len(elems), 3, 3)
+    keys = np.concatenate(keys) if len(keys) > 0 \
+      else np.zeros(0, dtype=np.int64)
+
+    # Sorted unique keys are exactly the CSR entries in row-major order,
+    # and the inverse map sends each element entry to its CSR position.
+    uniqueKeys, inverse = np.unique(keys, return_inverse=True)
+
+    # Store indices in the integer type scipy would pick, so that
+    # matrices built on this pattern can share the index arrays
+    idxType = np.int32 if max(N, len(uniqueKeys)) < 2**31 else np.int64
+    rowCounts = np.bincount(uniqueKeys // N, minlength=N)
+    self.indptr = np.zeros(N+1, dtype=idxType)
+    np.cumsum(rowCounts, out=self.indptr[1:])
+    self.indices = (uniqueKeys % N).astype(idxType)
+
+    # Split the positions into one scatter map for each function pair:
+    # (nElems, 3, 3), or (6, nElems) or (3, nElems) for an upper pattern
+    self._scatter = {}
+    start = 0
+    for (tu, shape) in shapes.items():
+      n = int(np.prod(shape))
+      self._scatter[tu] = inverse[start:start+n].reshape(shape)
+      self._scatter[tu].setflags(write=False)
+      start += n
+
+    for a in (self.indptr, self.indices):
+      a.setflags(write=False)
+
+    # Sorted row*N + col keys of the entries, built when find() needs them
+    self._keys = None
+
+  def _upperKeys(self, elems, nf : int, N : int):
+    '''
+    Keys row*N + col of the element entries in the upper triangle, for
+    the pattern's function pairs, in the order produced by _upperValues(),
+    and the shape of the scatter map for each function pair
+    '''
+    # For each off-diagonal pair (i,j), whether node i is below node j,
+    # so that entry (i,j) rather than (j,i) goes upward
+    i = np.array([p[0] for p in self._offDiag])
+    j = np.array([p[1] for p in self._offDiag])
+    self._iBelowJ = (elems[:,i] < elems[:,j]).T.copy()
+    self._iBelowJ.setflags(write=False)
+
+    lo = np.minimum(elems[:,i], elems[:,j]).T
+    hi = np.maximum(elems[:,i], elems[:,j]).T
+    diag = elems.T
+    nodePairs = {False : (np.concatenate((diag, lo)),
+                          np.concatenate((diag, hi))),
+                 True : (lo, hi)}
+
+    keys = []
+    shapes = {}
+    for (t, u) in self._funcPairs:
+      (ni, nj) = nodePairs[t > u]
+      keys.append(((nf*ni + t)*N + nf*nj + u).ravel())
+      shapes[(t,u)] = ni.shape
+    return (keys, shapes)
+
+  def _upperValues(self, localMats, strict : bool):
+    '''
+    Gather the local matrix entries that go into the upper triangle, as a
+    (6, nElems) array (the diagonal, then the upward off-diagonal entry of
+    each pair), or (3, nElems) for the strictly upward entries only
+    '''
+    V = np.reshape(localMats, (-1,9))
+    vals = [np.where(self._iBelowJ[k], V[:,3*i+j], V[:,3*j+i])
+            for k, (i, j) in enumerate(self._offDiag)]
+    if not strict:
+      vals = [V[:,0], V[:,4], V[:,8]] + vals
+    return np.stack(vals)
+
+  def shape(self):
+    return (self._N, self._N)
+
+  def nnz(self):
+    return len(self.indices)
+
+  def numFuncs(self):
+    return self._numFuncs
+
+  def isUpper(self):
+    return self._upper
+
+  def funcPairs(self):
+    '''
+    The (testID, unkID) function pairs in the pattern, sorted
+    '''
+    return self._funcPairs
+
+  @staticmethod
+  def allPairs(numFuncs : int):
+    '''
+    All (testID, unkID) pairs for numFuncs functions, sorted
+    '''
+    return tuple((t, u) for t in range(numFuncs) for u in range(numFuncs))
+
+  def scatterMap(self, testID : int, unkID : int):
+    '''
+    Return an (nElems, 3, 3) array whose entry (e,i,j) is the position in
+    the CSR data array of local matrix entry (i,j) on element e, for the
+    given test and unknown functions. For an upper pattern, the map is
+    (6, nElems) if testID <= unkID and (3, nElems) otherwise, giving the
+    positions of the upward entries described in the class documentation.
+    Raises a ValueError if the function pair isn't in the pattern.
+    '''
+    if (testID, unkID) not in self._scatter:
+      raise ValueError('Function pair ({},{}) is not in the sparsity '
+                       'pattern'.format(testID, unkID))
+    return self._scatter[(testID, unkID)]
+
+  def accumulate(self, data, testID : int, unkID : int, localMats):
+    '''
+    Add an (nElems, 3, 3) stack of local matrices into a CSR data array.
+    For an upper pattern, only the entries in the upper triangle are
+    gathered and added.
+    '''
+    if self._upper:
+      vals = self._upperValues(localMats, testID > unkID)
+    else:
+      vals = np.asarray(localMats)
+    sums = np.bincount(self.scatterMap(testID, unkID).ravel(),
+                       weights=vals.ravel(), minlength=self.nnz())
+    data += sums
+
+  def find(self, rows, cols):
+    '''
+    Return the positions in the CSR data array of the entries (rows, cols),
+    which may be arrays of any (matching) shape. In an upper pattern,
+    entries below the diagonal are mapped to the dummy position nnz().
+    Raises a ValueError if any other entry isn't in the pattern.
+    '''
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    N = self._N
+
+    if self._keys is None:
+      rowOfEntry = np.repeat(np.arange(N, dtype=np.int64),
+                             np.diff(self.indptr))
+      self._keys = rowOfEntry*N + self.indices
+      self._keys.setflags(write=False)
+
+    keys = rows*N + cols
+    pos = np.searchsorted(self._keys, keys)
+    found = (pos < self.nnz())
+    found[found] = self._keys[pos[found]]==keys[found]
+
+    if self._upper:
+      lower = rows > cols
+      pos[lower] = self.nnz()
+      found |= lower
+
+    if not np.all(found):
+      raise ValueError('Entries requested that are not in the sparsity '
+                       'pattern')
+    return pos
+
+  def accumulateEntries(self, data, rows, cols, vals):
+    '''
+    Add values at the entries (rows, cols) into a CSR data array. Repeated
+    entries are summed.
+    '''
+    nnz = self.nnz()
+    sums = np.bincount(self.find(rows, cols).ravel(),
+                       weights=np.ravel(vals), minlength=nnz+1)
+    data += sums[:nnz]
+
+  def _indexArrays(self, shareIndices : bool):
+    if shareIndices:
+      return (self.indices, self.indptr)
+    return (self.indices.copy(), self.indptr.copy())
+
+  def matrix(self, data, shareIndices : bool = False):
+    '''
+    Wrap a data array in a CSR matrix with this pattern. The matrix gets
+    its own copies of the index arrays, so it can be modified freely
+    (e.g., with eliminate_zeros()). If shareIndices is True, the pattern's
+    read-only index arrays are used instead; this saves memory, but any
+    operation that changes the structure of the matrix will fail.
+    '''
+    (indices, indptr) = self._indexArrays(shareIndices)
+    A = sp.csr_matrix((data, indices, indptr), shape=self.shape(),
+                      copy=False)
+    A.has_sorted_indices = True
+    return A
+
+  def blockMatrix(self, data, blockSize : int, shareIndices : bool = False):
+    '''
+    Wrap an (nnz, blockSize, blockSize) data array in a BSR matrix whose
+    block structure is this pattern. This is meant for node-level patterns
+    (numFuncs=1), with each block coupling all functions at a pair of
+    nodes. The index arrays are copied unless shareIndices is True, as
+    in matrix().
+    '''
+    N = blockSize*self._N
+    (indices, indptr) = self._indexArrays(shareIndices)
+    A = sp.bsr_matrix((data, indices, indptr), shape=(N,N), copy=False)
+    A.has_sorted_indices = True
+    return A
@@ -0,0 +1,37 @@
+# --------------------------------------------------------------------------
+# Utilities for symmetric matrices stored as their upper triangle, as
+# produced by Assembler.assemble(upper=True).
+#
+# Note that the transpose of an upper triangular CSR matrix is the lower
+# triangle in CSC format, which is what many sparse Cholesky codes expect.
+# --------------------------------------------------------------------------
+
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+
+def expandUpper(U):
+  '''
+  Form the full symmetric CSR matrix from its upper triangle U.
+  '''
+  U = sp.csr_matrix(U)
+  strictlyUpper = sp.triu(U, k=1, format='csr')
+  return (U + strictlyUpper.T).tocsr()
+
+
+def symmetricOperator(U):
+  '''
+  Return a LinearOperator applying the symmetric matrix whose upper
+  triangle is U, without forming the full matrix. This can be passed
+  directly to symmetric iterative solvers such as scipy's cg() or minres().
+  '''
+  U = sp.csr_matrix(U)
+  d = U.diagonal()
+
+  def matvec(x):
+    x = np.ravel(x)
+    return U @ x + U.T @ x - d*x
+
+  return spla.LinearOperator(U.shape, matvec=matvec, rmatvec=matvec,
+                             dtype=U.dtype)
@@ -0,0 +1,255 @@
+# --------------------------------------------------------------------------
+# Time integration of semi-discrete problems M du/dt + K u = f(t), where
+# the mass matrix M and stiffness matrix K come from two-forms and the
+# load f from one-forms. The matrices are assembled once, and anything
+# that depends only on them is built once and reused for every step.
+# --------------------------------------------------------------------------
+
+from abc import ABC, abstractmethod
+import numpy as np
+import scipy.sparse.linalg as spla
+from collections.abc import Iterable
+from .DiscreteSpace import DiscreteSpace
+from .Assembler import Assembler
+from .DirichletBC import applyDirichletBCs
+from .TwoForm import MassTwoForm
+
+
+class TimeStepper(ABC):
+  '''
+  Base class for integrators of M du/dt + K u = f(t). It handles the load,
+  which is either an iterable of one-forms, assembled once, or a function
+  loadForms(t) returning the one-forms at time t, assembled when needed.
+  Derived classes implement step().
+  '''
+
+  def __init__(self, ds : DiscreteSpace, dt : float, loadForms = (),
+               bcs : Iterable = ()):
+    if dt <= 0.0:
+      raise ValueError('Time step should be positive; got {}'.format(dt))
+
+    self._ds = ds
+    self._dt = dt
+    self._bcs = tuple(bcs)
+
+    if callable(loadForms):
+      self._loadFunc = loadForms
+      self._staticLoad = None
+    else:
+      self._loadFunc = None
+      self._staticLoad = self._assembleLoad(loadForms)
+    # Most recently assembled time-dependent load, as (t, f)
+    self._lastLoad = None
+
+  def timeStep(self):
+    return self._dt
+
+  @abstractmethod
+  def step(self, u, t : float):
+    '''
+    Advance the solution vector u from time t to t + dt, returning the new
+    vector. The input vector isn't modified.
+    '''
+    pass
+
+  def run(self, u0, t0 : float, numSteps : int, callback = None):
+    '''
+    Take numSteps steps starting from u0 at time t0, and return the final
+    solution vector. If a callback is given, it's called as
+    callback(n, t, u) after each step.
+    '''
+    u = np.array(u0, dtype=np.double)
+    t = t0
+    for n in range(numSteps):
+      u = self.step(u, t)
+      # Accumulate t the same way step() computes the end time, so the
+      # cached load at the end of a step is found at the start of the next
+      t = t + self._dt
+      if callback is not None:
+        callback(n+1, t, u)
+    return u
+
+  def _load(self, t : float):
+    '''
+    Return the load vector at time t. A time-dependent load is assembled
+    on request; the last result is kept, so the load at the end of one
+    step is reused at the start of the next.
+    '''
+    if self._staticLoad is not None:
+      return self._staticLoad
+    if self._lastLoad is None or self._lastLoad[0] != t:
+      self._lastLoad = (t, self._assembleLoad(self._loadFunc(t)))
+    return self._lastLoad[1]
+
+  def _assembleLoad(self, oneForms : Iterable):
+    (A, b) = Assembler(self._ds, (), oneForms).assemble(buildMat=False)
+    return b
+
+  def _defaultMassForms(self):
+    return [MassTwoForm(testID=f, unkID=f)
+            for f in range(self._ds.numFuncs())]
+
+
+class ThetaMethod(TimeStepper):
+  '''
+  Theta-method integrator for M du/dt + K u = f(t). Each step solves
+    (M + theta dt K) u^{n+1}
+       = (M - (1-theta) dt K) u^n + dt (theta f^{n+1} + (1-theta) f^n).
+  theta=1 is backward Euler and theta=1/2 is Crank-Nicolson.
+
+  M and K are assembled once from massForms and stiffnessForms. If
+  massForms is None, a unit MassTwoForm is used for each function. The
+  step matrix is formed and LU-factored once, so a step costs a sparse
+  matrix-vector product and a pair of triangular solves, plus the
+  assembly of any time-dependent load.
+
+  The load is specified as described in TimeStepper; a time-dependent
+  load is assembled once per step. Dirichlet conditions in bcs are
+  imposed on the step matrix by row replacement; their values are re-read
+  on every step, so they can be changed between steps with
+  DirichletBC.setValue().
+  '''
+
+  def __init__(self, ds : DiscreteSpace, massForms : Iterable,
+               stiffnessForms : Iterable, dt : float, theta : float = 1.0,
+               loadForms = (), bcs : Iterable = ()):
+    super().__init__(ds, dt, loadForms, bcs)
+    if theta < 0.0 or theta > 1.0:
+      raise ValueError('Theta should be in [0,1]; got {}'.format(theta))
+    self._theta = theta
+
+    if massForms is None:
+      massForms = self._defaultMassForms()
+
+    (self._M, b) = Assembler(ds, massForms, ()).assemble(buildVec=False)
+    (self._K, b) = Assembler(ds, stiffnessForms, ()).assemble(buildVec=False)
+
+    self.setTimeStep(dt)
+
+  def setTimeStep(self, dt : float):
+    '''
+    Change the time step. This rebuilds and refactors the step matrix.
+    '''
+    theta = self._theta
+    M = self._M
+    K = self._K
+
+    self._dt = dt
+    self._rhsOp = (M - ((1.0 - theta)*dt)*K).tocsr()
+    A = (M + (theta*dt)*K).tocsr()
+    applyDirichletBCs(A, None, self._bcs)
+    self._lu = spla.splu(A.tocsc())
+
+  def massMatrix(self):
+    return self._M
+
+  def stiffnessMatrix(self):
+    return self._K
+
+  def step(self, u, t : float):
+    dt = self._dt
+    theta = self._theta
+
+    rhs = self._rhsOp @ u
+    if self._staticLoad is not None:
+      rhs += dt*self._staticLoad
+    else:
+      if theta < 1.0:
+        rhs += ((1.0 - theta)*dt)*self._load(t)
+      if theta > 0.0:
+        rhs += (theta*dt)*self._load(t + dt)
+
+    for bc in self._bcs:
+      rhs[bc.dofs()] = bc.values()
+
+    return self._lu.solve(rhs)
+
+
+class ExplicitStepper(TimeStepper):
+  '''
+  Explicit Runge-Kutta integrator for M du/dt + K u = f(t), using the
+  row-sum lumped mass matrix so that M is diagonal. A stage costs a
+  sparse matrix-vector product with K and an elementwise division by the
+  lumped mass, with no linear solve.
+
+  The method is 'euler' (forward Euler), 'rk2' (Heun's method) or 'rk4'
+  (the classical fourth-order method). The mass forms must be
+  MassTwoForms, which are lumped with MassTwoForm.lumped(); if massForms
+  is None, a unit mass form is used for each function. The load is
+  specified as described in TimeStepper. DOFs constrained by the Dirichlet
+  conditions in bcs are held at their boundary values.
+
+  Explicit methods are only conditionally stable; stableTimeStep() gives
+  a safe time step for forward Euler.
+  '''
+
+  # Butcher tableaux (a, b, c) of the available methods
+  tableaux = {
+    'euler' : ([], [1.0], [0.0]),
+    'rk2' : ([[1.0]], [0.5, 0.5], [0.0, 1.0]),
+    'rk4' : ([[0.5], [0.0, 0.5], [0.0, 0.0, 1.0]],
+             [1.0/6.0, 1.0/3.0, 1.0/3.0, 1.0/6.0], [0.0, 0.5, 0.5, 1.0])
+  }
+
+  def __init__(self, ds : DiscreteSpace, massForms : Iterable,
+               stiffnessForms : Iterable, dt : float, method : str = 'euler',
+               loadForms = (), bcs : Iterable = ()):
+    super().__init__(ds, dt, loadForms, bcs)
+    if method not in ExplicitStepper.tableaux:
+      raise ValueError('Unknown explicit method \'{}\'; expected one of {}'\
+                       .format(method, list(ExplicitStepper.tableaux.keys())))
+    self._tableau = ExplicitStepper.tableaux[method]
+
+    if massForms is None:
+      massForms = self._defaultMassForms()
+
+    self._lumpedMass = self._assembleLoad([m.lumped() for m in massForms])
+    (self._K, b) = Assembler(ds, stiffnessForms, ()).assemble(buildVec=False)
+
+    self._isConstrained = np.zeros(ds.numDofs(), dtype=bool)
+    for bc in self._bcs:
+      self._isConstrained[bc.dofs()] = True
+
+  def lumpedMass(self):
+    '''
+    Return the diagonal of the lumped mass matrix, as a vector
+    '''
+    return self._lumpedMass
+
+  def stiffnessMatrix(self):
+    return self._K
+
+  def stableTimeStep(self):
+    '''
+    Return 2/lambda, where lambda bounds the largest eigenvalue of
+    M^{-1} K by Gershgorin's theorem. Forward Euler is stable for time
+    steps up to this value when K is symmetric.
+    '''
+    rowSums = abs(self._K) @ np.ones(self._K.shape[1])
+    return 2.0/np.max(rowSums/self._lumpedMass)
+
+  def step(self, u, t : float):
+    dt = self._dt
+    (a, b, c) = self._tableau
+
+    k = []
+    for i in range(len(b)):
+      uStage = u
+      for j, aij in enumerate(a[i-1] if i > 0 else ()):
+        if aij != 0.0:
+          uStage = uStage + (dt*aij)*k[j]
+      k.append(self._rate(uStage, t + c[i]*dt))
+
+    uNew = u + dt*sum(bi*ki for (bi, ki) in zip(b, k))
+    for bc in self._bcs:
+      uNew[bc.dofs()] = bc.values()
+    return uNew
+
+  def _rate(self, u, t : float):
+    '''
+    Compute du/dt = M^{-1} (f(t) - K u), with zero rate at constrained DOFs
+    '''
+    rtn = self._load(t) - self._K @ u
+    rtn /= self._lumpedMass
+    rtn[self._isConstrained] = 0.0
+    return rtn
@@ -9,6 +9,7 @@
 
 import numpy as np
 from .QuadratureRule import GaussRule
+from .BasisTabulation import tabulate
 
 
 # --------------------------------------------------------------------------
@@ -42,14 +43,9 @@ class Triangle:
 
   # Map quadrature points to physical coordinates
   def ref_to_phys(self, quadX):
-
-    rtn = np.zeros_like(quadX)
-    Jt = self.Jt
-
-    for i, x_ref in enumerate(quadX):
-      rtn[i, :] = self.A + self.Jt.transpose() @ x_ref
-
-    return rtn
+    # Row i of the result is A + Jt^T x_i, which for all points at once
+    # is the broadcast sum A + X Jt
+    return self.A + np.matmul(quadX, self.Jt)
   
   def integrate(self, func, quad=GaussRule(2)):
 
@@ -58,12 +54,13 @@ class Triangle:
     
     elif callable(func):
 
-      xy = self.ref_to_phys(quad.X())
+      tab = tabulate(quad)
+      xy = self.ref_to_phys(tab.X)
       x = xy[:,0]
       y = xy[:,1]
 
       fVals = func(x,y)
-      return self.area * np.dot(fVals, quad.W())
+      return self.area * np.dot(fVals, tab.W)
     
     else:
       raise TypeError('argument {} is neither numeric nor callable'\
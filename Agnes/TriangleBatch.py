@@ -0,0 +1,103 @@
+# --------------------------------------------------------------------------
+# Geometry for a batch of triangles, stored as stacked arrays so that all
+# elements in a mesh can be processed with a few vectorized operations.
+# --------------------------------------------------------------------------
+
+import numpy as np
+from .Triangle import Triangle
+
+
+class TriangleBatch:
+  '''
+  Geometric data for a batch of triangles. For nElem triangles, the
+  attributes are
+  (*) A     -- (nElem, 2) coordinates of each triangle's first vertex
+  (*) Jt    -- (nElem, 2, 2) transposed Jacobians; row k of Jt[e] is the
+               edge from vertex 0 to vertex k+1 of triangle e
+  (*) detJ  -- (nElem,) Jacobian determinants
+  (*) area  -- (nElem,) triangle areas
+  (*) JtInv -- (nElem, 2, 2) inverses of the transposed Jacobians
+  These are the same quantities a Triangle computes for a single element.
+  '''
+
+  def __init__(self, verts, elems):
+    '''
+    Construct from an (nVerts, 2) array of vertex coordinates and an
+    (nElem, 3) array of element vertex indices. The indices are kept in
+    their own integer type, so no copy is made of a mesh's int32 array.
+    '''
+    self.verts = np.asarray(verts, dtype=np.double).reshape((-1,2))
+    self.elems = np.asarray(elems).reshape((-1,3))
+
+    self.A = self.verts[self.elems[:,0]]
+    self.Jt = np.stack((self.verts[self.elems[:,1]] - self.A,
+                        self.verts[self.elems[:,2]] - self.A), axis=1)
+
+    Jt = self.Jt
+    self.detJ = Jt[:,0,0]*Jt[:,1,1] - Jt[:,0,1]*Jt[:,1,0]
+    self.area = 0.5 * np.abs(self.detJ)
+
+    # Explicit 2x2 inverses, as in Triangle
+    self.JtInv = np.empty_like(Jt)
+    self.JtInv[:,0,0] = Jt[:,1,1]
+    self.JtInv[:,0,1] = -Jt[:,0,1]
+    self.JtInv[:,1,0] = -Jt[:,1,0]
+    self.JtInv[:,1,1] = Jt[:,0,0]
+    self.JtInv /= self.detJ[:,np.newaxis,np.newaxis]
+
+    # Physical quadrature points, keyed by rule
+    self._quadPts = {}
+
+  @staticmethod
+  def forMesh(mesh):
+    '''
+    Return the geometry of all elements in a mesh. The batch is cached on
+    the mesh, so it's computed only once and shared by every form and
+    every assembly pass on that mesh.
+    '''
+    return mesh.cached('TriangleBatch',
+                       lambda : TriangleBatch(mesh.vertArray(),
+                                              mesh.elemArray()))
+
+  def __len__(self):
+    return len(self.elems)
+
+  def refToPhys(self, quadX):
+    '''
+    Map an (nQ, 2) array of points on the reference triangle to every
+    triangle in the batch. The result is an (nElem, nQ, 2) array.
+    '''
+    return self.A[:,np.newaxis,:] + np.matmul(quadX, self.Jt)
+
+  def quadPts(self, quad, cache : bool = True):
+    '''
+    Return the physical coordinates of the points of a quadrature rule on
+    every triangle in the batch, as a read-only (nElem, nQ, 2) array. If
+    cache is True the points are kept for later calls with the same rule.
+    Since the batch from forMesh() is itself cached on the mesh, this
+    amounts to a per-(mesh, rule) cache.
+    '''
+    key = quad.key()
+    if key in self._quadPts:
+      return self._quadPts[key]
+
+    pts = self.refToPhys(quad.X())
+    pts.setflags(write=False)
+    if cache:
+      self._quadPts[key] = pts
+    return pts
+
+  def triangle(self, i : int):
+    '''
+    Return a Triangle object for element i. Its geometric data are views
+    into this batch, so nothing is recomputed or copied.
+    '''
+    tri = Triangle.__new__(Triangle)
+    tri.A = self.A[i]
+    tri.B = self.verts[self.elems[i,1]]
+    tri.C = self.verts[self.elems[i,2]]
+    tri.Jt = self.Jt[i]
+    tri.detJ = self.detJ[i]
+    tri.area = self.area[i]
+    tri.JtInv = self.JtInv[i]
+    return tri
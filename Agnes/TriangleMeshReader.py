@@ -5,37 +5,63 @@
 # output from Jonathan Shewchuk's Triangle mesh generator. See the
 # Triangle documentation at http://www.cs.cmu.edu/~quake/triangle.html.
 #
-# The reader expects to find three files:
+# The reader expects to find these files:
 # --- vertices in a .node file
-# --- edges in a .edge file
+# --- edges in a .edge file (optional)
 # --- elements in a .ele file
 #
 # Note: by default, Triangle does not produce a .edge file. Use the "-e"
-# option when running Triangle to produce this information.
+# option when running Triangle to produce this information. If there's no
+# .edge file (or the reader is told not to use it), the edges are derived
+# from the elements. Interior edges then get label "0" and boundary edges
+# are labeled with the boundary markers of their vertices in the .node
+# file, or with "1" if the vertices have no markers.
 #
-# If no boundary markers are provided, all edges will be given the label "0".
-# If edges have boundary markers, those markers are used as labels.
+# Labels derived from vertex markers are not always right. A vertex at a
+# corner between two boundary segments with different markers carries only
+# one of them, so the edges next to it can't be labeled reliably; such an
+# edge gets the larger of its two vertex markers, and a warning is issued.
+# An edge joining two corners can get the wrong label with no warning. The
+# .edge file, when present, is always used unless useEdgeFile is False, and
+# its segment markers give the correct labels.
+#
+# If edges in a .edge file have no boundary markers, they will all be given
+# the label "0". If they have boundary markers, those are used as labels.
 #
 #
 # Katharine Long, Sep 2020
 # For Math 5344
 # --------------------------------------------------------------------------
 
+import os
+import numpy as np
 from .LoadableMesh import LoadableMesh
+from .MeshOrdering import renumberMesh
 
 class TriangleMeshReader:
     # Create a reader object to read a mesh from the files
-    # filename.node, filename.edge, and filename.ele
-    def __init__(self, filename):
+    # filename.node, filename.edge, and filename.ele. If useEdgeFile is
+    # False, the edges are derived from the elements even if there's an
+    # edge file. If an ordering ('rcm', 'hilbert' or 'morton') is given,
+    # the mesh is renumbered with MeshOrdering.renumberMesh after reading.
+    def __init__(self, filename, useEdgeFile=True, ordering=None):
         self.filename = filename
         self.offset = 0
+        self.useEdgeFile = useEdgeFile
+        self.ordering = ordering
+        self.vertMarkers = None
 
     # Call this function to read the mesh and return it to the user
     def getMesh(self):
         mesh = LoadableMesh()
         self.readVerts(mesh)
-        self.readSides(mesh)
-        self.readElems(mesh)
+        if self.useEdgeFile and os.path.exists('%s.edge' % self.filename):
+            self.readSides(mesh)
+            self.readElems(mesh)
+        else:
+            self.readElems(mesh, deriveSides=True)
+        if self.ordering is not None:
+            (mesh, vertOrder) = renumberMesh(mesh, self.ordering)
         return mesh
 
     # ---- Functions past this point are for internal use
@@ -54,93 +80,70 @@ class TriangleMeshReader:
             return []
         return line.split()
 
+    # Read a table from one of Triangle's files: a header line whose first
+    # entry is the number of rows, followed by that many rows of numbers.
+    # Return the header tokens and the rows as a 2D array.
+    def readTable(self, f):
+        for line in f:
+            header = self.tokenize(line)
+            if len(header)>0:
+                break
+        n = int(header[0])
+        rows = np.loadtxt(f, comments='#', ndmin=2, max_rows=n)
+        if len(rows) != n:
+            raise RuntimeError('Expected %d rows in %s, found %d'
+                               % (n, f.name, len(rows)))
+        return (header, rows)
+
     # Read the vertices from the .node file
     def readVerts(self, mesh):
 
-        #print('reading verts')
-
         with open('%s.node' % self.filename) as f:
+            (header, rows) = self.readTable(f)
 
-            lineCount = 0
-
-            for line in f:
-                toks = self.tokenize(line)
-                if len(toks)==0:
-                    continue
+        # Use the first node's index to determine whether indices are
+        # numbered starting from 0 or from 1.
+        if len(rows)>0:
+            self.offset = int(rows[0,0])
 
-                # If this is our first line of content, the number of nodes
-                # is the first entry.
-                if lineCount==0:
-                    nNodes = int(toks[0])
-                    #print('nVerts = %d' % nNodes)
-                    lineCount +=1
-                    continue
+        # The header gives the number of attributes and whether there's a
+        # boundary marker, which follows the attributes.
+        nAttr = int(header[2]) if len(header)>2 else 0
+        hasMarkers = len(header)>3 and int(header[3])>0
+        if hasMarkers:
+            self.vertMarkers = rows[:,3+nAttr].astype(np.int64)
+        else:
+            self.vertMarkers = None
 
-                # If this is our first node, use its index to determine whether
-                # indices are numbered starting from 0 or from 1.
-                if lineCount==1:
-                    self.offset = int(toks[0])
-
-                # Add the vertex to the mesh
-                v = (float(toks[1 ]), float(toks[2]))
-                mesh.addVertex(v)
-
-                lineCount += 1
+        mesh.addVertices(rows[:,1:3])
 
 
     # Read the sides from the .edge file
     def readSides(self, mesh):
 
-        #print('reading edges')
-
         with open('%s.edge' % self.filename) as f:
+            (header, rows) = self.readTable(f)
 
-            first = True
-
-            for line in f:
-                toks = self.tokenize(line)
-                if len(toks)==0:
-                    continue
+        sides = rows[:,1:3].astype(np.int64) - self.offset
+        if rows.shape[1]>=4:
+            labels = rows[:,3].astype(np.int64)
+        else:
+            labels = 0
+        mesh.addSides(sides, labels)
 
-                if first:
-                    nSides = int(toks[0])
-                    #print('nSides = %d' % nSides)
-                    first = False
-                    continue
 
-                s = [int(toks[1])-self.offset, int(toks[2])-self.offset]
-                if len(toks)>=4:
-                    label = int(toks[3])
-                else:
-                    label = 0
-                mesh.addSide(s[0], s[1], label)
-
-
-
-    # Read the elements from the .ele file
-    def readElems(self, mesh):
-
-        #print('reading elems')
+    # Read the elements from the .ele file. If deriveSides is True, the
+    # sides are found from the elements and added to the mesh too.
+    def readElems(self, mesh, deriveSides=False):
 
         with open('%s.ele' % self.filename) as f:
+            (header, rows) = self.readTable(f)
 
-            first = True
-
-            for line in f:
-                toks = self.tokenize(line)
-                if len(toks)==0:
-                    continue
-
-                if first:
-                    nElems = int(toks[0])
-                    #print('nElems = %d' % nElems)
-                    first = False
-                    continue
-
-                a = int(toks[1])-self.offset
-                b = int(toks[2])-self.offset
-                c = int(toks[3])-self.offset
-                mesh.addElem(a,b,c)
+        elems = rows[:,1:4].astype(np.int64) - self.offset
+        if deriveSides:
+            mesh.addElemsAndSides(elems, self.vertMarkers)
+        else:
+            mesh.addElems(elems)
 
 
 # ------------------------------------------------------------------------
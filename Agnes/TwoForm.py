@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
+import numbers
 from .QuadratureRule import QuadratureRule
+from .QuadratureRegistry import cheapestRule
 from .Triangle import Triangle
+from .TriangleBatch import TriangleBatch
+from .BasisTabulation import tabulate
 import numpy as np
 
 
@@ -29,6 +33,27 @@ class TwoForm(ABC):
     '''
     pass
 
+  def localMats(self, tris : TriangleBatch, nodes):
+    '''
+    Compute the local matrices on a batch of triangles, returned as an
+    (nBatch, 3, 3) array. The nodes argument is the (nBatch, 3) array of
+    the triangles' vertex indices. The default implementation simply calls
+    localMat() on each triangle; derived classes should override it with
+    a vectorized version when they can.
+    '''
+    rtn = np.zeros((len(tris), 3, 3))
+    for i in range(len(tris)):
+      rtn[i] = self.localMat(tris.triangle(i), nodes[i])
+    return rtn
+
+  def isSymmetric(self):
+    '''
+    Indicate whether this form's local matrices are always symmetric.
+    Forms that can't guarantee this should return False, which is the
+    default.
+    '''
+    return False
+
   def testID(self):
     '''
     Return the ID of the test function appearing in this two-form.
@@ -42,6 +67,33 @@ class TwoForm(ABC):
     return self._unkID
 
 
+def groupTwoForms(twoForms):
+  '''
+  Group two-forms by their (testID, unkID) pair. Forms in a group write
+  into the same global entries, so their local matrices can be summed
+  and scattered once. Returns a dict mapping each pair to a list of forms,
+  in order of first appearance.
+  '''
+  groups = {}
+  for aForm in twoForms:
+    groups.setdefault((aForm.testID(), aForm.unkID()), []).append(aForm)
+  return groups
+
+
+def sumLocalMats(twoForms, tris : TriangleBatch, nodes):
+  '''
+  Sum the local matrices of several two-forms over a batch of triangles,
+  accumulating into a single (nBatch, 3, 3) array.
+  '''
+  if len(twoForms)==1:
+    return twoForms[0].localMats(tris, nodes)
+
+  rtn = np.zeros((len(tris), 3, 3))
+  for aForm in twoForms:
+    rtn += aForm.localMats(tris, nodes)
+  return rtn
+
+
 class LaplacianTwoForm(TwoForm):
   '''
   Local Laplacian matrix builder
@@ -82,6 +134,20 @@ class LaplacianTwoForm(TwoForm):
     # Form the local matrix
     rtn = self._coeff*tri.area*np.matmul(np.transpose(gradPhi), gradPhi)
     return rtn
+
+  def localMats(self, tris:TriangleBatch, nodes):
+    '''
+    Form the local matrices on a batch of triangles. This is the same
+    calculation as localMat(), with the gradients for all triangles
+    transformed at once.
+    '''
+    gradPhi = np.matmul(tris.JtInv, LaplacianTwoForm.gradPhiRef())
+    rtn = np.einsum('eki,ekj->eij', gradPhi, gradPhi)
+    rtn *= (self._coeff*tris.area)[:,np.newaxis,np.newaxis]
+    return rtn
+
+  def isSymmetric(self):
+    return self.testID()==self.unkID()
   
 
 # --------------------------------------------------------------------------
@@ -99,7 +165,7 @@ class MassTwoForm(TwoForm):
   def __init__(self, coeff=1.0, testID:int=0, unkID:int=0):
     super().__init__(testID=testID, unkID=unkID)
     if not isinstance(coeff, (int, float, np.double)):
-      raise TypeError('Coefficient argument to LaplacianTwoForm '
+      raise TypeError('Coefficient argument to MassTwoForm '
                       'should be a constant; argument was {}'\
                       .format(coeff))
     
@@ -112,5 +178,138 @@ class MassTwoForm(TwoForm):
 
   # Compute the local mass matrix on a triangle.
   def localMat(self, tri : Triangle, nodes : tuple):
-    return tri.area * MassTwoForm.M
+    return self._coeff * tri.area * MassTwoForm.M
+
+  # Compute the local mass matrices on a batch of triangles.
+  def localMats(self, tris : TriangleBatch, nodes):
+    return (self._coeff*tris.area)[:,np.newaxis,np.newaxis] * MassTwoForm.M
+
+  def isSymmetric(self):
+    return self.testID()==self.unkID()
+
+  # Return the row-sum lumped version of this form, a one-form whose
+  # assembled vector is the diagonal of the lumped mass matrix. Only
+  # diagonal blocks (testID==unkID) can be lumped.
+  def lumped(self):
+    from .OneForm import LumpedMassOneForm
+    if self.testID() != self.unkID():
+      raise ValueError('Only mass forms with testID==unkID can be lumped; '
+                       'got testID={}, unkID={}'.format(self.testID(),
+                                                        self.unkID()))
+    return LumpedMassOneForm(self._coeff, testID=self.testID())
+
+
+
+class QuadratureTwoForm(TwoForm):
+  '''
+  Base class for two-forms with a variable coefficient, computed by
+  quadrature. The coefficient is called as coeffFunc(x, y, dfVals), where
+  dfVals holds the values of the optional discrete function dfs at the
+  points (x,y), or is None if no discrete function was given. As with
+  VarCoeffOneForm, the coefficient function must accept numpy arrays.
+  The quad argument is either a quadrature rule or an integer degree, in
+  which case the cheapest registered rule exact to that degree is used.
+  '''
+
+  def __init__(self, quad : QuadratureRule, coeffFunc, dfs = None,
+               testID:int=0, unkID:int=0):
+    super().__init__(testID=testID, unkID=unkID)
+    if not callable(coeffFunc):
+      raise TypeError('Coefficient argument to {} should be callable; '
+                      'argument was {}'.format(type(self).__name__,
+                                                coeffFunc))
+    if isinstance(quad, numbers.Integral):
+      quad = cheapestRule(quad)
+    self._quad = quad
+    self._coeffFunc = coeffFunc
+    self._dfs = dfs
 
+    self._phiAtQuadPts = tabulate(quad).phi
+
+  def w(self):
+    return self._quad.W()
+
+  def xy(self):
+    return self._quad.X()
+
+  def phiAtQuadPts(self):
+    return self._phiAtQuadPts
+
+  def coeffAtQuadPts(self, tri : Triangle, nodes : tuple):
+    '''
+    Evaluate the coefficient at the quadrature points of one triangle
+    '''
+    if self._dfs is None:
+      dfVals = None
+    else:
+      dfVals = self._dfs.interpolate(nodes, self._phiAtQuadPts)
+
+    XY = tri.ref_to_phys(self.xy())
+    vals = self._coeffFunc(XY[:,0], XY[:,1], dfVals)
+    return np.broadcast_to(vals, (self._quad.n(),))
+
+  def coeffAtAllQuadPts(self, tris : TriangleBatch, nodes):
+    '''
+    Evaluate the coefficient at the quadrature points of every triangle in
+    a batch, with a single call to the coefficient function. The result
+    is an (nBatch, nQuad) array.
+    '''
+    nElems = len(tris)
+    nQuad = self._quad.n()
+
+    if self._dfs is None:
+      dfVals = None
+    else:
+      dfVals = self._dfs.interpolateOnElems(nodes,
+                                            self._phiAtQuadPts).ravel()
+
+    XY = tris.quadPts(self._quad).reshape((nElems*nQuad, 2))
+    vals = self._coeffFunc(XY[:,0], XY[:,1], dfVals)
+    return np.broadcast_to(vals, (nElems*nQuad,)).reshape((nElems, nQuad))
+
+  def isSymmetric(self):
+    return self.testID()==self.unkID()
+
+
+class VarCoeffLaplacianTwoForm(QuadratureTwoForm):
+  '''
+  Weak Laplacian with a variable diffusion coefficient,
+  \\int_T k(x,y) grad(phi_i)*grad(phi_j).
+  The P1 gradients are constant on each triangle, so only the coefficient
+  needs to be integrated.
+  '''
+
+  def localMat(self, tri : Triangle, nodes : tuple):
+    kBar = tri.area * np.dot(self.coeffAtQuadPts(tri, nodes), self.w())
+    gradPhi = np.matmul(tri.JtInv, LaplacianTwoForm.gradPhiRef())
+    return kBar * np.matmul(np.transpose(gradPhi), gradPhi)
+
+  def localMats(self, tris : TriangleBatch, nodes):
+    kBar = tris.area * (self.coeffAtAllQuadPts(tris, nodes) @ self.w())
+    gradPhi = np.matmul(tris.JtInv, LaplacianTwoForm.gradPhiRef())
+    rtn = np.einsum('eki,ekj->eij', gradPhi, gradPhi)
+    rtn *= kBar[:,np.newaxis,np.newaxis]
+    return rtn
+
+
+class VarCoeffMassTwoForm(QuadratureTwoForm):
+  '''
+  Mass matrix with a variable reaction coefficient,
+  \\int_T c(x,y) phi_i*phi_j.
+  '''
+
+  def __init__(self, quad : QuadratureRule, coeffFunc, dfs = None,
+               testID:int=0, unkID:int=0):
+    super().__init__(quad, coeffFunc, dfs=dfs, testID=testID, unkID=unkID)
+    # Products phi_i*phi_j at the quadrature points, as an (nQuad, 9) array
+    self._phiPhi = tabulate(self._quad).phiPhi
+
+  def localMat(self, tri : Triangle, nodes : tuple):
+    cw = self.coeffAtQuadPts(tri, nodes) * self.w()
+    return tri.area * (cw @ self._phiPhi).reshape((3,3))
+
+  def localMats(self, tris : TriangleBatch, nodes):
+    cw = self.coeffAtAllQuadPts(tris, nodes) * self.w()
+    rtn = (cw @ self._phiPhi).reshape((-1,3,3))
+    rtn *= tris.area[:,np.newaxis,np.newaxis]
+    return rtn
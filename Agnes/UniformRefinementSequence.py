@@ -1,181 +1,115 @@
 import numpy as np
-from LoadableMesh import *
 import scipy.sparse as sp
+from .LoadableMesh import LoadableMesh
+from .MeshTopology import matchElemEdges
+from .MeshOrdering import renumberMesh
+
+def UniformRefinement(coarse, verb=0, ordering=None):
+
+    # Refine by splitting each triangle into four, putting a new vertex at
+    # the midpoint of each edge. Everything is done on whole arrays, and the
+    # fine mesh is built with the bulk construction functions. If an
+    # ordering ('rcm', 'hilbert' or 'morton') is given, the fine mesh is
+    # renumbered with MeshOrdering.renumberMesh, and the update and
+    # downdate operators are permuted to match.
+
+    verts = coarse.vertArray()
+    elems = coarse.elemArray()
+    sides = coarse.sideArray()
+    labels = coarse.sideLabelArray()
+
+    numVerts = len(verts)
+    numElems = len(elems)
+
+    # Side index of each element edge. Edge i runs from vertex i to vertex
+    # (i+1)%3. Only sides that are element edges get a midpoint; this skips
+    # any duplicate copies of a side.
+    elemEdges = matchElemEdges(elems, sides, numVerts)
+    (usedSides, edgeRank) = np.unique(elemEdges, return_inverse=True)
+    edgeRank = edgeRank.reshape((-1,3))
+    numEdges = len(usedSides)
+
+    if verb>0:
+        print('refining %d elements with %d edges' % (numElems, numEdges))
 
-def UniformRefinement(coarse, verb=0):
+    # -------------------------------------------------------------------
+    # ---- New vertices: the old vertices keep their indices, and the
+    # midpoint of the k-th used edge gets index numVerts+k.
+    # -------------------------------------------------------------------
+    edgeVerts = sides[usedSides]
+    mids = 0.5*(verts[edgeVerts[:,0]] + verts[edgeVerts[:,1]])
+    midIndex = numVerts + np.arange(numEdges)
 
-    coarse = coarse
-    fine = LoadableMesh()
+    # Element vertices, using Exodus ordering where new vertex i+3 is
+    # opposite vertex i. Vertex i+3 is thus the midpoint of edge (i+1)%3.
+    v = np.empty((numElems, 6), dtype=np.int64)
+    v[:,0:3] = elems
+    v[:,3:6] = numVerts + np.roll(edgeRank, -1, axis=1)
 
-    numVerts = len(coarse.verts)
-    numEdges = len(coarse.sides)
-    numElems = len(coarse.elems)
+    # -------------------------------------------------------------------
+    # ---- New sides. Each old edge is split into two children that inherit
+    # the label of the parent. The three interior edges of each element
+    # ([3,5], [3,4], [4,5]) get label 0.
+    # -------------------------------------------------------------------
+    childSides = np.concatenate((
+        np.column_stack((edgeVerts[:,0], midIndex)),
+        np.column_stack((edgeVerts[:,1], midIndex)),
+        v[:,[3,5]], v[:,[3,4]], v[:,[4,5]]))
+    childLabels = np.concatenate((labels[usedSides], labels[usedSides],
+                                  np.zeros(3*numElems, dtype=labels.dtype)))
+
+    # ---- Child elements, four per parent, numbered parent by parent
+    childElems = v[:, [[0,5,4], [1,3,5], [2,4,3], [3,4,5]]]
+
+    # ---- Side indices of the child element edges, so they don't have to
+    # be matched to the sides. The child of edge i touching vertex j is
+    # side edgeRank[:,i] if j is the edge's first vertex, and that plus
+    # numEdges if it's the second.
+    def half(i, j):
+        r = edgeRank[:,i]
+        return r + numEdges*(elems[:,j] != edgeVerts[r,0])
+    (i35, i34, i45) = 2*numEdges + numElems*np.arange(3)[:,np.newaxis] \
+        + np.arange(numElems)
+    childEdges = np.stack((
+        np.column_stack((half(0,0), i45, half(2,0))),
+        np.column_stack((half(1,1), i35, half(0,1))),
+        np.column_stack((half(2,2), i34, half(1,2))),
+        np.column_stack((i34, i45, i35))), axis=1)
 
+    fine = LoadableMesh()
+    fine.addVertices(np.concatenate((verts, mids)))
+    fine.addSides(childSides, childLabels)
+    fine.addElems(childElems.reshape((-1,3)), childEdges.reshape((-1,3)))
+
+    # -- Refinement is done. Create the prolongation and restriction
+    # operators. The update operator uses interpolation: old vertices are
+    # copied, and midpoints get the average of the edge's endpoints. The
+    # downdate operator is the transpose of the update operator, with each
+    # row normalized by its sum.
     numNewVerts = numVerts + numEdges
-    numNewEdges = 2*numEdges + 3*numElems
-    numNewElems = 4*numElems
+    rows = np.concatenate((np.arange(numVerts), midIndex, midIndex))
+    cols = np.concatenate((np.arange(numVerts),
+                           edgeVerts[:,0], edgeVerts[:,1]))
+    vals = np.concatenate((np.ones(numVerts), np.full(2*numEdges, 0.5)))
 
-    vertDone = np.zeros(numVerts, dtype=np.bool)
-    oldEdgeDone = np.zeros(numEdges, dtype=np.bool)
-    oldToNewVertexMap = -np.ones(numVerts, dtype=np.int64)
-    oldEdgeToNewVertMap = -np.ones(numEdges, dtype=np.int64)
+    update = sp.csr_matrix((vals, (rows, cols)),
+                           shape=(numNewVerts, numVerts))
 
-    updateIndices = []
-    updateVals = []
-
-    elemVerts = np.zeros([numElems, 6], dtype=np.int64)
-
-
-    # -------------------------------------------------------------------
-    # ---- Insert new vertices and new edges
-    # -------------------------------------------------------------------
+    downdate = update.T.tocsr()
+    rowSums = np.asarray(downdate.sum(axis=1)).ravel()
+    downdate = (sp.diags(1.0/rowSums) @ downdate).tocsr()
 
-    # Loop over old elems, inserting each old vertex exactly once and then
-    # create insert new vertices at the edge midpoint
-    for el in range(numElems):
-
-        curElemVerts = coarse.elems[el]
-
-        if verb>0:
-            print('processing old element id=', el, ', verts=', curElemVerts)
-
-        # Put this element's vertices in new mesh
-        for i,oldVertID in enumerate(curElemVerts):
-            # Add only those vertices that haven't yet been added
-            if not vertDone[oldVertID]:
-                if verb>0:
-                    print('\tadding vertex ID=', oldVertID )
-                # Put the vertex in the refined mesh
-                newVertID = fine.addVertex(coarse.verts[oldVertID])
-                # Record the indices and the weights for the update
-                # matrix
-                updateIndices.append([oldVertID])
-                updateVals.append([1.0])
-                elemVerts[el,i]=newVertID
-                oldToNewVertexMap[oldVertID]=newVertID
-                vertDone[oldVertID] = True
-            else:
-                elemVerts[el,i]=oldToNewVertexMap[oldVertID]
-
-        # Put new vertices at midpoints of old edges.
-        # Use Exodus ordering where new vertex i+3 is
-        # opposite vertex i.
-        for i,S in enumerate(([1,2], [2,0], [0,1])):
-            # Get vertices on current edge, then sort to make a key
-            # into old mesh's dictionary of vertices
-            s = [curElemVerts[S[0]], curElemVerts[S[1]]]
-            s.sort();
-            if verb>0:
-                print('\tchecking vertex at midpoint of edge=', s )
-            sKey = tuple(s)
-            oldEdgeIndex = coarse.sideToIndexMap[sKey]
-            # Add only those edges that haven't yet been added
-            if not oldEdgeDone[oldEdgeIndex]:
-                if verb>0:
-                    print('\t\tinserting vertex at midpoint of edge=', s )
-                # Find midpoint of new edge
-                p1 = coarse.verts[s[0]]
-                p2 = coarse.verts[s[1]]
-                pMid= (0.5*(p1[0]+p2[0]), 0.5*(p1[1]+p2[1]))
-                # Put a new vertex at the midpoint
-                newVertID = fine.addVertex(pMid)
-                if verb>0:
-                    print('\t\tnew vertex ID =', newVertID )
-                # Associate the new vertex with the current element
-                elemVerts[el, 3+i] = newVertID
-                # Record the indices and weights for the update matrix
-                updateIndices.append(s)
-                updateVals.append([0.5, 0.5])
-                oldEdgeDone[oldEdgeIndex] = True
-                oldEdgeToNewVertMap[oldEdgeIndex]=newVertID
-
-                # Now that we've created the new vertex, add the two
-                # new child edges to the new mesh. The children inherit
-                # the label of the parent.
-                oldLabel = coarse.sideLabels[oldEdgeIndex]
-                v0 = oldToNewVertexMap[s[0]]
-                v1 = oldToNewVertexMap[s[1]]
-                if verb>0:
-                    print('\t\tadding new edge ', (v0, newVertID) )
-                newEdgeID = fine.addSide(v0, newVertID, oldLabel)
-
-                if verb>0:
-                    print('\t\tadding new edge ', (v1, newVertID) )
-                newEdgeID = fine.addSide(v1, newVertID, oldLabel)
-            else:
-                if verb>0:
-                    print('\t\treusing vertex at midpoint of edge=', s )
-                v = oldEdgeToNewVertMap[oldEdgeIndex]
-                elemVerts[el,i+3]=v
-                if verb>0:
-                    print('\t\treusing vertex at midpoint of edge=', s,
-                        ' with ID=', v)
-
-        # Add the new interior edges ([3,5], [3,4], [4,5]). Since these
-        # aren't shared between elements, there's no need to check
-        # whether they've been done before.
-        newEdgeID = fine.addSide(elemVerts[el,3], elemVerts[el,5], 0)
-        newEdgeID = fine.addSide(elemVerts[el,3], elemVerts[el,4], 0)
-        newEdgeID = fine.addSide(elemVerts[el,4], elemVerts[el,5], 0)
-
-        # -------- Done inserting new vertices and edges
-
-        # ---- Insert child elements
-        if verb>0:
-            print('\tinserting four child elements')
-        v = elemVerts[el,:]
-        if verb>0:
-            print('\telemVerts are ', v)
-
-        if verb>0:
-            print('\t\tadding new elem ', (v[0], v[5], v[4]) )
-        fine.addElem(v[0], v[5], v[4])
-
-        if verb>0:
-            print('\t\tadding new elem ', (v[1], v[3], v[5]) )
-        fine.addElem(v[1], v[3], v[5])
-
-        if verb>0:
-            print('\t\tadding new elem ', (v[2], v[4], v[3]) )
-        fine.addElem(v[2], v[4], v[3])
-
-        if verb>0:
-            print('\t\tadding new elem ', (v[3], v[4], v[5]) )
-        fine.addElem(v[3], v[4], v[5])
-
-    # -- Refinemnt is done. Create the prolongation and restriction operators.
-    # The update operator uses interpolation. The downdate operator is the
-    # normalized transpose of the update operator.
-
-    # build the matrices in DOK form
-    update = sp.dok_matrix((numNewVerts, numVerts))
-    downdate = sp.dok_matrix((numVerts, numNewVerts))
-    for r in range(numNewVerts):
-        for c,v in zip(updateIndices[r],updateVals[r]):
-            update[r,c]=v
-            downdate[c,r]=v
-
-    # Update matrix is ready; convert to CSR
-    update = update.tocsr()
-
-    # Normalize the rows of the downdate operator by the row sum.
-    # Start by converting to list-of-list format
-    downdate = downdate.tolil()
-    # normalize rows
-    for r in range(numVerts):
-        row = downdate.getrowview(r)
-        nrm = row.sum()
-        row /= nrm
-
-    # Convert to CSR
-    downdate = downdate.tocsr()
+    if ordering is not None:
+        (fine, vertOrder) = renumberMesh(fine, ordering)
+        update = update[vertOrder]
+        downdate = downdate[:,vertOrder]
 
     return (fine, update, downdate)
 
 
 class UniformRefinementSequence:
 
-    def __init__(self, coarse, numLevels):
+    def __init__(self, coarse, numLevels, ordering=None):
 
         self.meshes = []
         self.meshes.append(coarse)
@@ -183,7 +117,8 @@ class UniformRefinementSequence:
         self.downdates = []
 
         for i in range(1,numLevels):
-            fine, up, down = UniformRefinement(self.meshes[i-1])
+            fine, up, down = UniformRefinement(self.meshes[i-1],
+                                               ordering=ordering)
             self.meshes.append(fine)
             self.updates.append(up)
             self.downdates.append(down)
@@ -224,8 +159,8 @@ class UniformRefinementSequence:
 
 if __name__=='__main__':
 
-    from VTKWriter import *
-    from TriangleMeshReader import *
+    from .VTKWriter import *
+    from .TriangleMeshReader import *
     from math import pi, sin
     import numpy.linalg as la
 
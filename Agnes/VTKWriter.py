@@ -24,7 +24,7 @@ class VTKWriter:
         if self.mesh == None:
           raise RuntimeError('VTKWriter must add mesh before'
                              ' adding fields')
-        nNodes = len(self.mesh.verts)
+        nNodes = len(self.mesh.vertArray())
         if len(f) % nNodes != 0:
           raise ValueError('Vector size isn\'t an integer '
                            'multiple of # mesh nodes')
@@ -53,8 +53,8 @@ class VTKWriter:
         ug.writeHeader(self.file)
 
         pc = XMLHeader('Piece')
-        pc.addAttribute('NumberOfPoints', len(self.mesh.verts))
-        pc.addAttribute('NumberOfCells', len(self.mesh.elems))
+        pc.addAttribute('NumberOfPoints', len(self.mesh.vertArray()))
+        pc.addAttribute('NumberOfCells', len(self.mesh.elemArray()))
 
         pc.writeHeader(self.file)
 
@@ -79,8 +79,11 @@ class VTKWriter:
         data.addAttribute('format', 'ascii')
         data.writeHeader(self.file)
 
-        for p in self.mesh.verts:
-            self.file.write('%g %g 0.0\n' % p)
+        # Write all points at once; works for any mesh providing
+        # vertArray(), e.g., LoadableMesh or CompactMesh
+        verts = self.mesh.vertArray()
+        np.savetxt(self.file, np.column_stack((verts, np.zeros(len(verts)))),
+                   fmt='%g')
 
         data.writeFooter(self.file)
         pts.writeFooter(self.file)
@@ -96,8 +99,7 @@ class VTKWriter:
         conn.addAttribute('format', 'ascii')
         conn.writeHeader(self.file)
 
-        for e in self.mesh.elems:
-            self.file.write('%d %d %d\n' % e)
+        np.savetxt(self.file, self.mesh.elemArray(), fmt='%d')
 
         conn.writeFooter(self.file)
 
@@ -107,11 +109,8 @@ class VTKWriter:
         offsets.addAttribute('format', 'ascii')
         offsets.writeHeader(self.file)
 
-        count=0
-        numCells = len(self.mesh.elems)
-        for c in range(numCells):
-            count += 3
-            self.file.write('%d\n' % count)
+        numCells = len(self.mesh.elemArray())
+        np.savetxt(self.file, 3*np.arange(1, numCells+1), fmt='%d')
 
 
         offsets.writeFooter(self.file)
@@ -122,8 +121,7 @@ class VTKWriter:
         types.addAttribute('format', 'ascii')
         types.writeHeader(self.file)
 
-        for c in range(numCells):
-            self.file.write('5\n') # code for triangle elements
+        self.file.write('5\n' * numCells) # code for triangle elements
 
         types.writeFooter(self.file)
         cells.writeFooter(self.file)
@@ -144,8 +142,7 @@ class VTKWriter:
             xml.addAttribute('format', 'ascii')
             xml.writeHeader(self.file)
 
-            for f in field:
-                self.file.write('%g\n' % f)
+            np.savetxt(self.file, field, fmt='%g')
 
             xml.writeFooter(self.file)
 
@@ -1,15 +1,37 @@
 from .DiscreteSpace import (DiscreteSpace, DiscreteFunction)
 from .LoadableMesh import (LoadableMesh, TwoElemSquare)
+from .CompactMesh import CompactMesh
 from .Assembler import Assembler
+from .DirichletBC import (DirichletBC, applyDirichletBCs)
+from .ErrorNorms import (integrate, l2Error, h1SemiError)
+from .TimeStepping import (TimeStepper, ThetaMethod, ExplicitStepper)
+from .MatrixFreeOperator import MatrixFreeOperator
+from .SymmetricStorage import (expandUpper, symmetricOperator)
 from .MeshUtils import *
 from .OneForm import (OneForm, QuadratureOneForm,
-                      ConstCoeffOneForm, VarCoeffOneForm)
-from .TwoForm import (TwoForm, 
-                      LaplacianTwoForm, MassTwoForm)
+                      ConstCoeffOneForm, VarCoeffOneForm,
+                      InterpolatedOneForm, LumpedMassOneForm)
+from .TwoForm import (TwoForm, QuadratureTwoForm,
+                      LaplacianTwoForm, MassTwoForm,
+                      VarCoeffLaplacianTwoForm, VarCoeffMassTwoForm)
 from .QuadratureRule import (QuadratureRule, GaussRule)
+from .CollapsedGaussRule import CollapsedGaussRule
+from .QuadratureRegistry import (QuadratureRegistry, cheapestRule,
+                                 exactDegree)
+from .BasisTabulation import (BasisTabulation, tabulate)
+from .P1Basis import P1Basis
 from .Triangle import Triangle
+from .TriangleBatch import TriangleBatch
+from .PointLocator import PointLocator
+from .EdgeBatch import (EdgeBatch, gaussLine)
+from .BoundaryForm import (BoundaryOneForm, BoundaryTwoForm,
+                           NeumannOneForm, RobinTwoForm)
+from .SparsityPattern import SparsityPattern
 from .TriangleMeshReader import TriangleMeshReader
 from .RectangleMesher import meshRectangle
+from .MeshOrdering import (renumberMesh, vertexOrdering)
+from .UniformRefinementSequence import (UniformRefinement,
+                                        UniformRefinementSequence)
 from .VTKWriter import VTKWriter
 
 
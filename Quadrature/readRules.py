@@ -1,4 +1,8 @@
 import pprint
+import os
+
+# The tables are installed with the package
+tableDir = os.path.join(os.pardir, 'Agnes', 'QuadratureTables')
 
 files = (
   (3, 'strang4'),
@@ -13,19 +17,17 @@ for f in files:
   order = f[0]
   name = f[1]
 
-  wFile = open('{}_w.txt'.format(name), 'r')
-
   w = []
   x = []
   
-  with open('{}_w.txt'.format(name), 'r') as wFile:
+  with open(os.path.join(tableDir, '{}_w.txt'.format(name)), 'r') as wFile:
     for line in wFile:
       L = line.strip(' \r\n')
       if len(L)==0:
         continue
       w.append(float(L))
 
-  with open('{}_x.txt'.format(name), 'r') as xFile:
+  with open(os.path.join(tableDir, '{}_x.txt'.format(name)), 'r') as xFile:
     for line in xFile:
       L = line.strip(' \r\n')
       if len(L)==0:
@@ -0,0 +1,60 @@
+import numpy as np
+import scipy.sparse.linalg as spla
+import time
+import sys
+from Agnes import *
+
+# Compare assembly and sparse LU timings for a mesh as read from Triangle
+# and after each of the renumbering methods. Usage:
+#   python MeshOrderingTiming.py [level] [refinements]
+# reads ../Meshes/triExample.<level> and refines it uniformly.
+
+def bestTime(func, reps=3):
+  best = np.inf
+  for r in range(reps):
+    start = time.perf_counter()
+    rtn = func()
+    best = min(best, time.perf_counter() - start)
+  return (best, rtn)
+
+
+if __name__ == '__main__':
+
+  level = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+  numRefine = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+  mesh = TriangleMeshReader('../Meshes/triExample.%d' % level).getMesh()
+  for i in range(numRefine):
+    (mesh, update, downdate) = UniformRefinement(mesh)
+
+  print('%d vertices, %d elements' % (len(mesh.verts), len(mesh.elems)))
+  # splu is timed with the natural column order, which shows the effect of
+  # the mesh ordering on fill directly, and with SuperLU's default COLAMD
+  # column ordering.
+  print('%-10s %10s %10s %10s %10s %12s %12s' % ('ordering', 'renumber',
+        'bandwidth', 'assemble', 'splu', 'nnz(L+U)', 'splu(colamd)'))
+
+  forms = (LaplacianTwoForm(), MassTwoForm())
+
+  for ordering in (None, 'rcm', 'hilbert', 'morton'):
+    if ordering is None:
+      (tRenumber, m) = (0.0, mesh)
+    else:
+      (tRenumber, (m, vertOrder)) = bestTime(
+        lambda : renumberMesh(mesh, ordering), reps=1)
+
+    ds = DiscreteSpace(m, 1)
+    # Build the sparsity pattern and geometry before timing
+    Assembler(ds, forms, ()).assemble(buildVec=False)
+    (tAssemble, (A, b)) = bestTime(
+      lambda : Assembler(ds, forms, ()).assemble(buildVec=False))
+
+    A = A.tocsc()
+    (tLU, lu) = bestTime(lambda : spla.splu(A, permc_spec='NATURAL'))
+    (tCOLAMD, luCOLAMD) = bestTime(lambda : spla.splu(A))
+
+    rows, cols = A.nonzero()
+    bandwidth = np.max(np.abs(rows - cols))
+
+    print('%-10s %10.4f %10d %10.4f %10.4f %12d %12.4f' % (str(ordering),
+          tRenumber, bandwidth, tAssemble, tLU, lu.L.nnz + lu.U.nnz, tCOLAMD))
@@ -11,6 +11,7 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     url="https://github.com/krlong014/Agnes",
     packages=setuptools.find_packages(),
+    package_data={'Agnes' : ['QuadratureTables/*.txt']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: MIT License",
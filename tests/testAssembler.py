@@ -0,0 +1,240 @@
+from Agnes import *
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+
+def loadFunc(x, y, u=None):
+  return np.cos(np.pi*x)*np.sin(2.0*np.pi*y) + x*y
+
+
+def compareWithDOK(ds, twoForms, oneForms, method, tol=1.0e-13):
+  '''
+  Assemble with the reference 'dok' loop and with the specified method,
+  and return the relative differences in the matrix and vector.
+  '''
+  assembler = Assembler(ds, twoForms, oneForms)
+
+  (A0, b0) = assembler.assemble(method='dok')
+  (A1, b1) = assembler.assemble(method=method)
+
+  matErr = spla.norm(A1 - A0)/spla.norm(A0)
+  vecErr = np.linalg.norm(b1 - b0)/np.linalg.norm(b0)
+
+  print('method={}: matrix error={:12.5g}, vector error={:12.5g}'\
+        .format(method, matErr, vecErr))
+
+  return matErr <= tol and vecErr <= tol
+
+
+def test_ScalarAssembly():
+
+  print('testing assembly of a scalar problem')
+
+  mesh = meshRectangle(nx=8, ny=6, ax=-1, bx=2, ay=0, by=1)
+  ds = DiscreteSpace(mesh, 1)
+
+  twoForms = (LaplacianTwoForm(), MassTwoForm(coeff=2.0))
+  oneForms = (VarCoeffOneForm(GaussRule(3), loadFunc),
+              ConstCoeffOneForm(0.5))
+
+  for method in ('coo', 'csr'):
+    assert(compareWithDOK(ds, twoForms, oneForms, method))
+
+
+def test_MultiComponentAssembly():
+
+  print('testing assembly of a two-component problem')
+
+  mesh = meshRectangle(nx=5, ny=7)
+  ds = DiscreteSpace(mesh, 2)
+
+  twoForms = (LaplacianTwoForm(testID=0, unkID=0),
+              MassTwoForm(testID=0, unkID=1),
+              LaplacianTwoForm(coeff=3.0, testID=1, unkID=1),
+              MassTwoForm(testID=1, unkID=0))
+  oneForms = (VarCoeffOneForm(GaussRule(2), loadFunc, testID=0),
+              ConstCoeffOneForm(1.0, testID=1))
+
+  for method in ('coo', 'csr'):
+    assert(compareWithDOK(ds, twoForms, oneForms, method))
+
+
+class ScalarOnlyTwoForm(TwoForm):
+  '''
+  A user-defined form providing only the per-element localMat(), to check
+  that the default batched implementation falls back to it correctly.
+  '''
+  def localMat(self, tri, nodes):
+    return tri.area * (np.eye(3) + np.outer(tri.A, tri.A).sum())
+
+
+def test_UserDefinedForm():
+
+  print('testing assembly with a user-defined two-form')
+
+  mesh = meshRectangle(nx=4, ny=3)
+  ds = DiscreteSpace(mesh, 1)
+
+  twoForms = (ScalarOnlyTwoForm(), LaplacianTwoForm())
+  oneForms = (ConstCoeffOneForm(2.0),)
+
+  for method in ('coo', 'csr'):
+    assert(compareWithDOK(ds, twoForms, oneForms, method))
+
+
+def test_BlockAssembly():
+
+  print('testing block sparse assembly')
+
+  mesh = meshRectangle(nx=6, ny=5)
+
+  for nf in (1, 3):
+    ds = DiscreteSpace(mesh, nf)
+    twoForms = [LaplacianTwoForm(testID=f, unkID=f) for f in range(nf)] \
+      + [MassTwoForm(coeff=1.0+f, testID=f, unkID=nf-1-f) for f in range(nf)]
+    oneForms = [ConstCoeffOneForm(1.0, testID=f) for f in range(nf)]
+
+    (A, b) = Assembler(ds, twoForms, oneForms).assemble(method='bsr')
+    assert(A.format == 'bsr' and A.blocksize == (nf,nf))
+
+    assert(compareWithDOK(ds, twoForms, oneForms, 'bsr'))
+
+
+def test_UpperAssembly():
+
+  print('testing upper triangular assembly of symmetric forms')
+
+  mesh = meshRectangle(nx=7, ny=5)
+
+  # The cross terms aren't symmetric individually but their sum is, so
+  # symmetry has to be asserted in this case
+  for nf, twoForms, symmetric in (
+      (1, (LaplacianTwoForm(), MassTwoForm(coeff=3.0)), None),
+      (2, (LaplacianTwoForm(testID=0, unkID=0),
+           LaplacianTwoForm(testID=1, unkID=1),
+           MassTwoForm(testID=0, unkID=1),
+           MassTwoForm(testID=1, unkID=0)), True)):
+
+    ds = DiscreteSpace(mesh, nf)
+    assembler = Assembler(ds, twoForms, (), symmetric=symmetric)
+    assert(assembler.isSymmetric())
+
+    (A, b) = assembler.assemble(buildVec=False)
+    (U, b) = assembler.assemble(buildVec=False, upper=True)
+
+    assert(sp.tril(U, k=-1).nnz == 0)
+
+    # Only the upward entries of each element matrix are scattered
+    pattern = ds.sparsityPattern(upper=True)
+    nE = len(mesh.elems)
+    assert(pattern.scatterMap(0, 0).shape == (6, nE))
+    if nf > 1:
+      assert(pattern.scatterMap(1, 0).shape == (3, nE))
+    fullErr = spla.norm(expandUpper(U) - A)/spla.norm(A)
+
+    x = np.linspace(0.0, 1.0, ds.numDofs())
+    opErr = np.linalg.norm(symmetricOperator(U) @ x - A @ x) \
+      / np.linalg.norm(A @ x)
+    print('nf={}: expansion error={:12.5g}, operator error={:12.5g}'\
+          .format(nf, fullErr, opErr))
+    assert(fullErr <= 1.0e-14 and opErr <= 1.0e-14)
+
+  # Upper assembly of non-symmetric forms should be refused
+  try:
+    Assembler(ds, (MassTwoForm(testID=0, unkID=1),), ()).assemble(upper=True)
+    assert(False)
+  except ValueError:
+    pass
+
+
+def test_PatternReuse():
+
+  print('testing reuse of the cached sparsity pattern')
+
+  mesh = meshRectangle(nx=6, ny=6)
+  ds = DiscreteSpace(mesh, 1)
+
+  (A1, b1) = Assembler(ds, (LaplacianTwoForm(),), ())\
+    .assemble(shareIndices=True)
+  (A2, b2) = Assembler(ds, (MassTwoForm(),), ()).assemble(shareIndices=True)
+
+  # Both matrices should share the index arrays of the cached pattern
+  pattern = ds.sparsityPattern()
+  assert(pattern is DiscreteSpace(mesh, 1).sparsityPattern())
+  for A in (A1, A2):
+    assert(np.shares_memory(A.indices, pattern.indices))
+    assert(np.shares_memory(A.indptr, pattern.indptr))
+
+  # The pattern holds only the function pairs the forms couple, so a
+  # system without cross terms stores no more entries than COO assembly
+  ds2 = DiscreteSpace(mesh, 2)
+  forms = (LaplacianTwoForm(testID=0, unkID=0),
+           MassTwoForm(testID=1, unkID=1))
+  (A3, b3) = Assembler(ds2, forms, ()).assemble()
+  (C3, b3) = Assembler(ds2, forms, ()).assemble(method='coo')
+  pattern2 = ds2.sparsityPattern(funcPairs=((0,0), (1,1)))
+  assert(pattern2.funcPairs() == ((0,0), (1,1)))
+  assert(A3.nnz == C3.nnz == pattern2.nnz())
+  assert(ds2.sparsityPattern().nnz() == 2*pattern2.nnz())
+  try:
+    pattern2.scatterMap(0, 1)
+    assert(False)
+  except ValueError:
+    pass
+
+  # By default each matrix has its own index arrays, so its structure can
+  # be changed without touching the pattern
+  assert(not np.shares_memory(A3.indices, pattern2.indices))
+  A3.data[A3.indptr[1]-1] = 0.0
+  A3.eliminate_zeros()
+  assert(A3.nnz < pattern2.nnz())
+  (A4, b4) = Assembler(ds2, forms, ()).assemble(method='bsr')
+  assert(not np.shares_memory(A4.indices,
+                              ds2.blockSparsityPattern().indices))
+  A4.sort_indices()
+
+
+def test_MatrixFreeOperator():
+
+  print('testing the matrix-free operator')
+
+  mesh = meshRectangle(nx=9, ny=7)
+  ds = DiscreteSpace(mesh, 2)
+
+  twoForms = (LaplacianTwoForm(testID=0, unkID=0),
+              MassTwoForm(coeff=0.5, testID=0, unkID=1),
+              LaplacianTwoForm(testID=1, unkID=1),
+              ScalarOnlyTwoForm(testID=1, unkID=0))
+  assembler = Assembler(ds, twoForms, ())
+
+  (A, b) = assembler.assemble(buildVec=False)
+  # Use a small chunk size so that several chunks are exercised
+  op = assembler.operator(chunkSize=17)
+
+  x = np.random.default_rng(5344).standard_normal(ds.numDofs())
+
+  fwdErr = np.linalg.norm(op @ x - A @ x)/np.linalg.norm(A @ x)
+  adjErr = np.linalg.norm(op.rmatvec(x) - A.T @ x)/np.linalg.norm(A.T @ x)
+  print('forward error={:12.5g}, adjoint error={:12.5g}'.format(fwdErr,
+                                                                 adjErr))
+
+  assert(fwdErr <= 1.0e-14 and adjErr <= 1.0e-14)
+
+
+
+if __name__=='__main__':
+
+  test_ScalarAssembly()
+
+  test_MultiComponentAssembly()
+
+  test_UserDefinedForm()
+
+  test_BlockAssembly()
+
+  test_UpperAssembly()
+
+  test_PatternReuse()
+
+  test_MatrixFreeOperator()
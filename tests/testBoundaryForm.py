@@ -0,0 +1,98 @@
+from Agnes import *
+import numpy as np
+import scipy.sparse.linalg as spla
+
+
+def exactSoln(x, y):
+  return 1.0 + 2.0*x - y
+
+
+def test_EdgeBatch():
+
+  print('testing batched boundary edge geometry')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  edges = EdgeBatch.forSides(mesh, 1)
+  assert(edges is EdgeBatch.forSides(mesh, [1]))
+
+  # Normals are unit vectors orthogonal to the edges
+  assert(np.allclose(np.sum(edges.normal**2, axis=1), 1.0))
+  assert(np.allclose(np.sum(edges.normal*edges.t, axis=1), 0.0))
+
+  # For a closed boundary, the integral of n is zero, and by the
+  # divergence theorem the integral of x n_x is the area
+  area = np.sum(TriangleBatch.forMesh(mesh).area)
+  totalNormal = edges.length @ edges.normal
+  mid = edges.A + 0.5*edges.t
+  fluxArea = np.sum(edges.length * mid[:,0] * edges.normal[:,0])
+  print('integral of n = {}, flux area = {:12.5g}, area = {:12.5g}'\
+        .format(totalNormal, fluxArea, area))
+
+  assert(np.max(np.abs(totalNormal)) <= 1.0e-14)
+  assert(abs(fluxArea - area) <= 1.0e-14*area)
+
+
+def test_RobinProblem():
+
+  print('testing assembly and solution of a Robin problem')
+
+  # Solve -Lap(u) = 0 with du/dn + alpha u = g, where g is chosen so that
+  # the linear function exactSoln is the solution. The P1 solution should
+  # match it to roundoff.
+  alpha = 2.5
+  def g(x, y, nx, ny):
+    return 2.0*nx - ny + alpha*exactSoln(x, y)
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  ds = DiscreteSpace(mesh, 1)
+  twoForms = (LaplacianTwoForm(), RobinTwoForm(1, alpha))
+  oneForms = (NeumannOneForm(1, g),)
+  assembler = Assembler(ds, twoForms, oneForms)
+  assert(assembler.isSymmetric())
+
+  (A0, b0) = assembler.assemble(method='dok')
+  for method in ('csr', 'bsr', 'coo'):
+    (A, b) = assembler.assemble(method=method)
+    matErr = spla.norm(A - A0)/spla.norm(A0)
+    vecErr = np.linalg.norm(b - b0)/np.linalg.norm(b0)
+    print('method={}: matrix error={:12.5g}, vector error={:12.5g}'\
+          .format(method, matErr, vecErr))
+    assert(matErr <= 1.0e-14 and vecErr <= 1.0e-14)
+
+  (U, b) = assembler.assemble(buildVec=False, upper=True)
+  assert(spla.norm(expandUpper(U) - A0)/spla.norm(A0) <= 1.0e-14)
+
+  x = np.linspace(-1.0, 1.0, ds.numDofs())
+  opErr = np.linalg.norm(assembler.operator(chunkSize=50) @ x - A0 @ x) \
+    / np.linalg.norm(A0 @ x)
+  assert(opErr <= 1.0e-14)
+
+  u = spla.spsolve(A0.tocsc(), b0)
+  verts = mesh.vertArray()
+  err = np.max(np.abs(u - exactSoln(verts[:,0], verts[:,1])))
+  print('max solution error = {:12.5g}'.format(err))
+  assert(err <= 1.0e-12)
+
+
+def test_VarCoeffRobin():
+
+  print('testing variable-coefficient Robin form')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  edges = EdgeBatch.forSides(mesh, 1)
+
+  # A constant written as a function should match the exact edge matrix
+  constMats = RobinTwoForm(1, 3.0).localMats(edges, edges.sides)
+  funcMats = RobinTwoForm(1, lambda x, y, nx, ny: 3.0 + 0.0*x)\
+    .localMats(edges, edges.sides)
+  assert(np.max(np.abs(constMats - funcMats)) <= 1.0e-14)
+
+
+
+if __name__=='__main__':
+
+  test_EdgeBatch()
+
+  test_RobinProblem()
+
+  test_VarCoeffRobin()
@@ -0,0 +1,103 @@
+from Agnes import *
+import numpy as np
+import scipy.sparse.linalg as spla
+
+
+def test_CompactMeshConversion():
+
+  print('testing conversion between LoadableMesh and CompactMesh')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  cmesh = CompactMesh.fromLoadableMesh(mesh)
+
+  assert(cmesh.elems.dtype == np.int32 and cmesh.sides.dtype == np.int32)
+  # The array views and element geometry use the int32 arrays, not copies
+  assert(cmesh.elemArray() is cmesh.elems and cmesh.sideArray() is cmesh.sides)
+  assert(np.shares_memory(TriangleBatch.forMesh(cmesh).elems, cmesh.elems))
+  assert(np.array_equal(cmesh.verts, np.array(mesh.verts)))
+  assert(np.array_equal(cmesh.elems, np.array(mesh.elems)))
+  assert(np.array_equal(cmesh.elemToEdges, np.array(mesh.elemToEdgesMap)))
+
+  # Deriving the element-to-side map should give the same result
+  derived = CompactMesh(cmesh.verts, cmesh.elems, cmesh.sides,
+                        cmesh.sideLabels)
+  assert(np.array_equal(derived.elemToEdges, cmesh.elemToEdges))
+
+  # Adjacency and side sets match the LoadableMesh
+  for v in range(len(mesh.verts)):
+    assert(set(cmesh.getConnectedElems(0, v).tolist())
+           == mesh.connectedElemsForVert[v])
+  for s in range(len(mesh.sides)):
+    assert(set(cmesh.getConnectedElems(1, s).tolist())
+           == mesh.connectedElemsForSide[s])
+    assert(cmesh.getSideLabel(mesh.sides[s]) == mesh.sideLabels[s])
+  for label, ss in mesh.sideSets.items():
+    assert(set(cmesh.sideSetArray(label).tolist()) == ss)
+
+  assert(np.array_equal(cmesh.getFacets(2, 5, 1), mesh.elemToEdgesMap[5]))
+  assert(np.array_equal(cmesh.getVertexCoords(3), mesh.verts[3]))
+
+  # Round trip
+  back = cmesh.toLoadableMesh()
+  assert(back.verts == mesh.verts and back.elems == mesh.elems
+         and back.sides == mesh.sides and back.sideSets == mesh.sideSets)
+
+
+def test_CompactMeshOrientation():
+
+  print('testing reordering of clockwise elements')
+
+  mesh = CompactMesh.fromLoadableMesh(meshRectangle(nx=4, ny=3))
+
+  # Reverse every other element; construction should undo it, both with
+  # the element-to-side map given and with it derived
+  elems = np.array(mesh.elems)
+  edges = np.array(mesh.elemToEdges)
+  elems[::2] = elems[::2,::-1]
+  edges[::2] = np.roll(edges[::2,::-1], -1, axis=1)
+  for e2e in (edges, None):
+    cmesh = CompactMesh(mesh.verts, elems, mesh.sides, mesh.sideLabels, e2e)
+    assert(np.all(TriangleBatch.forMesh(cmesh).detJ > 0.0))
+    assert(np.array_equal(np.sort(cmesh.elems, axis=1),
+                          np.sort(mesh.elems, axis=1)))
+    # Side i still joins vertices i and i+1
+    for i in range(3):
+      ends = np.sort(cmesh.elems[:,[i,(i+1)%3]], axis=1)
+      assert(np.array_equal(cmesh.sides[cmesh.elemToEdges[:,i]], ends))
+
+
+def test_CompactMeshAssembly():
+
+  print('testing assembly and utilities on a CompactMesh')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  cmesh = CompactMesh.fromLoadableMesh(mesh)
+
+  twoForms = (LaplacianTwoForm(), RobinTwoForm(1, 2.0))
+  oneForms = (ConstCoeffOneForm(1.0), NeumannOneForm(1, 0.5))
+
+  results = []
+  for m in (mesh, cmesh):
+    ds = DiscreteSpace(m, 1)
+    (A, b) = Assembler(ds, twoForms, oneForms).assemble()
+    results.append((A, b, DirichletBC(ds, 1).dofs(), hLocal(m), hMesh(m)))
+
+  (A0, b0, d0, hl0, h0), (A1, b1, d1, hl1, h1) = results
+  assert(spla.norm(A1 - A0) == 0.0 and np.array_equal(b1, b0))
+  assert(np.array_equal(d0, d1))
+  assert(np.array_equal(hl0, hl1) and h0 == h1)
+
+  # The DOK reference loop works on arrays too
+  (A2, b2) = Assembler(DiscreteSpace(cmesh, 1), twoForms, oneForms)\
+    .assemble(method='dok')
+  assert(spla.norm(A2 - A0) <= 1.0e-14*spla.norm(A0))
+
+
+
+if __name__=='__main__':
+
+  test_CompactMeshConversion()
+
+  test_CompactMeshOrientation()
+
+  test_CompactMeshAssembly()
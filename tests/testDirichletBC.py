@@ -0,0 +1,72 @@
+from Agnes import *
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+
+
+def exactSoln(x, y):
+  return 1.0 + 2.0*x - y
+
+
+def test_DirichletBC():
+
+  print('testing Dirichlet conditions on side sets')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  ds = DiscreteSpace(mesh, 1)
+  assembler = Assembler(ds, (LaplacianTwoForm(),), (ConstCoeffOneForm(0.0),))
+
+  # The exact solution is linear, so the discrete solution should match it
+  # at the nodes
+  uEx = exactSoln(mesh.vertArray()[:,0], mesh.vertArray()[:,1])
+  bc = DirichletBC(ds, 1, exactSoln)
+
+  for symmetric in (False, True):
+    (A, b) = assembler.assemble()
+    indices = A.indices
+    (A, b) = bc.apply(A, b, symmetric=symmetric)
+    assert(A.format == 'csr')
+    assert(np.shares_memory(A.indices, indices))
+
+    u = spla.spsolve(A.tocsc(), b)
+    err = np.max(np.abs(u - uEx))
+    print('symmetric={}: max error={:12.5g}'.format(symmetric, err))
+    assert(err <= 1.0e-12)
+
+    if symmetric:
+      assert(spla.norm(A - A.T) <= 1.0e-14*spla.norm(A))
+
+
+def test_MultiComponentDirichletBC():
+
+  print('testing Dirichlet conditions on one component of a system')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  ds = DiscreteSpace(mesh, 2)
+  twoForms = (LaplacianTwoForm(testID=0, unkID=0),
+              LaplacianTwoForm(testID=1, unkID=1),
+              MassTwoForm(testID=1, unkID=0))
+  (A, b) = Assembler(ds, twoForms, (ConstCoeffOneForm(1.0),)).assemble()
+  A0 = A.copy()
+
+  bc = DirichletBC(ds, [1], 3.0, funcID=1)
+  (A, b) = bc.apply(A, b, symmetric=True)
+
+  dofs = bc.dofs()
+  assert(np.all(dofs % 2 == 1))
+  assert(np.all(b[dofs] == 3.0))
+
+  # Constrained rows and columns are identity; the rest are unchanged
+  free = np.setdiff1d(np.arange(ds.numDofs()), dofs)
+  assert(spla.norm(A[dofs][:,dofs] - sp.identity(len(dofs))) == 0.0)
+  assert(A[dofs][:,free].count_nonzero() == 0)
+  assert(A[free][:,dofs].count_nonzero() == 0)
+  assert(spla.norm(A[free][:,free] - A0[free][:,free]) == 0.0)
+
+
+
+if __name__=='__main__':
+
+  test_DirichletBC()
+
+  test_MultiComponentDirichletBC()
@@ -0,0 +1,114 @@
+from Agnes import *
+import numpy as np
+import scipy.sparse.linalg as spla
+
+
+def uSmooth(x, y):
+  return np.sin(np.pi*x)*np.cos(2.0*np.pi*y)
+
+def gradSmooth(x, y):
+  return (np.pi*np.cos(np.pi*x)*np.cos(2.0*np.pi*y),
+          -2.0*np.pi*np.sin(np.pi*x)*np.sin(2.0*np.pi*y))
+
+
+def interpolant(mesh, func):
+  ds = DiscreteSpace(mesh, 1)
+  u = DiscreteFunction(ds, 'u')
+  verts = mesh.vertArray()
+  u.setVector(func(verts[:,0], verts[:,1]))
+  return u[0]
+
+
+def test_Integrate():
+
+  print('testing integration over a mesh')
+
+  mesh = meshRectangle(nx=5, ny=4, ax=0, bx=2, ay=-1, by=1)
+
+  # Exact for polynomials of the quadrature degree
+  val = integrate(mesh, lambda x, y, u: x**2*y**2 + x, quad=4)
+  exact = (8.0/3.0)*(2.0/3.0) + 4.0
+  print('integral = {:12.5g}, exact = {:12.5g}'.format(val, exact))
+  assert(abs(val - exact) <= 1.0e-14*exact)
+
+  # Functionals of a discrete function: u is linear so u^2 is integrated
+  # exactly by a degree 2 rule
+  u = interpolant(mesh, lambda x, y: 1.0 + x - y)
+  val = integrate(mesh, lambda x, y, uVal: uVal**2, quad=2, dfs=u)
+  exact = 56.0/3.0
+  print('integral of u^2 = {:12.5g}, exact = {:12.5g}'.format(val, exact))
+  assert(abs(val - exact) <= 1.0e-14*exact)
+
+
+def test_ErrorNorms():
+
+  print('testing L2 and H1 error norms')
+
+  # The interpolant of a linear function has no error
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  u = interpolant(mesh, lambda x, y: 2.0*x - 3.0*y)
+  assert(l2Error(u, lambda x, y: 2.0*x - 3.0*y) <= 1.0e-14)
+  assert(h1SemiError(u, lambda x, y: (2.0, -3.0)) <= 1.0e-14)
+
+  # Norms of u: the gradient is constant, so its seminorm is |grad u|
+  # times the square root of the area
+  area = np.sum(TriangleBatch.forMesh(mesh).area)
+  assert(abs(h1SemiError(u) - np.sqrt(13.0*area)) <= 1.0e-13)
+
+  # Interpolation errors of a smooth function should converge at second
+  # order in L2 and first order in H1
+  l2 = []
+  h1 = []
+  for n in (8, 16, 32):
+    mesh = meshRectangle(nx=n, ny=n)
+    u = interpolant(mesh, uSmooth)
+    l2.append(l2Error(u, uSmooth))
+    h1.append(h1SemiError(u, gradSmooth))
+
+  l2Rates = np.log2(np.array(l2[:-1])/np.array(l2[1:]))
+  h1Rates = np.log2(np.array(h1[:-1])/np.array(h1[1:]))
+  print('L2 rates = {}, H1 rates = {}'.format(l2Rates, h1Rates))
+  assert(np.all(np.abs(l2Rates - 2.0) < 0.1))
+  assert(np.all(np.abs(h1Rates - 1.0) < 0.1))
+
+
+def test_DebyeHuckelError():
+
+  print('testing errors of a Debye-Huckel solution')
+
+  # -lap(u) + beta^2 u = cos(pi x) cos(pi y) with Neumann BCs on the unit
+  # square; the solution is a multiple of the load
+  beta = 1.0
+  load = lambda x, y, u=None: np.cos(np.pi*x)*np.cos(np.pi*y)
+  A0 = 1.0/(2.0*np.pi**2 + beta**2)
+  uExact = lambda x, y: A0*load(x, y)
+  gradExact = lambda x, y: (-A0*np.pi*np.sin(np.pi*x)*np.cos(np.pi*y),
+                            -A0*np.pi*np.cos(np.pi*x)*np.sin(np.pi*y))
+
+  l2 = []
+  h1 = []
+  for n in (16, 32):
+    mesh = meshRectangle(nx=n, ny=n)
+    ds = DiscreteSpace(mesh, 1)
+    assembler = Assembler(ds, (LaplacianTwoForm(), MassTwoForm(coeff=beta**2)),
+                          (VarCoeffOneForm(GaussRule(2), load),))
+    (A, b) = assembler.assemble()
+    u = DiscreteFunction(ds, 'u')
+    u.setVector(spla.spsolve(A, b))
+    l2.append(l2Error(u[0], uExact)/l2Error(u[0]))
+    h1.append(h1SemiError(u[0], gradExact)/h1SemiError(u[0]))
+
+  print('relative L2 errors = {}, H1 errors = {}'.format(l2, h1))
+  assert(l2[-1] <= 1.0e-2 and h1[-1] <= 1.0e-1)
+  assert(abs(np.log2(l2[0]/l2[1]) - 2.0) < 0.2)
+  assert(abs(np.log2(h1[0]/h1[1]) - 1.0) < 0.2)
+
+
+
+if __name__=='__main__':
+
+  test_Integrate()
+
+  test_ErrorNorms()
+
+  test_DebyeHuckelError()
@@ -0,0 +1,189 @@
+from Agnes import *
+from Agnes import MeshTopology
+import numpy as np
+
+
+def _incrementalCopy(mesh):
+  '''
+  Rebuild a mesh one entity at a time with addVertex, addSide and addElem
+  '''
+  copy = LoadableMesh()
+  for v in mesh.verts:
+    copy.addVertex(v)
+  for s, label in zip(mesh.sides, mesh.sideLabels):
+    copy.addSide(s[0], s[1], label)
+  for e in mesh.elems:
+    copy.addElem(*e)
+  return copy
+
+
+def test_BulkConstruction():
+
+  print('testing bulk mesh construction against addVertex/addSide/addElem')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  copy = _incrementalCopy(mesh)
+
+  for attr in ('verts', 'sides', 'elems', 'sideLabels', 'elemToEdgesMap',
+               'vertToIndexMap', 'sideToIndexMap', 'sideSets',
+               'connectedElemsForVert', 'connectedElemsForSide'):
+    assert(getattr(mesh, attr) == getattr(copy, attr))
+
+  # Bulk and single additions can be mixed
+  mesh = LoadableMesh()
+  assert(np.array_equal(mesh.addVertices([(0,0), (1,0)]), [0,1]))
+  assert(mesh.addVertex((1,1)) == 2)
+  assert(mesh.connectedElemsForVert == [set(), set(), set()])
+  mesh.addSides([(0,1), (2,1)], [1, 2])
+  mesh.addSide(0, 2, 3)
+  assert(np.array_equal(mesh.addElems([(0,1,2)]), [0]))
+  assert(mesh.sideSets == {1 : {0}, 2 : {1}, 3 : {2}})
+  assert(mesh.connectedElemsForSide == [{0}, {0}, {0}])
+  assert(mesh.elemToEdgesMap == [(0,1,2)])
+
+  # Bulk additions in several blocks are checked against earlier blocks
+  assert(np.array_equal(mesh.addVertices([(3,0), (0,3)]), [3,4]))
+
+  # Errors are caught as with the single-entity functions
+  for bad in (lambda : mesh.addVertices([(2,2), (2,2)]),
+              lambda : mesh.addVertices([(1,0)]),
+              lambda : mesh.addVertices([(5,5), (0,3)]),
+              lambda : mesh.addElems([(0,1,3)])):
+    try:
+      bad()
+      assert(False)
+    except RuntimeError:
+      pass
+
+
+def test_UniformRefinement():
+
+  print('testing uniform refinement')
+
+  coarse = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  (fine, update, downdate) = UniformRefinement(coarse)
+
+  assert(len(fine.elems) == 4*len(coarse.elems))
+  assert(len(fine.verts) == len(coarse.verts) + len(coarse.sides))
+  assert(len(fine.sides) == 2*len(coarse.sides) + 3*len(coarse.elems))
+  assert(abs(integrate(fine, lambda x, y, u : 1.0)
+             - integrate(coarse, lambda x, y, u : 1.0)) < 1.0e-14)
+
+  # Boundary labels are inherited, so the boundary has twice as many sides
+  assert(len(fine.sideSets[1]) == 2*len(coarse.sideSets[1]))
+
+  # The child element edges are the same as those found by matching
+  assert(np.array_equal(fine.elemToEdgesArray(),
+                        MeshTopology.matchElemEdges(fine.elemArray(),
+                                                    fine.sideArray(),
+                                                    len(fine.verts))))
+
+  # The update operator interpolates linear functions exactly
+  X = coarse.vertArray()
+  Y = fine.vertArray()
+  assert(np.allclose(update @ (1.0 + X[:,0] - 2.0*X[:,1]),
+                     1.0 + Y[:,0] - 2.0*Y[:,1]))
+  assert(np.allclose(downdate @ np.ones(len(Y)), 1.0))
+
+  (fine, update, downdate) = UniformRefinement(meshRectangle(3,2))
+  assert(len(fine.elems) == 48 and len(fine.verts) == 7*5)
+
+
+def test_DeriveSides():
+
+  print('testing derivation of sides from elements')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  derived = TriangleMeshReader('../Meshes/triExample.8',
+                               useEdgeFile=False).getMesh()
+
+  # Same sides and labels as in the edge file, though in a different order
+  assert(derived.verts == mesh.verts and derived.elems == mesh.elems)
+  assert(sorted(zip(derived.sides, derived.sideLabels))
+         == sorted(zip(mesh.sides, mesh.sideLabels)))
+  for e in range(len(mesh.elems)):
+    for s, t in zip(derived.elemToEdgesMap[e], mesh.elemToEdgesMap[e]):
+      assert(derived.sides[s] == mesh.sides[t])
+      assert(derived.connectedElemsForSide[s]
+             == mesh.connectedElemsForSide[t])
+
+  (sides, elemToEdges, sideToElems, isBoundary) \
+    = MeshTopology.deriveSides(mesh.elemArray())
+  assert(np.array_equal(isBoundary, sideToElems[:,1] < 0))
+  assert(np.count_nonzero(isBoundary) == len(mesh.sideSets[1]))
+
+  # Vertex markers that differ across a boundary side are ambiguous: the
+  # larger is used, with a warning
+  import warnings
+  markers = np.zeros(len(mesh.verts), dtype=np.int64)
+  markers[sides[isBoundary][0,0]] = 2
+  with warnings.catch_warnings(record=True) as caught:
+    warnings.simplefilter('always')
+    labels = MeshTopology.markerSideLabels(sides, isBoundary, markers)
+  assert(len(caught) == 1 and '2 boundary sides' in str(caught[0].message))
+  assert(np.count_nonzero(labels == 2) == 2)
+
+  # Euler's formula for a mesh of a disk
+  nV = len(mesh.verts)
+  assert(nV - len(sides) + len(mesh.elems) == 1)
+
+  # The rectangle mesher no longer repeats shared sides
+  rect = meshRectangle(4,3)
+  assert(len(rect.sides) == len(set(rect.sides)) == 4*4 + 5*3 + 4*3)
+  assert(rect.sideSets == {0 : set(range(len(rect.sides)))})
+
+
+
+def test_RenumberMesh():
+
+  print('testing mesh renumbering')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  ds = DiscreteSpace(mesh, 1)
+  forms = (LaplacianTwoForm(), RobinTwoForm(1, 2.0))
+  (A, b) = Assembler(ds, forms, (ConstCoeffOneForm(1.0),)).assemble()
+
+  for method in ('rcm', 'hilbert', 'morton'):
+    (newMesh, order) = renumberMesh(mesh, method)
+    assert(np.array_equal(newMesh.vertArray(), mesh.vertArray()[order]))
+    assert(newMesh.sideSets[1] == set(newMesh.sideSetArray(1).tolist()))
+    assert(len(newMesh.sideSets[1]) == len(mesh.sideSets[1]))
+    assert(newMesh.connectedElemsForSide
+           == _incrementalCopy(newMesh).connectedElemsForSide)
+
+    # The system is the same up to the permutation
+    newDS = DiscreteSpace(newMesh, 1)
+    (A2, b2) = Assembler(newDS, forms, (ConstCoeffOneForm(1.0),)).assemble()
+    assert(abs(A[order][:,order] - A2).max() < 1.0e-12)
+    assert(np.allclose(b[order], b2))
+
+  # RCM reduces the bandwidth
+  def bandwidth(m):
+    s = m.sideArray()
+    return np.max(s[:,1] - s[:,0])
+  assert(bandwidth(renumberMesh(mesh, 'rcm')[0]) < bandwidth(mesh))
+
+  # Renumbering a CompactMesh gives a CompactMesh
+  (cmesh, order) = renumberMesh(CompactMesh.fromLoadableMesh(mesh), order)
+  assert(isinstance(cmesh, CompactMesh))
+  assert(np.array_equal(cmesh.elems, newMesh.elemArray()))
+
+  # Renumbering during refinement keeps the transfer operators consistent
+  (fine, update, downdate) = UniformRefinement(mesh, ordering='rcm')
+  (fine0, update0, downdate0) = UniformRefinement(mesh)
+  X = mesh.vertArray()
+  Y = fine.vertArray()
+  assert(np.allclose(update @ X[:,0], Y[:,0]))
+  assert(np.allclose(downdate @ Y[:,1], downdate0 @ fine0.vertArray()[:,1]))
+
+
+
+if __name__=='__main__':
+
+  test_BulkConstruction()
+
+  test_UniformRefinement()
+
+  test_DeriveSides()
+
+  test_RenumberMesh()
@@ -75,6 +75,69 @@ def test_VarOneForm():
 
   assert(allGood)
 
+
+
+def test_BatchedVarOneForm():
+  print('testing batched variable one form')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  tris = TriangleBatch.forMesh(mesh)
+  elems = mesh.elemArray()
+
+  ds = DiscreteSpace(mesh, 2)
+  U = DiscreteFunction(ds, 'U')
+  for i,(x,y) in enumerate(mesh.verts):
+    U[1].setValue(i, np.sin(x)*y)
+
+  def f(x, y, u):
+      return np.exp(x + y)*(1.0 + u**2)
+
+  oneForm = VarCoeffOneForm(GaussRule(4), f, dfs=U[1])
+
+  bBatch = oneForm.localVecs(tris, elems)
+  bLoop = np.array([oneForm.localVec(tris.triangle(i), elems[i])
+                    for i in range(len(tris))])
+
+  error = npla.norm(bBatch - bLoop)/npla.norm(bLoop)
+  print('error = {:12.5g}'.format(error))
+
+  assert(error <= 1.0e-14)
+
+
+
+
+def test_InterpolatedOneForm():
+  print('testing interpolated one form')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  tris = TriangleBatch.forMesh(mesh)
+  elems = mesh.elemArray()
+
+  ds = DiscreteSpace(mesh, 1)
+  U = DiscreteFunction(ds, 'U')
+  for i,(x,y) in enumerate(mesh.verts):
+    U[0].setValue(i, 2.0*x - y)
+
+  # For a coefficient that's linear in x, y, and u, interpolation is exact,
+  # so the result should agree with quadrature
+  def f(x, y, u):
+    return 1.0 + 3.0*x - y + u
+
+  interp = InterpolatedOneForm(f, dfs=U[0])
+  quad = VarCoeffOneForm(GaussRule(2), f, dfs=U[0])
+
+  bInterp = interp.localVecs(tris, elems)
+  bLoop = np.array([interp.localVec(tris.triangle(i), elems[i])
+                    for i in range(len(tris))])
+  bQuad = quad.localVecs(tris, elems)
+
+  loopErr = npla.norm(bInterp - bLoop)/npla.norm(bLoop)
+  quadErr = npla.norm(bInterp - bQuad)/npla.norm(bQuad)
+  print('batch vs loop error = {:12.5g}, interpolation vs quadrature '
+        'error = {:12.5g}'.format(loopErr, quadErr))
+
+  assert(loopErr <= 1.0e-14 and quadErr <= 1.0e-14)
+
     
 
 if __name__=='__main__':
@@ -83,6 +146,10 @@ if __name__=='__main__':
 
   test_VarOneForm()
 
+  test_BatchedVarOneForm()
+
+  test_InterpolatedOneForm()
+
 
   
 
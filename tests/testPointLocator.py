@@ -0,0 +1,68 @@
+from Agnes import *
+import numpy as np
+
+
+def test_PointLocator():
+
+  print('testing point location')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  loc = PointLocator.forMesh(mesh)
+  assert(PointLocator.forMesh(mesh) is loc)
+
+  # Every element's centroid is found in that element
+  X = mesh.vertArray()
+  E = mesh.elemArray()
+  (elems, bary) = loc.locate(np.mean(X[E], axis=1))
+  assert(np.array_equal(elems, np.arange(len(E))))
+  assert(np.allclose(bary, 1.0/3.0))
+
+  # Random points: the barycentric coordinates reproduce the point
+  rng = np.random.default_rng(1)
+  (lo, hi) = (np.min(X, axis=0), np.max(X, axis=0))
+  pts = lo - 0.1 + (hi - lo + 0.2)*rng.random((2000,2))
+  (elems, bary) = loc.locate(pts)
+  found = elems >= 0
+  assert(np.all(bary[found] >= -1.0e-10))
+  assert(np.allclose(np.einsum('pi,pij->pj', bary[found], X[E[elems[found]]]),
+                     pts[found]))
+
+  # Points outside the mesh aren't in any element: check that none of them
+  # lies in any triangle
+  A = X[E]
+  for p in pts[~found][::10]:
+    e = np.roll(A, -1, axis=1) - A
+    r = p - A
+    d = e[:,:,0]*r[:,:,1] - e[:,:,1]*r[:,:,0]
+    assert(not np.any(np.all(d >= 0.0, axis=1)))
+
+
+def test_EvaluateAt():
+
+  print('testing evaluation of discrete functions at points')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  X = mesh.vertArray()
+  ds = DiscreteSpace(mesh, 2)
+  u = DiscreteFunction(ds, 'u')
+  u.setVector(np.column_stack((1.0 + X[:,0] - 2.0*X[:,1],
+                               np.sin(X[:,0]))).ravel())
+
+  # Linear functions are reproduced exactly, and values at the nodes are
+  # the nodal values
+  rng = np.random.default_rng(2)
+  pts = np.min(X, axis=0) + np.ptp(X, axis=0)*rng.random((500,2))
+  vals = u[0].evaluateAt(pts)
+  inMesh = ~np.isnan(vals)
+  assert(np.count_nonzero(inMesh) > 0)
+  assert(np.allclose(vals[inMesh], 1.0 + pts[inMesh,0] - 2.0*pts[inMesh,1]))
+  assert(np.allclose(u[1].evaluateAt(X), np.sin(X[:,0])))
+  assert(np.all(u[1].evaluateAt([(1.0e6, 0.0)], outside=-1.0) == -1.0))
+
+
+
+if __name__=='__main__':
+
+  test_PointLocator()
+
+  test_EvaluateAt()
@@ -0,0 +1,120 @@
+from Agnes import *
+import numpy as np
+import os
+
+
+def test_Tabulation():
+
+  print('testing cached basis tabulation')
+
+  for order in range(1,7):
+    quad = GaussRule(order)
+    tab = tabulate(quad)
+
+    # A second rule of the same order should find the cached tabulation
+    assert(tab is tabulate(GaussRule(order)))
+    assert(not tab.phi.flags.writeable)
+
+    phiLoop = np.array([P1Basis.phi(x,y) for (x,y) in quad.X()])
+    gradLoop = np.array([P1Basis.grad_phi(x,y) for (x,y) in quad.X()])
+    assert(np.array_equal(tab.phi, phiLoop))
+    assert(np.array_equal(tab.gradPhiRef, gradLoop))
+    assert(np.array_equal(quad.evalFunc(P1Basis.phi, 3), phiLoop))
+
+
+
+def test_Registry():
+
+  print('testing the quadrature rule registry')
+
+  reg = QuadratureRegistry()
+  degrees = [d for (d, quad) in reg.rules()]
+  print('registered rules: ',
+        ['{} (degree {}, {} pts)'.format(q.name(), d, q.n())
+         for (d, q) in reg.rules()])
+
+  # The Strang tables should have been found alongside the Gauss rules
+  assert(len(degrees) > len(GaussRule.gauss))
+
+  for p in range(0, 7):
+    quad = cheapestRule(p)
+    assert(exactDegree(quad) >= p)
+    # No registered rule exact to degree p should have fewer points
+    assert(all(q.n() >= quad.n() for (d,q) in reg.rules() if d >= p))
+    print('degree {}: {} with {} points'.format(p, quad.name(), quad.n()))
+
+  assert(exactDegree(GaussRule(2)) == 2)
+
+  # Forms accept numpy integer degrees as well as Python ints
+  f = lambda x, y, u=None: x*y
+  for deg in (3, np.int64(3)):
+    assert(VarCoeffOneForm(deg, f)._quad.n() == cheapestRule(3).n())
+    assert(VarCoeffMassTwoForm(deg, f)._quad.n() == cheapestRule(3).n())
+
+  # A registry pointed at a directory without the tables should warn and
+  # fall back to the Gauss rules
+  import tempfile, warnings
+  with tempfile.TemporaryDirectory() as emptyDir:
+    with warnings.catch_warnings(record=True) as caught:
+      warnings.simplefilter('always')
+      emptyReg = QuadratureRegistry(tableDir=emptyDir)
+      assert(len(emptyReg.rules()) == len(GaussRule.gauss))
+    assert(len(caught) == len(QuadratureRegistry.strangTables))
+
+
+
+def test_CollapsedGauss():
+
+  print('testing collapsed Gauss rules')
+
+  for p in (0, 1, 2, 5, 8, 13, 20, 31):
+    quad = CollapsedGaussRule(p)
+    deg = exactDegree(quad, maxDegree=p+4)
+    print('order={:3d}, points={:4d}, exact degree={:3d}'.format(p,
+                                                                quad.n(),
+                                                                deg))
+    assert(deg >= p)
+
+  # Orders beyond the tables should come from the generator
+  quad = cheapestRule(12)
+  assert(isinstance(quad, CollapsedGaussRule) and exactDegree(quad) >= 12)
+
+  # Integrate a high-degree function over a physical triangle, checking
+  # against the exact value of the test in Triangle.py
+  T = Triangle((1, 1), (4, 2), (0, 4))
+  n = 15
+  exact = (5*2**n*(1 - 2**(3 + n) + 3**(2 + n))) / ((1 + n)*(2 + n))
+  I = T.integrate(lambda x,y: (x+y)**n, quad=CollapsedGaussRule(n))
+  relErr = abs(I - exact)/abs(exact)
+  print('integral of (x+y)^{}: relative error = {:12.5g}'.format(n, relErr))
+  assert(relErr <= 1.0e-13)
+
+
+def test_RulePersistence():
+
+  print('testing persistence of generated rules')
+
+  import tempfile
+  with tempfile.TemporaryDirectory() as cacheDir:
+    # Clear the in-memory copy so the rule is generated and written
+    CollapsedGaussRule._memo.pop(17, None)
+    quad1 = CollapsedGaussRule(17, cacheDir=cacheDir)
+    assert(len(os.listdir(cacheDir)) == 1)
+
+    # Now read it back from disk
+    CollapsedGaussRule._memo.pop(17, None)
+    quad2 = CollapsedGaussRule(17, cacheDir=cacheDir)
+    assert(np.array_equal(quad1.X(), quad2.X()))
+    assert(np.array_equal(quad1.W(), quad2.W()))
+
+
+
+if __name__=='__main__':
+
+  test_Tabulation()
+
+  test_Registry()
+
+  test_CollapsedGauss()
+
+  test_RulePersistence()
@@ -0,0 +1,160 @@
+from Agnes import *
+import numpy as np
+import scipy.sparse.linalg as spla
+
+
+def decayingMode(t):
+  def u(x, y):
+    return np.exp(-2.0*np.pi**2*t)*np.cos(np.pi*x)*np.cos(np.pi*y)
+  return u
+
+
+def test_ThetaMethod():
+
+  print('testing theta-method time stepping of the heat equation')
+
+  # Decaying mode of the heat equation with homogeneous Neumann conditions
+  mesh = meshRectangle(nx=32, ny=32)
+  ds = DiscreteSpace(mesh, 1)
+  verts = mesh.vertArray()
+  u0 = decayingMode(0.0)(verts[:,0], verts[:,1])
+
+  T = 0.05
+  nSteps = 20
+  errs = {}
+  for theta in (1.0, 0.5):
+    stepper = ThetaMethod(ds, None, (LaplacianTwoForm(),), T/nSteps, theta)
+    u = DiscreteFunction(ds, 'u')
+    u.setVector(stepper.run(u0, 0.0, nSteps))
+    errs[theta] = l2Error(u[0], decayingMode(T))/l2Error(u[0])
+    print('theta={}: relative error={:12.5g}'.format(theta, errs[theta]))
+
+  assert(errs[0.5] < 0.01)
+  assert(errs[0.5] < 0.5*errs[1.0])
+
+
+def test_TimeDependentLoad():
+
+  print('testing time stepping with a time-dependent load')
+
+  mesh = meshRectangle(nx=10, ny=8)
+  ds = DiscreteSpace(mesh, 1)
+  twoForms = (LaplacianTwoForm(), MassTwoForm(coeff=0.5))
+  dt = 0.01
+  theta = 0.5
+
+  def loadForms(t):
+    return (VarCoeffOneForm(GaussRule(2),
+                            lambda x, y, u: np.sin(3.0*t + x)*y),)
+
+  stepper = ThetaMethod(ds, None, twoForms, dt, theta, loadForms)
+
+  # Reference: assemble and solve everything from scratch on each step
+  (M, b) = Assembler(ds, (MassTwoForm(),), ()).assemble(buildVec=False)
+  (K, b) = Assembler(ds, twoForms, ()).assemble(buildVec=False)
+  load = lambda t: Assembler(ds, (), loadForms(t)).assemble(buildMat=False)[1]
+
+  u = np.zeros(ds.numDofs())
+  uRef = np.zeros(ds.numDofs())
+  t = 0.0
+  for n in range(5):
+    u = stepper.step(u, t)
+    rhs = (M - (1.0-theta)*dt*K) @ uRef \
+      + dt*((1.0-theta)*load(t) + theta*load(t+dt))
+    uRef = spla.spsolve((M + theta*dt*K).tocsc(), rhs)
+    t += dt
+
+  err = np.linalg.norm(u - uRef)/np.linalg.norm(uRef)
+  print('difference from reference = {:12.5g}'.format(err))
+  assert(err <= 1.0e-12)
+
+
+def test_DirichletTimeStepping():
+
+  print('testing time stepping with Dirichlet conditions')
+
+  # A steady linear solution should be preserved exactly
+  mesh = TriangleMeshReader('../Meshes/triExample.8').getMesh()
+  ds = DiscreteSpace(mesh, 1)
+  uEx = lambda x, y: 1.0 + 2.0*x - y
+  bc = DirichletBC(ds, 1, uEx)
+
+  stepper = ThetaMethod(ds, None, (LaplacianTwoForm(),), 0.1, 0.5, bcs=(bc,))
+  verts = mesh.vertArray()
+  u0 = uEx(verts[:,0], verts[:,1])
+  u = stepper.run(u0, 0.0, 10)
+
+  err = np.max(np.abs(u - u0))
+  print('max change in steady solution = {:12.5g}'.format(err))
+  assert(err <= 1.0e-12)
+
+
+
+def test_LumpedMass():
+
+  print('testing the lumped mass vector')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  ds = DiscreteSpace(mesh, 2)
+  massForms = (MassTwoForm(coeff=2.0, testID=0, unkID=0),
+               MassTwoForm(testID=1, unkID=1))
+
+  (M, b) = Assembler(ds, massForms, ()).assemble(buildVec=False)
+  (A, m) = Assembler(ds, (), [f.lumped() for f in massForms])\
+    .assemble(buildMat=False)
+
+  err = np.max(np.abs(m - M @ np.ones(ds.numDofs())))
+  print('difference from row sums = {:12.5g}'.format(err))
+  assert(err <= 1.0e-15)
+
+  # Off-diagonal blocks can't be lumped
+  try:
+    MassTwoForm(testID=0, unkID=1).lumped()
+    assert(False)
+  except ValueError:
+    pass
+
+
+def test_ExplicitStepper():
+
+  print('testing explicit time stepping of the heat equation')
+
+  mesh = meshRectangle(nx=16, ny=16)
+  ds = DiscreteSpace(mesh, 1)
+  verts = mesh.vertArray()
+  u0 = decayingMode(0.0)(verts[:,0], verts[:,1])
+
+  T = 0.02
+  for method in ('euler', 'rk2', 'rk4'):
+    stepper = ExplicitStepper(ds, None, (LaplacianTwoForm(),), 1.0, method)
+    nSteps = int(np.ceil(2.0*T/stepper.stableTimeStep()))
+    stepper = ExplicitStepper(ds, None, (LaplacianTwoForm(),), T/nSteps,
+                              method)
+
+    u = DiscreteFunction(ds, 'u')
+    u.setVector(stepper.run(u0, 0.0, nSteps))
+    err = l2Error(u[0], decayingMode(T))/l2Error(u[0])
+    print('method={}: steps={}, relative error={:12.5g}'.format(method,
+                                                               nSteps, err))
+    assert(err < 0.02)
+
+  # Taking a step too large should blow up
+  stepper = ExplicitStepper(ds, None, (LaplacianTwoForm(),), 1.0)
+  dt = 4.0*stepper.stableTimeStep()
+  stepper = ExplicitStepper(ds, None, (LaplacianTwoForm(),), dt)
+  u = stepper.run(u0 + 0.01*np.cos(37.0*np.arange(len(u0))), 0.0, 50)
+  assert(np.max(np.abs(u)) > 1.0e3)
+
+
+
+if __name__=='__main__':
+
+  test_ThetaMethod()
+
+  test_TimeDependentLoad()
+
+  test_DirichletTimeStepping()
+
+  test_LumpedMass()
+
+  test_ExplicitStepper()
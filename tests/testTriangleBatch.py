@@ -0,0 +1,56 @@
+from Agnes import *
+import numpy as np
+
+
+def test_TriangleBatch():
+
+  print('testing batched triangle geometry')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  batch = TriangleBatch.forMesh(mesh)
+
+  assert(batch is TriangleBatch.forMesh(mesh))
+  assert(len(batch) == len(mesh.elems))
+
+  maxErr = 0.0
+  for ie, (a,b,c) in enumerate(mesh.elems):
+    T = Triangle(mesh.verts[a], mesh.verts[b], mesh.verts[c])
+    for attr in ('Jt', 'detJ', 'area', 'JtInv'):
+      err = np.max(np.abs(getattr(T, attr) - getattr(batch, attr)[ie]))
+      maxErr = max(maxErr, err)
+
+  print('max difference from Triangle = {:12.5g}'.format(maxErr))
+  assert(maxErr <= 1.0e-14)
+
+
+
+def test_QuadPts():
+
+  print('testing batched mapping of quadrature points')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  batch = TriangleBatch.forMesh(mesh)
+  quad = GaussRule(4)
+
+  pts = batch.quadPts(quad)
+  assert(pts.shape == (len(mesh.elems), quad.n(), 2))
+  assert(pts is TriangleBatch.forMesh(mesh).quadPts(GaussRule(4)))
+
+  maxErr = 0.0
+  for ie in range(len(batch)):
+    T = batch.triangle(ie)
+    # Map the points one at a time, as the reference implementation did
+    for q, x_ref in enumerate(quad.X()):
+      x = T.A + T.Jt.transpose() @ x_ref
+      maxErr = max(maxErr, np.max(np.abs(pts[ie,q] - x)))
+
+  print('max difference = {:12.5g}'.format(maxErr))
+  assert(maxErr <= 1.0e-14)
+
+
+
+if __name__=='__main__':
+
+  test_TriangleBatch()
+
+  test_QuadPts()
@@ -0,0 +1,64 @@
+from Agnes import *
+import numpy as np
+import numpy.linalg as npla
+
+
+def test_ConstVarCoeffTwoForms():
+
+  print('testing variable-coefficient two forms with a constant coefficient')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  tris = TriangleBatch.forMesh(mesh)
+  elems = mesh.elemArray()
+
+  c = np.pi
+  def f(x, y, u):
+    return c
+
+  tol = 1.0e-14
+  for varForm, constForm in (
+      (VarCoeffLaplacianTwoForm(GaussRule(1), f), LaplacianTwoForm(c)),
+      (VarCoeffMassTwoForm(GaussRule(2), f), MassTwoForm(c))):
+
+    A0 = constForm.localMats(tris, elems)
+    A1 = varForm.localMats(tris, elems)
+    error = npla.norm(A1 - A0)/npla.norm(A0)
+    print('{}: error = {:12.5g}'.format(type(varForm).__name__, error))
+    assert(error <= tol)
+
+
+def test_BatchedVarCoeffTwoForms():
+
+  print('testing batched variable-coefficient two forms')
+
+  mesh = TriangleMeshReader('../Meshes/triExample.3').getMesh()
+  tris = TriangleBatch.forMesh(mesh)
+  elems = mesh.elemArray()
+
+  ds = DiscreteSpace(mesh, 1)
+  U = DiscreteFunction(ds, 'U')
+  for i,(x,y) in enumerate(mesh.verts):
+    U[0].setValue(i, x - y*y)
+
+  def k(x, y, u):
+    return 1.0 + x*x + np.sin(y) + u**2
+
+  tol = 1.0e-14
+  for form in (VarCoeffLaplacianTwoForm(GaussRule(3), k, dfs=U[0]),
+               VarCoeffMassTwoForm(GaussRule(4), k, dfs=U[0])):
+
+    ABatch = form.localMats(tris, elems)
+    ALoop = np.array([form.localMat(tris.triangle(i), elems[i])
+                      for i in range(len(tris))])
+
+    error = npla.norm(ABatch - ALoop)/npla.norm(ALoop)
+    print('{}: error = {:12.5g}'.format(type(form).__name__, error))
+    assert(error <= tol)
+
+
+
+if __name__=='__main__':
+
+  test_ConstVarCoeffTwoForms()
+
+  test_BatchedVarCoeffTwoForms()